@@ -0,0 +1,64 @@
+"""
+Throughput of common.batch_runner at several concurrency levels on the fake model.
+
+Every level runs the same batch of prompts through one pipeline from
+benchmarks.pipelines into a fresh output file. The last level is then run a
+second time on its own output file to check that a resumed batch skips the
+finished items.
+
+    python -m benchmarks.batch_throughput [--items 32] [--levels 1,4,16] [--pipeline BlogPipeline]
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import tempfile
+
+from common.batch_runner import BatchRunner
+from common.fake_llm import FakeLlm, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.model_pool import MODEL_LIMITS, configure_model
+
+from .pipelines import PIPELINES
+
+
+def run_level(agent, items, output_path, concurrency):
+    runner = BatchRunner(agent, output_path, concurrency=concurrency)
+    return asyncio.run(runner.run(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=32)
+    parser.add_argument("--levels", default="1,4,16")
+    parser.add_argument("--pipeline", default="BlogPipeline", choices=list(PIPELINES))
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    args = parser.parse_args()
+
+    module_name, factory, prompt, rules = PIPELINES[args.pipeline]
+    agent = factory(importlib.import_module(module_name))
+    use_fake_model(agent, FakeLlm(
+        responder=scripted_responder(rules()),
+        first_token_delay=args.first_token,
+        seconds_per_word=args.per_word,
+    ))
+    use_fake_transcripts(minutes=10)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    items = [{"id": i, "prompt": f"{prompt} #{i}"} for i in range(args.items)]
+
+    print(f"{args.pipeline}, {args.items} items")
+    print(f"{'concurrency':<13}{'seconds':>9}{'items/s':>9}{'succeeded':>11}{'failed':>8}{'skipped':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        levels = [int(level) for level in args.levels.split(",")]
+        for concurrency in levels:
+            output_path = os.path.join(tmp, f"out-{concurrency}.jsonl")
+            s = run_level(agent, items, output_path, concurrency)
+            print(f"{concurrency:<13}{s['seconds']:>9.2f}{s['items_per_second']:>9.2f}{s['succeeded']:>11}{s['failed']:>8}{s['skipped']:>9}")
+        s = run_level(agent, items, output_path, levels[-1])
+        print(f"{'resumed':<13}{s['seconds']:>9.2f}{s['items_per_second']:>9.2f}{s['succeeded']:>11}{s['failed']:>8}{s['skipped']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares the sequential and parallel blog pipelines on a local fake model.
+
+Every model call waits `--first-token` seconds and then `--per-word` seconds for
+each word it outputs, with response lengths close to what each step produces
+for a 200 to 300-word post.
+
+    python -m benchmarks.blog_pipeline_latency [--first-token 0.4] [--per-word 0.004]
+"""
+import argparse
+import asyncio
+import time
+
+from blog_writer.agent import build_pipeline, stream_blog
+from common.fake_llm import FakeLlm, instruction_text, use_fake_model
+
+
+def blog_responder(llm_request):
+    instruction = instruction_text(llm_request)
+    if instruction.startswith("Create a blog outline"):
+        words = 120
+    elif "Write only" in instruction:
+        words = 100
+    else:
+        # Full draft and edited post
+        words = 300
+    return " ".join(["word"] * words)
+
+
+async def measure(mode, first_token, per_word):
+    agent = build_pipeline(mode)
+    model = use_fake_model(agent, FakeLlm(responder=blog_responder, first_token_delay=first_token, seconds_per_word=per_word))
+    start = time.perf_counter()
+    first_chunk = None
+    async for _ in stream_blog("The future of local LLMs", agent=agent):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+    return time.perf_counter() - start, first_chunk, len(model.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--first-token", type=float, default=0.4)
+    parser.add_argument("--per-word", type=float, default=0.004)
+    args = parser.parse_args()
+
+    # Warm up imports and ADK internals so the first measured run is not penalised
+    asyncio.run(measure("sequential", 0, 0))
+    print(f"{'mode':<12}{'total s':>10}{'first chunk s':>16}{'model calls':>14}")
+    for mode in ("sequential", "parallel"):
+        total, first_chunk, calls = asyncio.run(measure(mode, args.first_token, args.per_word))
+        print(f"{mode:<12}{total:>10.2f}{first_chunk:>16.2f}{calls:>14}")
+
+
+if __name__ == "__main__":
+    main()
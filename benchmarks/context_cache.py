@@ -0,0 +1,104 @@
+"""
+Prompt tokens, cached tokens and cost of youtube_script_writer's workflow with and without context caching.
+
+Runs the workflow on the fake model for several user turns in one session,
+once as a plain root agent and once in an App with a ContextCacheConfig.
+FakeLlm runs ADK's Gemini cache manager against an in-memory cache service,
+so caches are created and reused as they would be on Gemini: from an agent's
+second call on (the second critique of the loop, then every agent in the
+following turns), for prefixes of at least 2048 tokens. Costs use
+common.metrics, including the storage of every cache for its TTL.
+
+    python -m benchmarks.context_cache [--turns 2] [--ttl 300] [--policy pro]
+"""
+import argparse
+import asyncio
+import importlib
+
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.apps import App
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.fake_llm import FakeLlm, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.metrics import MetricsRecorder, estimate_storage_cost
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.model_router import set_policy
+
+from .pipelines import PIPELINES, WORKFLOW_RULES
+
+
+FOLLOW_UPS = [
+    "Make the hook punchier and keep it under 45 seconds",
+    "Add a short section on quantization before the benchmarks",
+    "Shorten the outro",
+]
+
+
+async def run_turns(runner, prompts, metrics):
+    # Summaries are kept per session, so each turn's is taken before the next replaces it
+    summaries = []
+    session = await runner.session_service.create_session(app_name="benchmark", user_id="user")
+    for prompt in prompts:
+        message = types.Content(role="user", parts=[types.Part(text=prompt)])
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+            pass
+        summaries.append(metrics.summaries[session.id])
+    return summaries
+
+
+def measure(config, turns):
+    module_name, _, prompt, _ = PIPELINES["workflow"]
+    agent = importlib.import_module(module_name).build_workflow("full")
+    metrics = MetricsRecorder()
+    metrics.attach(agent)
+    model = use_fake_model(agent, FakeLlm(responder=scripted_responder(WORKFLOW_RULES)))
+    use_fake_transcripts(minutes=10)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    if config is None:
+        runner = InMemoryRunner(agent=agent, app_name="benchmark")
+    else:
+        runner = InMemoryRunner(app=App(name="benchmark", root_agent=agent, context_cache_config=config))
+    summaries = asyncio.run(run_turns(runner, [prompt] + FOLLOW_UPS[:turns - 1], metrics))
+
+    rows = {}
+    for summary in summaries:
+        for row in summary:
+            if row["kind"] == "agent" and row["model_calls"]:
+                total = rows.setdefault(row["name"], {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0})
+                for key in total:
+                    total[key] += row["model_calls" if key == "calls" else key]
+    caches = model.context_caches.entries.values()
+    storage = sum(estimate_storage_cost(c["model"], c["tokens"], c["expire_time"] - c["created"]) for c in caches)
+    return rows, len(caches), storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--ttl", type=int, default=300)
+    parser.add_argument("--policy", default="pro")
+    args = parser.parse_args()
+    set_policy(args.policy)
+
+    off, _, _ = measure(None, args.turns)
+    on, caches, storage = measure(ContextCacheConfig(ttl_seconds=args.ttl), args.turns)
+    print(f"{args.turns} turns, {args.policy} policy, {args.ttl}s TTL")
+    print(f"{'agent':<24}{'calls':>6}{'prompt tok':>12}{'cached tok':>12}{'billed tok':>12}{'cost $ off':>12}{'cost $ on':>11}")
+    for name, row in on.items():
+        billed = row["prompt_tokens"] - row["cached_tokens"]
+        print(f"{name:<24}{row['calls']:>6}{row['prompt_tokens']:>12}{row['cached_tokens']:>12}{billed:>12}"
+              f"{off[name]['cost_usd']:>12.4f}{row['cost_usd']:>11.4f}")
+    prompt = sum(row["prompt_tokens"] for row in on.values())
+    cached = sum(row["cached_tokens"] for row in on.values())
+    cost_off = sum(row["cost_usd"] for row in off.values())
+    cost_on = sum(row["cost_usd"] for row in on.values())
+    print(f"{'total':<24}{sum(row['calls'] for row in on.values()):>6}{prompt:>12}{cached:>12}{prompt - cached:>12}"
+          f"{cost_off:>12.4f}{cost_on:>11.4f}")
+    print(f"{caches} caches created, ${storage:.4f} of it for storage; {cached / prompt:.0%} of prompt tokens cached")
+
+
+if __name__ == "__main__":
+    main()
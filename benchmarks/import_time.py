@@ -0,0 +1,105 @@
+"""
+Cold start cost of the agent packages, measured in fresh interpreters.
+
+For every package four numbers are reported:
+    import: `import <package>` with `python -X importtime`, i.e. importing
+        the package without touching root_agent.
+    root_agent: importing the package and building its root_agent.
+    root_agent (ADK loaded): the same with google.adk already imported, which
+        is the marginal cost of one more agent in a running server.
+    adk load: AgentLoader.load_agent(<package>) with the loader already
+        imported, which is what `adk web` and `adk api_server` pay for the
+        package on its first request.
+
+The agent packages build their agents lazily, on the first access to
+root_agent. That only helps callers that import a package and never touch
+root_agent: ADK's loader reads root_agent (or app) right after the import,
+so for `adk web` and `adk api_server` the "adk load" column is the cold start
+and lazy construction saves nothing.
+
+Then, for every package, the `--top` modules with the highest cumulative
+`-X importtime` while `<package>.agent` is imported, i.e. what building the
+root_agent spends its import time on.
+
+    python -m benchmarks.import_time [--runs 5] [--top 10] [package ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+PACKAGES = ["blog_writer", "moral_story_writer", "research_agent", "youtube_script_writer"]
+
+_TIMED = """
+import time
+{setup}
+start = time.perf_counter()
+{statement}
+print("ELAPSED", time.perf_counter() - start)
+"""
+
+_ADK_SETUP = "from google.adk.cli.utils.agent_loader import AgentLoader"
+
+
+def importtime_rows(module):
+    """Returns `(self_seconds, cumulative_seconds, module)` of every module `python -X importtime` imports with `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[1].isdigit():
+            rows.append((int(fields[0].rsplit(" ", 1)[-1]) / 1e6, int(fields[1]) / 1e6, fields[2]))
+    return rows
+
+
+def importtime(package):
+    """Returns the cumulative seconds `python -X importtime` reports for `package`."""
+    for _, cumulative, module in importtime_rows(package):
+        if module == package:
+            return cumulative
+    raise RuntimeError(f"{package} not found in -X importtime output")
+
+
+def timed(statement, setup=""):
+    code = _TIMED.format(setup=setup, statement=statement)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("ELAPSED"):
+            return float(line.split()[1])
+    raise RuntimeError(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Modules listed per package in the breakdown")
+    parser.add_argument("packages", nargs="*", default=PACKAGES)
+    args = parser.parse_args()
+
+    adk = "import google.adk.agents, google.adk.models.google_llm"
+    print(f"{'package':<24}{'import s':>10}{'root_agent s':>14}{'root_agent (ADK loaded) s':>27}{'adk load s':>12}")
+    for package in args.packages:
+        build = f"import {package}.agent\n{package}.agent.root_agent"
+        imported = statistics.median(importtime(package) for _ in range(args.runs))
+        built = statistics.median(timed(build) for _ in range(args.runs))
+        marginal = statistics.median(timed(build, setup=adk) for _ in range(args.runs))
+        loaded = statistics.median(
+            timed(f"AgentLoader('.').load_agent({package!r})", setup=_ADK_SETUP) for _ in range(args.runs)
+        )
+        print(f"{package:<24}{imported:>10.3f}{built:>14.3f}{marginal:>27.3f}{loaded:>12.3f}")
+    for package in args.packages:
+        # The leading spaces of a name show how deep it was imported
+        rows = sorted(importtime_rows(f"{package}.agent"), key=lambda row: row[1], reverse=True)
+        print(f"\nimport {package}.agent, top {args.top} by cumulative time")
+        print(f"{'cumulative s':>12}{'self s':>9}  module")
+        for self_seconds, cumulative, module in rows[:args.top]:
+            print(f"{cumulative:>12.3f}{self_seconds:>9.3f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Session latency percentiles, throughput and event loop lag of every root_agent under concurrent sessions.
+
+Each pipeline of benchmarks.pipelines serves `--sessions` sessions from one
+InMemoryRunner on one event loop, as a worker of `adk api_server` does, with at
+most `--concurrency` of them running at the same time. The model is FakeLlm
+and transcripts come from common.fake_transcripts, whose fetch blocks its
+thread for `--fetch-latency` seconds like the real transcript client's network
+round trip; every session fetches its own transcript. A
+common.loop_monitor.LoopLagMonitor measures how late the loop runs and lists
+the tool calls during which it never ran, and the agents whose own steps ran
+while it stalled.
+
+    python -m benchmarks.load_test [--sessions 16] [--concurrency 1,16] [--fetch-latency 0.3] [--threshold 0.05] [pipelines...]
+"""
+import argparse
+import asyncio
+import importlib
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common import youtube_script_tool
+from common.fake_llm import FakeLlm, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.loop_monitor import LoopLagMonitor, percentile
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.transcript_cache import TranscriptCache
+
+from .pipelines import PIPELINES
+
+
+async def run_session(runner, prompt):
+    start = time.perf_counter()
+    session = await runner.session_service.create_session(app_name="benchmark", user_id="user")
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+        pass
+    return time.perf_counter() - start
+
+
+async def run_load(agent, prompt, sessions, concurrency, monitor):
+    runner = InMemoryRunner(agent=agent, app_name="benchmark")
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def limited(i):
+        async with semaphore:
+            try:
+                return await run_session(runner, f"{prompt} #{i}")
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+                return None
+
+    async with monitor:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(limited(i) for i in range(sessions)))
+        seconds = time.perf_counter() - start
+    return [latency for latency in latencies if latency is not None], failures, seconds
+
+
+def measure(name, sessions, concurrency, fetch_latency, threshold, fake_kwargs):
+    module_name, factory, prompt, rules = PIPELINES[name]
+    agent = factory(importlib.import_module(module_name))
+    model = use_fake_model(agent, FakeLlm(responder=scripted_responder(rules()), **fake_kwargs))
+    use_fake_transcripts(minutes=10, latency=fetch_latency)
+    # Entries expire at once, so every session fetches as sessions on different videos would
+    youtube_script_tool.transcript_cache = TranscriptCache(path=":memory:", ttl=0)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    monitor = LoopLagMonitor(threshold=threshold)
+    monitor.attach(agent)
+    latencies, failures, seconds = asyncio.run(run_load(agent, prompt, sessions, concurrency, monitor))
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "sessions_per_second": len(latencies) / seconds if seconds else 0.0,
+        "failed": len(failures),
+        "model_calls": len(model.requests),
+        "loop": monitor.report(),
+    }
+
+
+def format_blocking(tools):
+    if not tools:
+        return "-"
+    return ", ".join(
+        f"{name} {row['blocking_calls']}/{row['calls']} up to {row['max_blocked']:.2f}s" for name, row in tools.items()
+    )
+
+
+def format_stalling(agents):
+    if not agents:
+        return "-"
+    return ", ".join(f"{name} {row['stalls']}x up to {row['max_stall'] * 1000:.0f}ms" for name, row in agents.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--concurrency", default="1,16")
+    parser.add_argument("--fetch-latency", type=float, default=0.3)
+    parser.add_argument("--threshold", type=float, default=0.05, help="Seconds without a loop tick that count as a stall")
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    parser.add_argument("pipelines", nargs="*", default=list(PIPELINES))
+    args = parser.parse_args()
+
+    fake_kwargs = {"first_token_delay": args.first_token, "seconds_per_word": args.per_word}
+    print(f"{args.sessions} sessions, {args.fetch_latency}s transcript fetch, {args.threshold * 1000:.0f}ms stall threshold")
+    print(f"{'pipeline':<26}{'conc':>5}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'sess/s':>8}{'failed':>7}"
+          f"{'lag p50 ms':>11}{'lag p99 ms':>11}{'lag max ms':>11}{'stalls':>7}  blocking tool calls | agents running in stalls")
+    blocking, stalling = set(), set()
+    for name in args.pipelines:
+        for concurrency in [int(level) for level in args.concurrency.split(",")]:
+            r = measure(name, args.sessions, concurrency, args.fetch_latency, args.threshold, fake_kwargs)
+            loop = r["loop"]
+            blocking.update(loop["blocking_tools"])
+            stalling.update(loop["stalling_agents"])
+            print(f"{name:<26}{concurrency:>5}{r['p50']:>8.2f}{r['p95']:>8.2f}{r['p99']:>8.2f}{r['sessions_per_second']:>8.2f}"
+                  f"{r['failed']:>7}{loop['lag_p50_ms']:>11.1f}{loop['lag_p99_ms']:>11.1f}{loop['lag_max_ms']:>11.1f}"
+                  f"{loop['stalls']:>7}  {format_blocking(loop['blocking_tools'])} | {format_stalling(loop['stalling_agents'])}")
+    if blocking or stalling:
+        print()
+    if blocking:
+        print(f"Tools that blocked the event loop: {', '.join(sorted(blocking))}")
+    if stalling:
+        print(f"Agents that ran while the event loop stalled: {', '.join(sorted(stalling))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Latency and model cost of the routing policies of common.model_router, offline.
+
+Runs youtube_script_writer's workflow on the fake model under every policy for
+a few fixture requests:
+
+    short: a short research brief and a critique that is clear on any model;
+    borderline: the flash critique gives a borderline retention score, so
+        "tiered" asks pro for a second opinion;
+    long: a long research brief, which "tiered" sends straight to pro for the writer.
+
+Pro answers `--pro-factor` times slower than flash and flash-lite 0.6 times
+as slow, on top of the usual first token and per word delays. Cost is priced
+per model with common.metrics.PRICES, including the answers "tiered" turns down.
+
+    python -m benchmarks.model_routing [--policies pro,lite,tiered] [--first-token 0.2] [--per-word 0.002] [--pro-factor 3]
+"""
+import argparse
+import asyncio
+import importlib
+from collections import Counter
+
+from common.fake_llm import FakeLlm, instruction_text, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.metrics import MetricsRecorder
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.model_router import FLASH, FLASH_LITE, POLICIES, PRO, set_policy
+
+from .pipelines import PIPELINES, WORKFLOW_RULES, lorem, run_pipeline
+
+
+CRITIQUE = "Ruthless YouTube Script Consultant"
+
+
+def critique(score):
+    return f"Retention Score (0-10): {score}\nThe Red Flags:\n{lorem(200)}"
+
+
+# name -> (research brief words, critiques per model in turn)
+FIXTURES = {
+    "short": (300, {FLASH: [critique(9), "APPROVED"], PRO: [critique(9), "APPROVED"]}),
+    "borderline": (600, {FLASH: [critique(6)], PRO: [critique(6), "APPROVED"]}),
+    "long": (3000, {FLASH: [critique(3), "APPROVED"], PRO: [critique(3), "APPROVED"]}),
+}
+
+
+def fixture_responder(brief_words, critiques):
+    rules = [
+        {**rule, "text": lorem(brief_words)} if rule["match"] == "Lead Technical Content Strategist" else rule
+        for rule in WORKFLOW_RULES if rule["match"] != CRITIQUE
+    ]
+    respond = scripted_responder(rules)
+    turns = Counter()
+
+    def responder(llm_request):
+        if CRITIQUE not in instruction_text(llm_request):
+            return respond(llm_request)
+        texts = critiques[llm_request.model]
+        turn = turns[llm_request.model]
+        turns[llm_request.model] += 1
+        return texts[min(turn, len(texts) - 1)]
+
+    return responder
+
+
+def measure(agent, metrics, prompt, fixture, fake_kwargs):
+    brief_words, critiques = FIXTURES[fixture]
+    model = use_fake_model(agent, FakeLlm(responder=fixture_responder(brief_words, critiques), **fake_kwargs))
+    use_fake_transcripts(minutes=10)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    state = asyncio.run(run_pipeline(agent, prompt))
+    rows = next(reversed(metrics.summaries.values()))
+    report = state.get("loop_report") or {}
+    return {
+        "seconds": sum(row["seconds"] for row in rows if row["name"] == agent.name),
+        "calls": Counter(request.model for request in model.requests),
+        "escalations": sum(row["escalations"] for row in rows),
+        "cost": sum(row["cost_usd"] for row in rows),
+        "stop": report.get("stop_reason", "-"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--policies", default=",".join(POLICIES))
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    parser.add_argument("--pro-factor", type=float, default=3.0)
+    args = parser.parse_args()
+
+    module_name, factory, prompt, _ = PIPELINES["workflow"]
+    agent = factory(importlib.import_module(module_name))
+    metrics = MetricsRecorder()
+    metrics.attach(agent)
+    fake_kwargs = {
+        "first_token_delay": args.first_token,
+        "seconds_per_word": args.per_word,
+        "delay_factors": {PRO: args.pro_factor, FLASH: 1.0, FLASH_LITE: 0.6},
+    }
+
+    print(f"workflow, {args.first_token}s first token, {args.per_word}s/word, pro {args.pro_factor}x slower")
+    print(f"{'policy':<8}{'fixture':<12}{'seconds':>9}{'pro':>5}{'flash':>7}{'lite':>6}{'escalated':>11}{'cost $':>9}  loop")
+    try:
+        for policy in args.policies.split(","):
+            set_policy(policy)
+            totals = {"seconds": 0.0, "calls": Counter(), "escalations": 0, "cost": 0.0}
+            for fixture in FIXTURES:
+                r = measure(agent, metrics, prompt, fixture, fake_kwargs)
+                for key in totals:
+                    totals[key] += r[key]
+                calls = r["calls"]
+                print(f"{policy:<8}{fixture:<12}{r['seconds']:>9.2f}{calls[PRO]:>5}{calls[FLASH]:>7}{calls[FLASH_LITE]:>6}"
+                      f"{r['escalations']:>11}{r['cost']:>9.4f}  {r['stop']}")
+            calls = totals["calls"]
+            print(f"{policy:<8}{'total':<12}{totals['seconds']:>9.2f}{calls[PRO]:>5}{calls[FLASH]:>7}{calls[FLASH_LITE]:>6}"
+                  f"{totals['escalations']:>11}{totals['cost']:>9.4f}")
+    finally:
+        set_policy(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Throughput of many concurrent sessions against a rate limited model.
+
+The fake model accepts `--quota` requests per minute and answers 429 beyond
+that. Time runs 60 times faster than real: one benchmark second is one quota
+minute, and every backoff delay is scaled the same way. Two setups are compared:
+
+    per-client: each call retries on its own with the old per-module
+        HttpRetryOptions (attempts=5, exp_base=7, initial_delay=1).
+    scheduler: every call goes through the shared ModelScheduler of
+        common.model_pool, sized to the quota.
+
+    python -m benchmarks.model_scheduler [--sessions 40] [--calls 5] [--quota 30]
+"""
+import argparse
+import asyncio
+import time
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import errors, types
+
+from common.fake_llm import FakeLlm
+from common.model_pool import ModelLimits, configure_model
+
+
+MODEL = "gemini-3-pro-preview"
+TIME_SCALE = 1 / 60
+
+OLD_RETRY_OPTIONS = types.HttpRetryOptions(
+    attempts=5,
+    exp_base=7,
+    initial_delay=1,
+    http_status_codes=[429, 500, 503, 504],
+)
+
+
+async def session(model, calls, results):
+    request = LlmRequest(model=MODEL, contents=[types.Content(role="user", parts=[types.Part(text="hello")])])
+    for _ in range(calls):
+        try:
+            async for _ in model.generate_content_async(request):
+                pass
+            results["completed"] += 1
+        except errors.APIError:
+            results["failed"] += 1
+
+
+async def run(model, sessions, calls):
+    results = {"completed": 0, "failed": 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(session(model, calls, results) for _ in range(sessions)))
+    results["seconds"] = time.perf_counter() - start
+    return results
+
+
+def measure(mode, sessions, calls, quota, latency):
+    fake_kwargs = {"model": MODEL, "quota": quota, "quota_window": 60 * TIME_SCALE, "first_token_delay": latency}
+    scheduler = None
+    if mode == "per-client":
+        model = FakeLlm(retry_options=OLD_RETRY_OPTIONS, retry_delay_scale=TIME_SCALE, **fake_kwargs)
+    else:
+        model = FakeLlm(scheduled=True, **fake_kwargs)
+        limits = ModelLimits(requests_per_minute=quota, concurrency=8, burst=1)
+        scheduler = configure_model(MODEL, limits, delay_scale=TIME_SCALE, seed=0)
+    results = asyncio.run(run(model, sessions, calls))
+    results["requests"] = model.stats["calls"]
+    results["rate_limited"] = model.stats["quota_errors"]
+    results["retries"] = model.stats["retries"] + (scheduler.stats["retries"] if scheduler else 0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--quota", type=int, default=30, help="Accepted requests per (scaled) minute")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per model call")
+    args = parser.parse_args()
+
+    ceiling = args.quota / (60 * TIME_SCALE)
+    print(f"{args.sessions} sessions x {args.calls} calls, quota ceiling {ceiling:.0f} calls/s")
+    print(f"{'mode':<12}{'seconds':>9}{'completed':>11}{'failed':>8}{'calls/s':>9}{'of quota':>10}{'requests':>10}{'429s':>7}{'retries':>9}")
+    for mode in ("per-client", "scheduler"):
+        r = measure(mode, args.sessions, args.calls, args.quota, args.latency)
+        throughput = r["completed"] / r["seconds"]
+        print(f"{mode:<12}{r['seconds']:>9.2f}{r['completed']:>11}{r['failed']:>8}{throughput:>9.1f}"
+              f"{throughput / ceiling:>10.0%}{r['requests']:>10}{r['rate_limited']:>7}{r['retries']:>9}")
+
+
+if __name__ == "__main__":
+    main()
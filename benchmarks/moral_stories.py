@@ -0,0 +1,84 @@
+"""
+Model calls, tokens and time of moral_story_writer for different batch sizes, and what the story index saves on a second run.
+
+Writes stories for a list of morals on the fake model, once per batch size,
+each time with an empty in-memory index. Two morals of the list are answered
+with the story of an earlier one at first, so the index has to reject them and
+ask again, and one moral is repeated in the message. The same list is then
+sent again against the index of the last batch size, where every story is
+reused. The per-story report of that batch size is printed at the end.
+
+    python -m benchmarks.moral_stories [--batch-sizes 1 4 8] [--first-token 0.2] [--per-word 0.002]
+"""
+import argparse
+import asyncio
+import importlib
+import time
+
+from common.fake_llm import FakeLlm, scripted_responder, use_fake_model
+from common.model_pool import MODEL_LIMITS, configure_model
+
+from .pipelines import MORALS, run_pipeline, story_rules
+
+
+WORKLOAD = MORALS + [
+    "Pride comes before a fall",
+    "A friend in need is a friend indeed",
+    "Practice makes perfect",
+    "Honesty is the best policy",
+    "Do not count your chickens before they hatch",
+    "Where there is a will there is a way",
+    "Actions speak louder than words",
+]
+
+# Written with the story of the moral they map to until they are asked for a different one
+COPIES = {
+    "A friend in need is a friend indeed": "Kindness is never wasted",
+    "Actions speak louder than words": "Many hands make light work",
+}
+
+
+def measure(module, batch_size, index, fake_kwargs):
+    agent = module.build_pipeline(batch_size, index)
+    model = use_fake_model(agent, FakeLlm(responder=scripted_responder(story_rules(COPIES, salt=0)), **fake_kwargs))
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    start = time.perf_counter()
+    state = asyncio.run(run_pipeline(agent, "\n".join(WORKLOAD)))
+    return {
+        "seconds": time.perf_counter() - start,
+        "model_calls": len(model.requests),
+        "prompt_tokens": model.stats["prompt_tokens"],
+        "output_tokens": model.stats["output_tokens"],
+        "report": state["story_report"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    args = parser.parse_args()
+
+    module = importlib.import_module("moral_story_writer.agent")
+    fake_kwargs = {"first_token_delay": args.first_token, "seconds_per_word": args.per_word}
+    print(f"{len(WORKLOAD)} morals, {args.first_token}s first token, {args.per_word}s/word")
+    print(f"{'run':<16}{'seconds':>9}{'model calls':>13}{'prompt tok':>12}{'output tok':>12}{'new':>5}{'reused':>8}{'rejected':>10}")
+    for batch_size in args.batch_sizes:
+        index = module.story_index(":memory:")
+        for run in ("first", "again"):
+            if run == "again" and batch_size != args.batch_sizes[-1]:
+                continue
+            r = measure(module, batch_size, index, fake_kwargs)
+            report = r["report"]
+            print(f"{f'batch {batch_size}, {run}':<16}{r['seconds']:>9.2f}{r['model_calls']:>13}{r['prompt_tokens']:>12}"
+                  f"{r['output_tokens']:>12}{report['new']:>5}{report['reused']:>8}{report['rejected']:>10}")
+            if run == "first":
+                first = report
+    print(f"\nbatch {args.batch_sizes[-1]}, first run")
+    print(module.format_report(first))
+
+
+if __name__ == "__main__":
+    main()
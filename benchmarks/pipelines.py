@@ -0,0 +1,217 @@
+"""
+Runs every root_agent end to end on the fake model and fake transcripts.
+
+Each pipeline is driven through InMemoryRunner with scripted responses that
+follow its normal path (tool calls, AgentTool round trips, critique loop), and
+the wall time, model calls, tool calls, retries and tokens of each run are
+reported. With --metrics, the per-agent and per-tool table recorded by
+common.metrics is printed after each pipeline and the records are written to
+the given JSON lines file.
+
+    python -m benchmarks.pipelines [--runs 3] [--first-token 0.2] [--per-word 0.002] [--error-rate 0.1] [--metrics metrics.jsonl]
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import random
+import re
+import statistics
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from common.fake_llm import FakeLlm, last_function_response, request_text, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.metrics import MetricsRecorder, format_summary
+from common.model_pool import MODEL_LIMITS, configure_model
+
+
+VIDEO_URL = "https://www.youtube.com/watch?v=CKS1glzmDVc"
+SCRIPT_TEXT = " ".join(["| Line of dialogue | [Visual: screen recording] |"] * 60)
+
+
+def lorem(words):
+    return " ".join(["lorem"] * words)
+
+
+def coordinator_call(llm_request):
+    last = last_function_response(llm_request)
+    if last is None:
+        return ("ResearchAgent", {"request": "local LLM inference"})
+    if last == "ResearchAgent":
+        return ("SummarizerAgent", {"request": "Summarize the findings"})
+    return None
+
+
+def refiner_rules():
+    refinements = {"count": 0}
+
+    def refiner_call(llm_request):
+        if last_function_response(llm_request) is None:
+            refinements["count"] += 1
+        return ("exit_loop", {}) if refinements["count"] >= 2 else None
+
+    return [
+        {"match": "Gather video topic", "call": ("get_subtitles", {"url": VIDEO_URL}), "text": lorem(250)},
+        {"match": "Create outline and full YouTube script", "text": SCRIPT_TEXT},
+        {"match": "Compare", "call": refiner_call, "text": SCRIPT_TEXT},
+    ]
+
+
+BLOG_RULES = [
+    {"match": "Create a blog outline", "text": lorem(120)},
+    {"match": "Write only", "text": lorem(100)},
+    {"match": "Following this outline", "text": lorem(300)},
+    {"match": "Edit this draft", "text": lorem(300)},
+]
+
+RESEARCH_RULES = [
+    {"match": "research coordinator", "call": coordinator_call, "text": lorem(80)},
+    {"match": "specialized research agent", "text": lorem(250)},
+    {"match": "Read the provided research findings", "text": lorem(80)},
+]
+
+WORKFLOW_RULES = [
+    {"match": "Youtube Manager", "text": f"Topic: local LLMs. Audience: developers. Length: 10 min. Reference: {VIDEO_URL}"},
+    {"match": "Lead Technical Content Strategist", "call": ("get_subtitles", {"url": VIDEO_URL}), "text": lorem(400)},
+    {"match": "Senior YouTube Scriptwriter", "text": SCRIPT_TEXT},
+    {"match": "Ruthless YouTube Script Consultant", "text": [lorem(250), "APPROVED"]},
+    {"match": "Master Script Editor", "text": SCRIPT_TEXT.replace("Line of dialogue", "Punchier line")},
+]
+MORALS = [
+    "Honesty is the best policy",
+    "Slow and steady wins the race",
+    "Kindness is never wasted",
+    "Look before you leap",
+    "Many hands make light work",
+]
+
+STORY_VOCABULARY = (
+    "fox rabbit owl river forest village baker lantern storm bridge garden mountain crow turtle king "
+    "girl boy grandmother apple basket promise secret map coin moon winter harvest well shoe kite boat "
+    "laughed whispered ran climbed shared hid found lost waited helped carried built broke fixed sang"
+).split()
+
+_story_salts = itertools.count()
+
+
+def story_rules(copies=None, salt=None):
+    """
+    Rules for StoryWriter that answer every numbered moral of a batch with a story of its own.
+
+    A moral in `copies` first gets the same story as the moral it maps to, and
+    a story of its own once the batch asks for a different one. Stories depend
+    on `salt` and the moral only, a new salt is drawn when it is None.
+    """
+    salt = next(_story_salts) if salt is None else salt
+
+    def write(llm_request):
+        stories = []
+        pattern = r"^(\d+)\. (.+?)( \(not like the story .*\))?$"
+        for number, moral, avoid in re.findall(pattern, request_text(llm_request), re.MULTILINE):
+            seed = f"{moral}:{salt}:again" if avoid else f"{(copies or {}).get(moral, moral)}:{salt}"
+            rng = random.Random(seed)
+            story = " ".join(rng.choice(STORY_VOCABULARY) for _ in range(250))
+            stories.append(f"## {number}. The {moral.split()[0]} story\n{story}")
+        return "\n\n".join(stories)
+
+    return [{"match": "children's story writer", "text": write}]
+
+
+# name -> (module, root_agent factory, prompt, rules factory)
+PIPELINES = {
+    "BlogPipeline": ("blog_writer.agent", lambda m: m.build_pipeline("sequential"), "Local LLMs in 2026", lambda: BLOG_RULES),
+    "BlogPipeline (parallel)": ("blog_writer.agent", lambda m: m.build_pipeline("parallel"), "Local LLMs in 2026", lambda: BLOG_RULES),
+    "ResearchCoordinator": ("research_agent.agent", lambda m: m.build_pipeline("coordinator"), "Latest advances in local LLM inference", lambda: RESEARCH_RULES),
+    "ResearchPipeline": ("research_agent.agent", lambda m: m.build_pipeline("sequential"), "Latest advances in local LLM inference", lambda: RESEARCH_RULES),
+    "workflow": ("youtube_script_writer.agent", lambda m: m.root_agent, f"10 minute tutorial on local LLMs, like {VIDEO_URL}", lambda: WORKFLOW_RULES),
+    "script_manager": ("youtube_script_writer.agent_lite", lambda m: m.root_agent, f"10 minute tutorial on local LLMs, like {VIDEO_URL}", refiner_rules),
+    # Without reuse every run writes its stories, a new index would be reused by the next run
+    "MoralStoryPipeline": ("moral_story_writer.agent", lambda m: m.build_pipeline(4, m.story_index(":memory:"), reuse=False), "\n".join(MORALS), story_rules),
+}
+
+
+async def run_pipeline(agent, prompt):
+    runner = InMemoryRunner(agent=agent, app_name="benchmark")
+    session = await runner.session_service.create_session(app_name="benchmark", user_id="user")
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+        pass
+    session = await runner.session_service.get_session(app_name="benchmark", user_id="user", session_id=session.id)
+    return session.state
+
+
+def benchmark(name, runs, metrics=None, **fake_kwargs):
+    module_name, factory, prompt, rules = PIPELINES[name]
+    agent = factory(importlib.import_module(module_name))
+    if metrics is not None:
+        metrics.attach(agent)
+    rows = []
+    for _ in range(runs):
+        model = use_fake_model(agent, FakeLlm(responder=scripted_responder(rules()), **fake_kwargs))
+        transcripts = use_fake_transcripts(minutes=10)
+        # Keep the retry policy but skip the real quota waits and backoff
+        schedulers = [configure_model(model_name, delay_scale=0, seed=0) for model_name in MODEL_LIMITS]
+        start = time.perf_counter()
+        state = {}
+        try:
+            state = asyncio.run(run_pipeline(agent, prompt))
+            failed = False
+        except Exception:
+            # Injected errors that exhaust the retries fail the run, as they would in production
+            failed = True
+        rows.append({
+            "seconds": time.perf_counter() - start,
+            "failed": failed,
+            "model_calls": len(model.requests),
+            "tool_calls": model.stats["tool_calls"],
+            "retries": model.stats["retries"] + sum(s.stats["retries"] for s in schedulers),
+            "prompt_tokens": model.stats["prompt_tokens"],
+            "output_tokens": model.stats["output_tokens"],
+            "transcript_fetches": len(transcripts.fetches),
+            "loop": state.get("loop_report"),
+        })
+    return rows
+
+
+def format_loop(report):
+    if not report:
+        return "-"
+    return f"{report['iterations']} iterations, {report['stop_reason']}, {report.get('saved_calls', 0)} calls saved"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--metrics", metavar="PATH", help="Print per-agent metrics and write them to PATH")
+    parser.add_argument("pipelines", nargs="*", default=list(PIPELINES))
+    args = parser.parse_args()
+
+    fake_kwargs = {
+        "first_token_delay": args.first_token,
+        "seconds_per_word": args.per_word,
+        "error_rate": args.error_rate,
+    }
+    summaries = []
+    print(f"{'pipeline':<26}{'median s':>10}{'model calls':>13}{'tool calls':>12}{'retries':>9}{'failed':>8}{'prompt tok':>12}{'output tok':>12}  loop")
+    for name in args.pipelines:
+        metrics = MetricsRecorder(args.metrics) if args.metrics else None
+        rows = benchmark(name, args.runs, metrics, **fake_kwargs)
+        if metrics is not None and metrics.summaries:
+            summaries.append((name, next(reversed(metrics.summaries.values()))))
+        last = rows[-1]
+        print(f"{name:<26}{statistics.median(r['seconds'] for r in rows):>10.2f}{last['model_calls']:>13}"
+              f"{last['tool_calls']:>12}{last['retries']:>9}{sum(r['failed'] for r in rows):>8}"
+              f"{last['prompt_tokens']:>12}{last['output_tokens']:>12}  {format_loop(last['loop'])}")
+    for name, summary in summaries:
+        print(f"\n{name} (last run)")
+        print(format_summary(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Searches, model calls and time of ResearchCoordinator over a query workload, with and without the research cache.
+
+The workload repeats some queries word for word, rewords others and changes
+only the version number of one. ResearchAgent's google_search is replaced by
+common.fake_search, and every query runs in its own session. Three setups:
+
+    off: no research cache;
+    findings: ResearchAgent's findings are cached;
+    answers: the coordinator's final answers are cached too.
+
+    python -m benchmarks.research_cache [--first-token 0.2] [--per-word 0.002] [--similarity 0.8]
+"""
+import argparse
+import asyncio
+import importlib
+import time
+
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import AgentTool
+from google.genai import types
+
+from common.fake_llm import FakeLlm, last_function_response, scripted_responder, use_fake_model
+from common.fake_search import FakeSearch
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.research_cache import ResearchCache, ResearchStore
+
+from .pipelines import lorem
+
+
+QUERIES = [
+    "Latest advances in local LLM inference",
+    "What is new in vector databases",
+    "Python 3.13 free threading performance",
+    "latest advances in local LLM inference?",
+    "Recent advances in local LLM inferencing",
+    "What's new in vector databases?",
+    "Python 3.14 free threading performance",
+    "Quantum error correction progress",
+    "Progress in quantum error correction",
+    "Python 3.13 free-threading performance",
+    "Rust async runtimes comparison",
+    "Latest advances in local LLM inference",
+]
+
+
+def user_query(llm_request):
+    for content in llm_request.contents:
+        if content.role == "user":
+            return "".join(part.text or "" for part in content.parts or [])
+    return ""
+
+
+def coordinator_call(llm_request):
+    last = last_function_response(llm_request)
+    if last is None:
+        return ("ResearchAgent", {"request": user_query(llm_request)})
+    if last == "ResearchAgent":
+        return ("SummarizerAgent", {"request": "Summarize the findings"})
+    return None
+
+
+RULES = [
+    {"match": "research coordinator", "call": coordinator_call, "text": lorem(80)},
+    {"match": "Read the provided research findings", "text": lorem(80)},
+]
+
+
+def walk(agent):
+    yield agent
+    for tool in getattr(agent, "tools", []):
+        if isinstance(tool, AgentTool):
+            yield from walk(tool.agent)
+    for sub_agent in agent.sub_agents:
+        yield from walk(sub_agent)
+
+
+async def run_queries(agent, queries):
+    runner = InMemoryRunner(agent=agent, app_name="benchmark")
+    for query in queries:
+        session = await runner.session_service.create_session(app_name="benchmark", user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text=query)])
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+            pass
+
+
+def measure(agent, mode, similarity, fake_kwargs):
+    search = FakeSearch()
+    model = use_fake_model(agent, FakeLlm(
+        responder=search.responder(scripted_responder(RULES), match="specialized research agent"), **fake_kwargs
+    ))
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    callbacks = [(a, a.before_agent_callback, a.after_agent_callback, a.after_model_callback) for a in walk(agent)]
+    cache = None
+    if mode != "off":
+        cache = ResearchCache(ResearchStore(":memory:", similarity=similarity), ["ResearchAgent"], answers=mode == "answers")
+        cache.attach(agent)
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_queries(agent, QUERIES))
+    finally:
+        for a, before_agent, after_agent, after_model in callbacks:
+            a.before_agent_callback, a.after_agent_callback, a.after_model_callback = before_agent, after_agent, after_model
+    return {
+        "seconds": time.perf_counter() - start,
+        "model_calls": len(model.requests),
+        "searches": search.searches,
+        "stats": cache.stats if cache else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    parser.add_argument("--similarity", type=float, default=0.8)
+    args = parser.parse_args()
+
+    agent = importlib.import_module("research_agent.agent").root_agent
+    fake_kwargs = {"first_token_delay": args.first_token, "seconds_per_word": args.per_word}
+    print(f"{len(QUERIES)} queries, {args.first_token}s first token, {args.per_word}s/word")
+    print(f"{'cache':<10}{'seconds':>9}{'model calls':>13}{'searches':>10}{'exact hits':>12}{'near hits':>11}")
+    for mode in ("off", "findings", "answers"):
+        r = measure(agent, mode, args.similarity, fake_kwargs)
+        stats = r["stats"]
+        print(f"{mode:<10}{r['seconds']:>9.2f}{r['model_calls']:>13}{len(r['searches']):>10}"
+              f"{stats.get('exact_hits', 0):>12}{stats.get('near_hits', 0):>11}")
+    print("searched with the cache:", "; ".join(r["searches"]))
+
+
+if __name__ == "__main__":
+    main()
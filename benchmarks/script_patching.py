@@ -0,0 +1,111 @@
+"""
+Output tokens and time of the script_rewriter per loop iteration, full rewrite vs section patches.
+
+Runs youtube_script_writer's workflow on the fake model for fixture scripts of
+several lengths. The critique flags the hook in the first iteration and one
+body row in the second; the fake rewriter changes exactly those rows, sending
+the whole script back in "full" mode and only the changed sections in "patch"
+mode. Both modes have to end with the same final_script. The convergence gate
+is set to only stop on an unchanged script so both iterations run.
+
+    python -m benchmarks.script_patching [--rows 30,60,120] [--first-token 0.2] [--per-word 0.002]
+"""
+import argparse
+import asyncio
+import importlib
+
+from common.fake_llm import FakeLlm, instruction_text, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.metrics import MetricsRecorder
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.transcript_processing import estimate_tokens
+
+from .pipelines import PIPELINES, WORKFLOW_RULES, lorem, run_pipeline
+
+
+REWRITER = "Master Script Editor"
+CRITIQUE = "Ruthless YouTube Script Consultant"
+# "## Script" and the table header come first, so row i is section i + 2
+FIRST_ROW_SECTION = 3
+HOOK_ROWS = (1, 2, 3)
+
+
+def row(i, text="Line of dialogue"):
+    return f"| {text} {i} | [Visual: screen recording {i}] |"
+
+
+def script(rows, rewritten=()):
+    lines = ["## Script", "", "| Audio/Dialogue | Visual/Direction |", "|---|---|"]
+    lines += [row(i, "Punchier line" if i in rewritten else "Line of dialogue") for i in range(1, rows + 1)]
+    return "\n".join(lines + ["", "## Suggested Title", "Local LLMs in 10 minutes"]) + "\n"
+
+
+def rewriter_responder(rows, mode, outputs):
+    # Iteration 1 rewrites the hook, iteration 2 one row in the middle of the body
+    edits = [HOOK_ROWS, (rows // 2,)]
+    done = []
+
+    def respond(llm_request):
+        changed = edits[min(len(done), len(edits) - 1)]
+        done.extend(changed)
+        if mode == "full":
+            text = script(rows, rewritten=done)
+        else:
+            text = "\n".join(f"@@ S{FIRST_ROW_SECTION + i - 1}\n{row(i, 'Punchier line')}" for i in changed)
+        outputs.append(estimate_tokens(text))
+        return text
+
+    return respond
+
+
+def measure(rows, mode, fake_kwargs):
+    module_name, _, prompt, _ = PIPELINES["workflow"]
+    agent = importlib.import_module(module_name).build_workflow(mode)
+    agent.sub_agents[-1].sub_agents[-1].similarity = 1.0
+    metrics = MetricsRecorder()
+    metrics.attach(agent)
+    outputs = []
+    rules = [
+        {**rule, "text": script(rows)} if rule["match"] == "Senior YouTube Scriptwriter" else rule
+        for rule in WORKFLOW_RULES if rule["match"] not in (REWRITER, CRITIQUE)
+    ]
+    rules += [
+        {"match": CRITIQUE, "text": [f"Retention Score (0-10): 5\nThe hook is slow. {lorem(150)}",
+                                     f"Retention Score (0-10): 7\nRow {rows // 2} drags. {lorem(150)}"]},
+        {"match": REWRITER, "text": ""},
+    ]
+    respond = scripted_responder(rules)
+    rewrite = rewriter_responder(rows, mode, outputs)
+    model = use_fake_model(agent, FakeLlm(
+        responder=lambda request: rewrite(request) if REWRITER in instruction_text(request) else respond(request),
+        **fake_kwargs,
+    ))
+    use_fake_transcripts(minutes=10)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+    state = asyncio.run(run_pipeline(agent, prompt))
+    summary = next(reversed(metrics.summaries.values()))
+    seconds = next(row["model_seconds"] for row in summary if row["name"] == "script_rewriter")
+    return outputs, seconds, state["final_script"], model.stats["output_tokens"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", default="30,60,120")
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    args = parser.parse_args()
+    fake_kwargs = {"first_token_delay": args.first_token, "seconds_per_word": args.per_word}
+
+    print(f"{'rows':<6}{'mode':<7}{'iter 1 tok':>12}{'iter 2 tok':>12}{'rewrite s':>11}{'run output tok':>16}{'saved':>8}  same script")
+    for rows in (int(r) for r in args.rows.split(",")):
+        full = measure(rows, "full", fake_kwargs)
+        patch = measure(rows, "patch", fake_kwargs)
+        for mode, (outputs, seconds, final_script, run_tokens) in (("full", full), ("patch", patch)):
+            saved = 1 - sum(outputs) / sum(full[0])
+            print(f"{rows:<6}{mode:<7}{outputs[0]:>12}{outputs[1]:>12}{seconds:>11.2f}{run_tokens:>16}"
+                  f"{saved:>8.0%}  {final_script == full[2]}")
+
+
+if __name__ == "__main__":
+    main()
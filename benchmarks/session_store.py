@@ -0,0 +1,178 @@
+"""
+Memory and disk per session, and resume time, for CompactSessionService.
+
+Memory: `--sessions` runs of the youtube_script_writer workflow on the fake
+model, with the Python heap still held after the runs measured by tracemalloc.
+Compared stores are ADK's InMemorySessionService and SqliteSessionService and
+common.session_store.CompactSessionService. For the file based stores the
+database size per session is reported too.
+
+Resume: the workflow, with PipelineResume attached, crashes in the rewrite
+step. The same request is then sent again from a new process-like setup (fresh
+runner and service on the same file), and the time is compared with running
+the request again from scratch. Every output_key of the resumed session has to
+hold what the uninterrupted run produced, so a skipped step that overwrote its
+saved output is caught.
+
+    python -m benchmarks.session_store [--sessions 20] [--first-token 0.2] [--per-word 0.002]
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.sessions.sqlite_session_service import SqliteSessionService
+from google.genai import types
+
+from common.fake_llm import FakeLlm, instruction_text, scripted_responder, use_fake_model
+from common.fake_transcripts import use_fake_transcripts
+from common.model_pool import MODEL_LIMITS, configure_model
+from common.session_store import CompactSessionService, PipelineResume
+
+from .pipelines import PIPELINES
+
+
+APP = "benchmark"
+
+
+def crashing_responder(rules, crash_on):
+    """Scripted responder that raises once when the instruction contains `crash_on`."""
+    respond = scripted_responder(rules)
+    crashed = []
+
+    def responder(llm_request):
+        if crash_on in instruction_text(llm_request) and not crashed:
+            crashed.append(True)
+            raise RuntimeError("Simulated crash")
+        return respond(llm_request)
+
+    return responder
+
+
+async def run(runner, session_id, prompt):
+    message = types.Content(role="user", parts=[types.Part(text=prompt)])
+    async for _ in runner.run_async(user_id="user", session_id=session_id, new_message=message):
+        pass
+
+
+async def fill(service, agent, prompt, sessions):
+    runner = Runner(agent=agent, app_name=APP, session_service=service)
+    for _ in range(sessions):
+        session = await service.create_session(app_name=APP, user_id="user")
+        await run(runner, session.id, prompt)
+
+
+def measure_memory(name, make_service, agent, prompt, rules, sessions, fake_kwargs, tmp):
+    path = os.path.join(tmp, f"{name}.sqlite3")
+    model = use_fake_model(agent, FakeLlm(responder=scripted_responder(rules()), **fake_kwargs))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    service = make_service(path)
+    asyncio.run(fill(service, agent, prompt, sessions))
+    # Only what the session service holds on to counts
+    model.requests.clear()
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    if isinstance(service, CompactSessionService):
+        service.checkpoint()
+    disk = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return held / sessions, disk / sessions if disk else None
+
+
+def output_keys(agent):
+    """Returns the output_key of every LlmAgent under `agent`, each once."""
+    keys = [agent.output_key] if isinstance(agent, LlmAgent) and agent.output_key else []
+    for sub_agent in agent.sub_agents:
+        keys += output_keys(sub_agent)
+    return list(dict.fromkeys(keys))
+
+
+def measure_resume(agent, prompt, rules, fake_kwargs, tmp):
+    path = os.path.join(tmp, "resume.sqlite3")
+
+    async def crash_then_resume():
+        use_fake_model(agent, FakeLlm(responder=crashing_responder(rules(), "Master Script Editor"), **fake_kwargs))
+        service = CompactSessionService(path)
+        session = await service.create_session(app_name=APP, user_id="user")
+        try:
+            await run(Runner(agent=agent, app_name=APP, session_service=service), session.id, prompt)
+        except RuntimeError:
+            pass
+        service.close()
+
+        # A new service on the same file, as after a restart
+        model = use_fake_model(agent, FakeLlm(responder=scripted_responder(rules()), **fake_kwargs))
+        service = CompactSessionService(path)
+        start = time.perf_counter()
+        await run(Runner(agent=agent, app_name=APP, session_service=service), session.id, prompt)
+        resumed = time.perf_counter() - start, len(model.requests)
+        stored = await service.get_session(app_name=APP, user_id="user", session_id=session.id)
+        return resumed, stored.state
+
+    async def from_scratch():
+        model = use_fake_model(agent, FakeLlm(responder=scripted_responder(rules()), **fake_kwargs))
+        service = CompactSessionService(os.path.join(tmp, "scratch.sqlite3"))
+        session = await service.create_session(app_name=APP, user_id="user")
+        start = time.perf_counter()
+        await run(Runner(agent=agent, app_name=APP, session_service=service), session.id, prompt)
+        scratch = time.perf_counter() - start, len(model.requests)
+        stored = await service.get_session(app_name=APP, user_id="user", session_id=session.id)
+        return scratch, stored.state
+
+    resumed, resumed_state = asyncio.run(crash_then_resume())
+    scratch, scratch_state = asyncio.run(from_scratch())
+    mismatched = [key for key in output_keys(agent) if resumed_state.get(key) != scratch_state.get(key)]
+    return resumed, scratch, mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--per-word", type=float, default=0.002)
+    args = parser.parse_args()
+
+    module_name, _, prompt, rules = PIPELINES["workflow"]
+    agent = importlib.import_module(module_name).build_workflow("full")
+    use_fake_transcripts(minutes=30)
+    for model_name in MODEL_LIMITS:
+        configure_model(model_name, delay_scale=0)
+
+    stores = {
+        "InMemorySessionService": lambda path: InMemorySessionService(),
+        "SqliteSessionService": lambda path: SqliteSessionService(path),
+        "CompactSessionService": lambda path: CompactSessionService(path),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"workflow, {args.sessions} sessions, no model latency")
+        print(f"{'store':<26}{'heap KB/session':>17}{'disk KB/session':>17}")
+        for name, make_service in stores.items():
+            heap, disk = measure_memory(name, make_service, agent, prompt, rules, args.sessions, {}, tmp)
+            disk_text = f"{disk / 1024:>17.1f}" if disk else f"{'-':>17}"
+            print(f"{name:<26}{heap / 1024:>17.1f}{disk_text}")
+
+        fake_kwargs = {"first_token_delay": args.first_token, "seconds_per_word": args.per_word}
+        PipelineResume(agent).attach(agent)
+        (resume_s, resume_calls), (scratch_s, scratch_calls), mismatched = measure_resume(
+            agent, prompt, rules, fake_kwargs, tmp
+        )
+        print(f"\nworkflow crashed in the rewrite step ({args.first_token}s first token, {args.per_word}s/word)")
+        print(f"{'':<26}{'seconds':>9}{'model calls':>13}")
+        print(f"{'resume':<26}{resume_s:>9.2f}{resume_calls:>13}")
+        print(f"{'rerun from scratch':<26}{scratch_s:>9.2f}{scratch_calls:>13}")
+        if mismatched:
+            raise SystemExit(f"Outputs differ from the uninterrupted run after resume: {', '.join(mismatched)}")
+        print(f"every output_key matches the uninterrupted run: {', '.join(output_keys(agent))}")
+
+
+if __name__ == "__main__":
+    main()
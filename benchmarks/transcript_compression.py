@@ -0,0 +1,51 @@
+"""
+Reports how much compress_transcript shrinks transcripts at different token budgets.
+
+Fixture transcripts are JSON files holding a list of `[start, duration, text]`
+snippets, the format stored by the transcript cache. Without arguments a
+synthetic 20 minute and 3 hour transcript are used.
+
+    python -m benchmarks.transcript_compression [fixture.json ...] [--budgets 2000,8000]
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from common.transcript_processing import compress_transcript
+from benchmarks.transcript_parsing import make_transcript
+
+
+def load_fixtures(paths):
+    if not paths:
+        rng = random.Random(0)
+        return {"synthetic-20min": make_transcript(1 / 3, rng), "synthetic-3h": make_transcript(3, rng)}
+    fixtures = {}
+    for path in paths:
+        with open(path) as f:
+            fixtures[os.path.basename(path)] = json.load(f)
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("fixtures", nargs="*")
+    parser.add_argument("--budgets", default="2000,8000,16000")
+    args = parser.parse_args()
+
+    budgets = [int(b) for b in args.budgets.split(",")]
+    print(f"{'fixture':<24}{'budget':>8}{'original':>10}{'compressed':>12}{'saved':>8}{'chunks':>10}{'ms':>8}")
+    for name, snippets in load_fixtures(args.fixtures).items():
+        for budget in budgets:
+            start = time.perf_counter()
+            _, report = compress_transcript(snippets, budget)
+            elapsed = (time.perf_counter() - start) * 1e3
+            saved = 1 - report["compressed_tokens"] / report["original_tokens"]
+            chunks = f"{report['chunks_kept']}/{report['chunks_total']}"
+            print(f"{name:<24}{budget:>8}{report['original_tokens']:>10}{report['compressed_tokens']:>12}"
+                  f"{saved:>8.0%}{chunks:>10}{elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for video id parsing and transcript assembly in youtube_script_tool.
+
+Compares the original `split` based parser and `+=` concatenation with
+`extract_video_id` and `join_snippets`. Runs offline on synthetic data.
+
+    python -m benchmarks.transcript_parsing
+"""
+import random
+import string
+import timeit
+from types import SimpleNamespace
+
+from common.transcript_processing import join_snippets
+from common.youtube_script_tool import extract_video_id
+
+
+URL_TEMPLATES = [
+    "https://www.youtube.com/watch?v={id}",
+    "https://www.youtube.com/watch?v={id}&t=42s&list=PL123",
+    "https://m.youtube.com/watch?feature=share&v={id}",
+    "https://youtu.be/{id}",
+    "https://youtu.be/{id}?t=30",
+    "https://www.youtube.com/shorts/{id}?feature=share",
+    "https://www.youtube.com/embed/{id}?rel=0",
+    "https://www.youtube-nocookie.com/embed/{id}",
+]
+
+
+def legacy_video_id(url):
+    if url.startswith("https://youtu.be/"):
+        return url.split("/")[-1]
+    return url.split("v=")[-1].split("&")[0]
+
+
+def legacy_join(fetched_transcript):
+    result = ""
+    for snippet in fetched_transcript:
+        result += snippet.text
+    return result
+
+
+def make_urls(count, rng):
+    alphabet = string.ascii_letters + string.digits + "-_"
+    urls = []
+    for i in range(count):
+        vid_id = "".join(rng.choice(alphabet) for _ in range(11))
+        urls.append((vid_id, URL_TEMPLATES[i % len(URL_TEMPLATES)].format(id=vid_id)))
+    return urls
+
+
+def make_transcript(hours, rng):
+    # Auto captions emit roughly one snippet every 2-3 seconds
+    words = ["agent", "model", "tool", "prompt", "token", "latency", "cache", "video", "the", "and", "so"]
+    snippets, start = [], 0.0
+    while start < hours * 3600:
+        duration = rng.uniform(1.5, 3.5)
+        snippets.append([start, duration, " ".join(rng.choice(words) for _ in range(rng.randint(4, 9)))])
+        start += duration
+    return snippets
+
+
+def main():
+    rng = random.Random(0)
+    urls = make_urls(10_000, rng)
+    legacy_wrong = sum(legacy_video_id(url) != vid_id for vid_id, url in urls)
+    new_wrong = sum(extract_video_id(url) != vid_id for vid_id, url in urls)
+
+    legacy_urls = min(timeit.repeat(lambda: [legacy_video_id(url) for _, url in urls], number=1, repeat=5))
+    new_urls = min(timeit.repeat(lambda: [extract_video_id(url) for _, url in urls], number=1, repeat=5))
+    print(f"10k urls   legacy {legacy_urls * 1e3:7.2f} ms ({legacy_wrong} wrong ids)"
+          f" | extract_video_id {new_urls * 1e3:7.2f} ms ({new_wrong} wrong ids)")
+
+    snippets = make_transcript(3, rng)
+    fetched = [SimpleNamespace(start=s, duration=d, text=t) for s, d, t in snippets]
+    legacy_text = legacy_join(fetched)
+    legacy_time = min(timeit.repeat(lambda: legacy_join(fetched), number=10, repeat=5)) / 10
+    join_time = min(timeit.repeat(lambda: join_snippets(snippets), number=10, repeat=5)) / 10
+    ts_time = min(timeit.repeat(lambda: join_snippets(snippets, timestamps=True), number=10, repeat=5)) / 10
+    print(f"3h transcript ({len(snippets)} snippets) legacy += {legacy_time * 1e3:6.2f} ms"
+          f" ({len(legacy_text.split())} words) | join_snippets {join_time * 1e3:6.2f} ms"
+          f" ({len(join_snippets(snippets).split())} words) | with timestamps {ts_time * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
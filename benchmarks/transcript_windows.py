@@ -0,0 +1,73 @@
+"""
+Tokens handed to the model and time to the first text for the transcript tool modes.
+
+For synthetic videos of several lengths, with a simulated fetch latency and a
+fresh transcript cache for every mode, compares:
+
+    full: get_subtitles with the default token budget;
+    hook: get_subtitles_range for the first 60 seconds;
+    sampled: get_subtitles_range with 5 sampled 60 second windows;
+    stream: the first window of stream_subtitles, and all of them.
+
+    python -m benchmarks.transcript_windows [--minutes 10,30,90] [--latency 0.3]
+"""
+import argparse
+import asyncio
+import time
+
+from common import youtube_script_tool
+from common.fake_transcripts import use_fake_transcripts
+from common.transcript_processing import estimate_tokens
+
+
+URL = "https://www.youtube.com/watch?v=CKS1glzmDVc"
+
+
+async def first_and_all(url):
+    start = time.perf_counter()
+    first = None
+    windows = []
+    async for window in youtube_script_tool.stream_subtitles(url):
+        if first is None:
+            first = time.perf_counter() - start
+        windows.append(window)
+    return first, time.perf_counter() - start, windows
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = asyncio.run(function(*args, **kwargs))
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--minutes", default="10,30,90")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per transcript fetch")
+    args = parser.parse_args()
+
+    print(f"fetch latency {args.latency}s")
+    print(f"{'video':<8}{'mode':<16}{'tokens':>8}{'seconds':>9}")
+    for minutes in (float(m) for m in args.minutes.split(",")):
+        video = f"{minutes:g}min"
+        use_fake_transcripts(minutes=minutes, latency=args.latency)
+        result, seconds = timed(youtube_script_tool.get_subtitles, URL)
+        print(f"{video:<8}{'full':<16}{result['compressed_tokens']:>8}{seconds:>9.3f}")
+
+        use_fake_transcripts(minutes=minutes, latency=args.latency)
+        result, seconds = timed(youtube_script_tool.get_subtitles_range, URL)
+        print(f"{video:<8}{'hook':<16}{result['tokens']:>8}{seconds:>9.3f}")
+
+        use_fake_transcripts(minutes=minutes, latency=args.latency)
+        result, seconds = timed(youtube_script_tool.get_subtitles_range, URL, samples=5)
+        print(f"{video:<8}{'sampled':<16}{result['tokens']:>8}{seconds:>9.3f}")
+
+        use_fake_transcripts(minutes=minutes, latency=args.latency)
+        first, total, windows = asyncio.run(first_and_all(URL))
+        tokens = [estimate_tokens(window["text"]) for window in windows]
+        print(f"{video:<8}{'stream (first)':<16}{tokens[0]:>8}{first:>9.3f}")
+        print(f"{video:<8}{'stream (all)':<16}{sum(tokens):>8}{total:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
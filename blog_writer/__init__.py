@@ -1 +1,11 @@
-from . import agent
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # The agents are built on the first access to root_agent, not when the
+    # package is imported. Only importers that never touch root_agent save
+    # anything: ADK's loader reads it right after the import
+    if name in ("agent", "root_agent"):
+        agent = importlib.import_module(f"{__name__}.agent")
+        return agent if name == "agent" else agent.root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
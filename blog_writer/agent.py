@@ -1,22 +1,23 @@
-from google.adk.agents import Agent, SequentialAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools import AgentTool, FunctionTool, google_search
+import os
+
+from google.adk.agents import Agent, BaseAgent, ParallelAgent, SequentialAgent
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
 from google.genai import types
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504]
-)
+from common.metrics import enable_metrics
+from common.model_pool import get_model
+from common.response_cache import enable_response_cache
+from common.session_store import enable_resume
+
+# "sequential" runs outline -> writer -> editor, "parallel" writes the
+# sections of the outline concurrently and merges them before editing
+PIPELINE_MODE = os.environ.get("BLOG_PIPELINE_MODE", "sequential")
 
 
 outline_agent = Agent(
     name="OutlineAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config,
-    ),
+    model=get_model("gemini-2.5-flash"),
     instruction="""Create a blog outline for the given topic with:
     1. A catchy headline
     2. An introduction hook
@@ -24,37 +25,122 @@ outline_agent = Agent(
     4. A concluding thought""",
     output_key="outline"
 )
-print("Outline Agnet created!!")
 
 
 writerAgent=Agent(
     name="WriterAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash"),
     instruction="""Following this outline: {outline}
     Write a brief, 200 to 300-word blog post with an engaging and informative tone.""",
     output_key="blog_draft"
 )
-print("Writer Agent Created")
 
 
 editorAgent=Agent(
-    name="WriterAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config,
-    ),
+    name="EditorAgent",
+    model=get_model("gemini-2.5-flash"),
     instruction="""Edit this draft: {blog_draft}
     Your task is to polish the text by fixing any grammatical errors, 
     improving the flow and sentence structure, and enhancing overall clarity.""",
     output_key="final_blog"
 )
-print("Editor Agent Created!!")
 
 
-root_agent=SequentialAgent(
-    name="BlogPipeline",
-    sub_agents=[outline_agent, writerAgent, editorAgent]
-)
\ No newline at end of file
+class MergeSectionsAgent(BaseAgent):
+    """Joins the state values in `input_keys` into `output_key` without calling a model."""
+
+    input_keys: list[str]
+    output_key: str
+
+    async def _run_async_impl(self, ctx):
+        sections = [ctx.session.state.get(key, "").strip() for key in self.input_keys]
+        merged = "\n\n".join(section for section in sections if section)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: merged}),
+        )
+
+
+# Each part is roughly a third of the post, so every writer produces a third of
+# the output tokens and the parts are generated at the same time
+SECTION_PARTS = [
+    "the headline, the introduction hook and the first main section",
+    "the main sections between the first and the last one (skip this part and output nothing if there are fewer than 3 main sections)",
+    "the last main section and the concluding thought",
+]
+
+section_writers = [
+    writerAgent.clone({
+        "name": f"SectionWriter{i}",
+        "instruction": f"""Following this outline: {{outline}}
+    Write only {part} of a brief, 200 to 300-word blog post with an engaging and informative tone.
+    Other writers write the remaining parts at the same time, so do not add an introduction or a conclusion of your own.
+    Output the text of your part only, with the section headings from the outline.""",
+        "output_key": f"blog_part_{i}",
+    })
+    for i, part in enumerate(SECTION_PARTS, start=1)
+]
+
+
+def build_pipeline(mode=PIPELINE_MODE):
+    """
+    Returns a new blog pipeline for `mode`, either "sequential" or "parallel".
+
+    The agents are cloned because an ADK agent can only belong to one pipeline.
+    """
+    if mode == "sequential":
+        return SequentialAgent(
+            name="BlogPipeline",
+            sub_agents=[outline_agent.clone(), writerAgent.clone(), editorAgent.clone()]
+        )
+    if mode == "parallel":
+        return SequentialAgent(
+            name="BlogPipeline",
+            sub_agents=[
+                outline_agent.clone(),
+                ParallelAgent(name="SectionWriters", sub_agents=[writer.clone() for writer in section_writers]),
+                MergeSectionsAgent(
+                    name="MergeSections",
+                    input_keys=[writer.output_key for writer in section_writers],
+                    output_key="blog_draft",
+                ),
+                editorAgent.clone(),
+            ]
+        )
+    raise ValueError(f"Unknown BLOG_PIPELINE_MODE {mode!r}, expected 'sequential' or 'parallel'")
+
+
+async def stream_blog(topic, agent=None):
+    """
+    Runs the blog pipeline for `topic` and yields `(agent_name, text)` chunks as the model produces them.
+
+    Chunks of sections written in parallel interleave, the agent name tells them apart.
+    """
+    # Only needed when running outside of adk, so not imported with the module
+    from google.adk.runners import InMemoryRunner
+
+    runner = InMemoryRunner(agent=agent or root_agent, app_name="blog_writer")
+    session = await runner.session_service.create_session(app_name="blog_writer", user_id="user")
+    message = types.Content(role="user", parts=[types.Part(text=topic)])
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+    async for event in runner.run_async(
+        user_id="user", session_id=session.id, new_message=message, run_config=run_config
+    ):
+        if event.partial and event.content and event.content.parts:
+            text = "".join(part.text or "" for part in event.content.parts)
+            if text:
+                yield event.author, text
+
+
+root_agent = build_pipeline()
+
+# With PIPELINE_RESUME=1, sending the same request again after a failure skips the steps that finished
+resume = enable_resume(root_agent)
+
+# Replays unchanged steps from disk when LLM_RESPONSE_CACHE names them
+response_cache = enable_response_cache(root_agent)
+
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
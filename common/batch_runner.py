@@ -0,0 +1,184 @@
+"""
+Runs a root_agent over every line of a JSONL file with a bounded number of concurrent sessions.
+
+    python -m common.batch_runner blog_writer topics.jsonl blogs.jsonl --concurrency 8 --state-keys final_blog
+
+Each input line is a JSON object with a "prompt" and optionally an "id" (the
+line number is used otherwise). Every finished item is appended to the output
+file as soon as it completes:
+
+    {"id": ..., "prompt": ..., "status": "success", "text": ..., "state": {...},
+     "seconds": ..., "started_at": ..., "finished_at": ...}
+
+The output file doubles as the checkpoint: on start, items that already have a
+successful line in it are skipped, so rerunning the same command after a crash
+continues where it stopped. Failed items are retried on the next run.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import time
+
+from google.genai import types
+
+
+def read_items(path):
+    """Returns the input items of a JSONL file, giving each one an id."""
+    items = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "prompt" not in item:
+                raise ValueError(f"{path}:{number} has no 'prompt'")
+            item.setdefault("id", number)
+            items.append(item)
+    return items
+
+
+def completed_ids(output_path):
+    """Returns the ids that already have a successful result in `output_path`."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Line cut short by a crash, the item runs again
+                continue
+            if result.get("status") == "success":
+                done.add(result["id"])
+    return done
+
+
+def load_agent(spec):
+    """Returns the root_agent of a module or package such as "blog_writer" or "youtube_script_writer.agent_lite"."""
+    return importlib.import_module(spec).root_agent
+
+
+class BatchRunner:
+    """
+    Runs one agent over many inputs, `concurrency` sessions at a time.
+
+    Args:
+        agent: Root agent to run.
+        output_path: JSONL file results are appended to, also used to resume.
+        concurrency: Maximum number of sessions running at once.
+        state_keys: Session state keys copied into each result.
+        timeout: Seconds an item may run before it is recorded as failed, or None.
+    """
+
+    def __init__(self, agent, output_path, concurrency=4, state_keys=(), timeout=None):
+        # Imported here so `python -m common.batch_runner --help` stays fast
+        from google.adk.runners import InMemoryRunner
+
+        self.agent = agent
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.state_keys = list(state_keys)
+        self.timeout = timeout
+        self.runner = InMemoryRunner(agent=agent, app_name="batch")
+        self._output = None
+        self._write_lock = asyncio.Lock()
+
+    async def _run_item(self, item):
+        service = self.runner.session_service
+        session_id = (await service.create_session(app_name="batch", user_id="batch")).id
+        message = types.Content(role="user", parts=[types.Part(text=item["prompt"])])
+        text = ""
+        try:
+            async for event in self.runner.run_async(user_id="batch", session_id=session_id, new_message=message):
+                if event.content and event.content.parts and not event.partial:
+                    event_text = "".join(part.text or "" for part in event.content.parts if not part.thought)
+                    if event_text:
+                        text = event_text
+            session = await service.get_session(app_name="batch", user_id="batch", session_id=session_id)
+            return text, {key: session.state.get(key) for key in self.state_keys}
+        finally:
+            # Finished sessions, failed and timed out ones included, are not
+            # needed again, keep memory flat over long batches
+            await service.delete_session(app_name="batch", user_id="batch", session_id=session_id)
+
+    async def _process(self, item):
+        started_at = time.time()
+        start = time.perf_counter()
+        result = {"id": item["id"], "prompt": item["prompt"]}
+        try:
+            text, state = await asyncio.wait_for(self._run_item(item), self.timeout)
+            result.update(status="success", text=text, state=state)
+        except Exception as e:
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+        result.update(seconds=time.perf_counter() - start, started_at=started_at, finished_at=time.time())
+        # fsync waits for the disk, so it runs in a thread; the lock keeps the lines whole and in order
+        async with self._write_lock:
+            await asyncio.to_thread(self._write, result)
+        return result
+
+    def _write(self, result):
+        self._output.write(json.dumps(result, default=str) + "\n")
+        # Flushed per item so a crash loses at most the items still running
+        self._output.flush()
+        os.fsync(self._output.fileno())
+
+    async def run(self, items):
+        """
+        Runs every item not already completed in the output file.
+
+        Returns:
+            A summary with the item counts, wall time and throughput of this run.
+        """
+        done = completed_ids(self.output_path)
+        pending = [item for item in items if item["id"] not in done]
+        queue = asyncio.Queue()
+        for item in pending:
+            queue.put_nowait(item)
+        results = []
+
+        async def worker():
+            while not queue.empty():
+                results.append(await self._process(queue.get_nowait()))
+
+        start = time.perf_counter()
+        with open(self.output_path, "a") as self._output:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)) or 1)))
+        seconds = time.perf_counter() - start
+
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        return {
+            "items": len(items),
+            "skipped": len(items) - len(pending),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "seconds": seconds,
+            "items_per_second": len(results) / seconds if seconds else 0.0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("agent", help='Module or package with a root_agent, e.g. "blog_writer"')
+    parser.add_argument("input", help="JSONL file of {\"id\", \"prompt\"} objects")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--state-keys", default="", help="Comma separated session state keys to keep")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds per item")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        load_agent(args.agent),
+        args.output,
+        concurrency=args.concurrency,
+        state_keys=[key for key in args.state_keys.split(",") if key],
+        timeout=args.timeout,
+    )
+    summary = asyncio.run(runner.run(read_items(args.input)))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Opt-in Gemini context caching of the static instruction prefixes.
+
+Agents that keep their fixed preamble in `static_instruction` and only the
+state dependent part in `instruction` send the same system instruction on
+every call; ADK puts the filled in `instruction` after the conversation so far.
+With a ContextCacheConfig on the App, ADK stores that prefix (system
+instruction, tools and the conversation up to the agent's previous answer) as
+an explicit Gemini cached content with a TTL. The next call of the same agent,
+in the next loop iteration or the next turn of the session, reuses it: the
+prefix is billed at the cached token rate and only the tail at the full rate.
+
+Enable it with CONTEXT_CACHE; `adk web` then serves the module's `app`
+instead of its root_agent:
+
+    CONTEXT_CACHE=1 CONTEXT_CACHE_TTL=300 CONTEXT_CACHE_INTERVALS=10 adk web
+
+Gemini only caches prefixes of at least 2048 tokens (4096 for Gemini 3) and
+ADK creates a cache on the second call of an agent at the earliest. When a
+cache can not be created the call goes out uncached, and a call whose cached
+content is gone before its expire time is sent again once without it.
+Models other than Gemini ignore the config. The cached tokens of each call
+and the storage cost of the caches it creates are in common.metrics.
+"""
+import os
+
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.apps import App
+from google.genai import errors
+
+
+# Errors of a request whose cached content expired early or was deleted
+_STALE_CACHE_CODES = {400, 403, 404}
+
+
+def copy_request(llm_request, **update):
+    """
+    Returns a copy of `llm_request` that can be changed without touching the original.
+
+    The Gemini cache manager removes the cached system instruction, tools and
+    contents from the request it is given, so retries and other models have to
+    start from a copy. Only the parts it changes are copied.
+    """
+    config = llm_request.config.model_copy() if llm_request.config else None
+    return llm_request.model_copy(update={"config": config, "contents": list(llm_request.contents), **update})
+
+
+def with_cache_fallback(generate):
+    """
+    Wraps a Gemini `generate(llm_request, stream)` for requests with a cache config.
+
+    Every call works on its own copy of the request, and a call that fails on
+    its cached content before anything was yielded is sent again without caching.
+    The final response of such a call has the error code in
+    `custom_metadata["cache_fallback"]`.
+    """
+
+    async def generate_with_fallback(llm_request, stream=False):
+        request = copy_request(llm_request)
+        yielded = False
+        try:
+            async for response in generate(request, stream):
+                yielded = True
+                yield response
+            return
+        except errors.ClientError as e:
+            cached_content = request.config.cached_content if request.config else None
+            if yielded or not cached_content or e.code not in _STALE_CACHE_CODES:
+                raise
+            code = e.code
+        uncached = copy_request(llm_request, cache_config=None, cache_metadata=None)
+        async for response in generate(uncached, stream):
+            if not response.partial:
+                response.custom_metadata = {**(response.custom_metadata or {}), "cache_fallback": code}
+            yield response
+
+    return generate_with_fallback
+
+
+def cache_config():
+    """
+    Returns the ContextCacheConfig of the environment, or None unless CONTEXT_CACHE is set.
+
+    CONTEXT_CACHE_TTL is the lifetime of a cache in seconds (300 by default),
+    CONTEXT_CACHE_INTERVALS the number of invocations it is reused for (10) and
+    CONTEXT_CACHE_MIN_TOKENS the prompt tokens of the agent's previous call
+    below which no cache is made (0).
+    """
+    if os.environ.get("CONTEXT_CACHE", "0") == "0":
+        return None
+    return ContextCacheConfig(
+        ttl_seconds=int(os.environ.get("CONTEXT_CACHE_TTL", 300)),
+        cache_intervals=int(os.environ.get("CONTEXT_CACHE_INTERVALS", 10)),
+        min_tokens=int(os.environ.get("CONTEXT_CACHE_MIN_TOKENS", 0)),
+    )
+
+
+def enable_context_cache(root_agent, app_name, config=None):
+    """
+    Wraps `root_agent` in an App with context caching.
+
+    `app_name` has to be the name of the agent's directory for `adk web`.
+    Without `config` the CONTEXT_CACHE environment variables are used, and
+    nothing is made when CONTEXT_CACHE is unset, so caching stays opt-in.
+
+    Returns:
+        The App, or None if caching is disabled.
+    """
+    config = config or cache_config()
+    if config is None:
+        return None
+    return App(name=app_name, root_agent=root_agent, context_cache_config=config)
@@ -0,0 +1,143 @@
+"""
+Near-duplicate index of short texts on top of DiskCache.
+
+Entries are keyed by a kind ("answer", "story", ...) and the normalized text
+(lowercase, punctuation dropped, and whatever else the `normalize` function of
+the index drops). A lookup returns the entry of the exact text or of the most
+similar one above `similarity`.
+
+Near-duplicates are found with MinHash signatures of the text's character
+shingles, indexed with locality sensitive hashing bands, and accepted above
+`similarity` estimated Jaccard. Texts whose numbers differ ("python 3.13" and
+"python 3.14") never match.
+
+    index = DedupIndex(":memory:", table="stories")
+    index.store("story", text, title=title)
+    index.lookup("story", other_text)  # {"match": "near", "similarity": 0.86, "title": ..., ...}
+"""
+import hashlib
+import random
+import re
+import struct
+
+from .disk_cache import DiskCache
+
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+SHINGLE_SIZE = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def normalize_text(text:str, stopwords=frozenset()):
+    """Returns the words of `text` that are not in `stopwords`, lowercased and joined by single spaces."""
+    words = _WORD_RE.findall(text.lower().replace("'", ""))
+    return " ".join(word for word in words if word not in stopwords)
+
+
+def _numbers(normalized):
+    return {word for word in normalized.split() if any(c.isdigit() for c in word)}
+
+
+def minhash(normalized:str):
+    """Returns the MinHash signature of the character shingles of a normalized text."""
+    text = f" {normalized} "
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    hashes = [struct.unpack("<Q", hashlib.blake2b(s.encode(), digest_size=8).digest())[0] for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def _bands(kind, signature):
+    rows = len(signature) // BANDS
+    return [
+        f"{kind}:{band}:" + hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+class DedupIndex(DiskCache):
+    """
+    DiskCache of entries keyed by text, with a near-duplicate index.
+
+    Args:
+        path: Location of the SQLite file. Use ":memory:" to keep everything in RAM.
+        ttl: Seconds an entry stays valid. None disables expiry.
+        similarity: Minimum estimated Jaccard similarity of a near-duplicate text.
+        max_entries: Maximum number of entries kept on disk.
+        table: Name of the SQLite table; the bands go to `<table>_bands`.
+        normalize: Function that turns a text into the words it is keyed and compared by.
+    """
+
+    def __init__(self, path, ttl=None, similarity=0.8, max_entries=5000, table="dedup", normalize=normalize_text):
+        super().__init__(path, ttl=ttl, max_entries=max_entries, memory_entries=256, table=table)
+        self.similarity = similarity
+        self.normalize = normalize
+
+    def _connect(self):
+        if self._conn is None:
+            conn = super()._connect()
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table}_bands (band TEXT NOT NULL, key TEXT NOT NULL)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_bands_band ON {self.table}_bands(band)")
+        return self._conn
+
+    def _evict(self, conn):
+        super()._evict(conn)
+        conn.execute(f"DELETE FROM {self.table}_bands WHERE key NOT IN (SELECT key FROM {self.table})")
+
+    def lookup(self, kind, text):
+        """
+        Returns the entry of `kind` for `text` or a near-duplicate of it, or None.
+
+        The entry is a dictionary with the original "query", "match" ("exact"
+        or "near"), the estimated "similarity" and what was stored for it.
+        """
+        normalized = self.normalize(text)
+        if not normalized:
+            return None
+        entry = self.get(f"{kind}:{normalized}")
+        if entry is not None:
+            return {**entry, "match": "exact", "similarity": 1.0}
+
+        signature = minhash(normalized)
+        bands = _bands(kind, signature)
+        with self._lock:
+            keys = {row[0] for row in self._connect().execute(
+                f"SELECT DISTINCT key FROM {self.table}_bands WHERE band IN ({','.join('?' * len(bands))})", bands
+            )}
+        best = None
+        numbers = _numbers(normalized)
+        for key in keys:
+            candidate = self.get(key)
+            if candidate is None or _numbers(candidate["normalized"]) != numbers:
+                continue
+            score = similarity(signature, candidate["signature"])
+            if score >= self.similarity and (best is None or score > best["similarity"]):
+                best = {**candidate, "match": "near", "similarity": score}
+        return best
+
+    def store(self, kind, text, **values):
+        """Stores `values` for `text` and indexes it for near-duplicate lookups."""
+        normalized = self.normalize(text)
+        if not normalized:
+            return
+        key = f"{kind}:{normalized}"
+        signature = minhash(normalized)
+        self.set(key, {"query": text, "normalized": normalized, "signature": signature, **values})
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(f"DELETE FROM {self.table}_bands WHERE key = ?", (key,))
+                conn.executemany(
+                    f"INSERT INTO {self.table}_bands (band, key) VALUES (?, ?)",
+                    [(band, key) for band in _bands(kind, signature)],
+                )
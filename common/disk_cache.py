@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "agents")
+
+
+class DiskCache:
+    """
+    Two level key/value cache: an in-process LRU in front of a SQLite file.
+
+    The SQLite file lets entries survive restarts and be shared by every agent
+    run on the machine. Entries older than `ttl` seconds are treated as missing, and the disk store
+    is trimmed to `max_entries` rows (oldest first) whenever it grows past it.
+
+    Values can be anything JSON serializable. The LRU layer keeps the decoded
+    object so memory hits skip deserialization entirely.
+
+    Args:
+        path: Location of the SQLite file. Use ":memory:" to keep everything in RAM.
+        ttl: Seconds an entry stays valid. None disables expiry.
+        max_entries: Maximum number of rows kept on disk.
+        memory_entries: Maximum number of values held in the LRU layer.
+        table: Name of the SQLite table, so several caches can share one file.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=2000, memory_entries=64, table="entries"):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.table = table
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # Opened lazily so importing an agent never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created ON {self.table}(created)")
+        return self._conn
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached value or None if it is missing or expired."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._connect().execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and not self._expired(row[1]):
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.stats["disk_hits"] += 1
+                return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        """Stores a value in both layers and evicts old rows if needed."""
+        created = time.time()
+        encoded = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._remember(key, value, created)
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                    (key, encoded, created),
+                )
+                self._evict(conn)
+
+    def _evict(self, conn):
+        removed = 0
+        if self.ttl is not None:
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl,)
+            ).rowcount
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_entries:
+            removed += conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        self.stats["evictions"] += removed
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Returns the cached value for `key`, calling `fetch(key)` on a miss.
+
+        Empty results from `fetch` are not cached so they are retried on the next call.
+        """
+        value = self.get(key)
+        if value is None:
+            value = fetch(key)
+            if value:
+                self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            with conn:
+                conn.execute(f"DELETE FROM {self.table}")
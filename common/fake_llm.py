@@ -0,0 +1,370 @@
+"""
+Local stand-in for Gemini so pipelines can be run and timed without network access.
+
+    from common.fake_llm import FakeLlm, scripted_responder, use_fake_model
+    model = use_fake_model(root_agent, first_token_delay=0.5, seconds_per_word=0.01)
+    ...
+    print(model.stats)
+
+Requests with a context cache config (common.context_cache) go through ADK's
+Gemini cache manager backed by a FakeCacheService, so cache creation, reuse
+and the cached token counts follow the same rules as on Gemini.
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.gemini_context_cache_manager import GeminiContextCacheManager
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+from google.genai import errors, types
+from pydantic import Field, PrivateAttr
+
+from .context_cache import copy_request
+from .model_pool import ScheduledModel, get_scheduler
+from .model_router import RoutedModel
+from .transcript_processing import estimate_tokens
+
+
+_ERROR_STATUS = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE", 504: "DEADLINE_EXCEEDED"}
+
+
+def instruction_text(llm_request):
+    """Returns the system instruction of a request as a plain string."""
+    instruction = llm_request.config.system_instruction
+    if instruction is None:
+        return ""
+    if isinstance(instruction, str):
+        return instruction
+    if isinstance(instruction, types.Content):
+        return "".join(part.text or "" for part in instruction.parts or [])
+    return str(instruction)
+
+
+def request_text(llm_request):
+    """Returns the instruction and every text and function response of a request as one string."""
+    texts = [instruction_text(llm_request)]
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                texts.append(part.text)
+            elif part.function_response:
+                texts.append(str(part.function_response.response))
+            elif part.function_call:
+                texts.append(f"{part.function_call.name}({part.function_call.args})")
+    return "\n".join(texts)
+
+
+def last_function_response(llm_request):
+    """Returns the name of the tool whose response ends the conversation, or None."""
+    # An agent with a static instruction gets its other instruction after the response
+    for content in reversed(llm_request.contents):
+        for part in content.parts or []:
+            if part.function_response:
+                return part.function_response.name
+        if content.role != "user":
+            break
+    return None
+
+
+def default_responder(llm_request):
+    first_line = next((line.strip() for line in instruction_text(llm_request).splitlines() if line.strip()), "")
+    return f"Fake response to: {first_line[:80]}"
+
+
+def function_call(name, args=None):
+    """Builds a model response that calls the tool `name`."""
+    return LlmResponse(content=types.Content(
+        role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args or {}))]
+    ))
+
+
+def scripted_responder(rules, fallback=default_responder):
+    """
+    Returns a responder that answers according to the first rule whose "match"
+    string appears in the request's system instruction.
+
+    Each rule is a dictionary with:
+        match: Substring of the agent's instruction that selects the rule.
+        text: Response text, a list of texts returned in turn (the last one repeats),
+            or a function of the LlmRequest returning the text.
+        call: Optional `(tool_name, args)` the agent calls before answering, or a
+            function of the LlmRequest returning one or None. The text is returned
+            once the tool's response is in the conversation.
+    """
+    turns = {}
+
+    def respond(llm_request):
+        instruction = instruction_text(llm_request)
+        for i, rule in enumerate(rules):
+            if rule["match"] in instruction:
+                break
+        else:
+            return fallback(llm_request)
+
+        call = rule.get("call")
+        if callable(call):
+            call = call(llm_request)
+        if call and last_function_response(llm_request) != call[0]:
+            return function_call(*call)
+
+        text = rule["text"]
+        if isinstance(text, list):
+            turn = turns.get(i, 0)
+            turns[i] = turn + 1
+            text = text[min(turn, len(text) - 1)]
+        elif callable(text):
+            text = text(llm_request)
+        return text
+
+    return respond
+
+
+class FakeCacheService:
+    """
+    In-memory stand-in for the genai client's cached content API.
+
+    `entries` maps each cache name to its "model", "tokens", "created",
+    "expire_time" and "deleted" (None while it exists).
+    """
+
+    vertexai = False
+
+    def __init__(self):
+        self.entries = {}
+        self.aio = SimpleNamespace(caches=self)
+
+    async def create(self, model, config):
+        # The config has the system instruction and contents where a request has them
+        tokens = estimate_tokens(request_text(SimpleNamespace(config=config, contents=config.contents or [])))
+        created = time.time()
+        expire_time = created + float(config.ttl.rstrip("s"))
+        name = f"cachedContents/fake-{len(self.entries) + 1}"
+        self.entries[name] = {"model": model, "tokens": tokens, "created": created, "expire_time": expire_time, "deleted": None}
+        return types.CachedContent(
+            name=name,
+            model=model,
+            expire_time=datetime.fromtimestamp(expire_time, timezone.utc),
+            usage_metadata=types.CachedContentUsageMetadata(total_token_count=tokens),
+        )
+
+    async def delete(self, name):
+        self.entries[name]["deleted"] = time.time()
+
+
+class FakeLlm(BaseLlm):
+    """
+    BaseLlm that answers from a Python function after a simulated delay.
+
+    The delay of a call is `first_token_delay` plus `seconds_per_word` for every
+    word of the response, both multiplied by the model's entry in `delay_factors`
+    so a pro model can be made slower than a flash one. With stream=True the words are yielded as partial
+    responses as they are "generated", followed by the aggregated final one.
+    Token counts are estimated from the text and reported in usage_metadata.
+
+    Calls fail with a Gemini `APIError` for the first `fail_first` calls and then
+    with probability `error_rate`, using a code from `error_codes`. Failed calls
+    are retried like the genai client does when `retry_options` is set, with the
+    backoff multiplied by `retry_delay_scale` so benchmarks do not wait for real.
+    The number of retries a response needed is in its `custom_metadata["retries"]`.
+
+    With `quota` set, the model also behaves like a rate limited endpoint: calls
+    beyond `quota` accepted requests per `quota_window` seconds fail with 429,
+    counted across every copy of the model. With `scheduled` set, calls go through
+    the shared ModelScheduler of the model name like PooledGemini's do.
+
+    Copies made with `model_copy` share `requests`, `stats` and `context_caches`,
+    so use_fake_model can keep each agent's model name while counting every call
+    in one place.
+
+    Args:
+        responder: Function called with the LlmRequest that returns the response text or an LlmResponse.
+        first_token_delay: Seconds before the first word is produced.
+        seconds_per_word: Seconds per generated word.
+        error_rate: Probability that a call fails.
+        error_codes: HTTP codes the injected errors use.
+        fail_first: Number of calls that fail before any succeeds.
+        retry_options: HttpRetryOptions to emulate, usually the ones of the replaced Gemini model.
+        retry_delay_scale: Multiplier for the emulated retry backoff.
+        seed: Seed for the error injection.
+        quota: Accepted requests per `quota_window`, or None for no limit.
+        quota_window: Length of the quota window in seconds.
+        scheduled: Whether calls go through common.model_pool's scheduler.
+        delay_factors: Model name -> multiplier of `first_token_delay` and `seconds_per_word`.
+    """
+
+    model: str = "fake-gemini"
+    responder: Callable = default_responder
+    first_token_delay: float = 0.0
+    seconds_per_word: float = 0.0
+    error_rate: float = 0.0
+    error_codes: list[int] = Field(default_factory=lambda: [429, 503])
+    fail_first: int = 0
+    retry_options: Optional[types.HttpRetryOptions] = None
+    retry_delay_scale: float = 0.0
+    seed: int = 0
+    quota: Optional[int] = None
+    quota_window: float = 60.0
+    scheduled: bool = False
+    delay_factors: dict = Field(default_factory=dict)
+    requests: list = Field(default_factory=list)
+    accepted: list = Field(default_factory=list)
+    context_caches: FakeCacheService = Field(default_factory=FakeCacheService)
+    stats: dict = Field(default_factory=lambda: {
+        "calls": 0, "errors": 0, "retries": 0, "tool_calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+        "output_tokens": 0, "quota_errors": 0,
+    })
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, context):
+        self._rng = random.Random(self.seed)
+
+    def _over_quota(self):
+        if self.quota is None:
+            return False
+        now = time.monotonic()
+        # `accepted` is shared by every copy, like a per-project quota
+        while self.accepted and self.accepted[0] < now - self.quota_window:
+            self.accepted.pop(0)
+        if len(self.accepted) >= self.quota:
+            return True
+        self.accepted.append(now)
+        return False
+
+    def _injected_error(self):
+        self.stats["calls"] += 1
+        code = None
+        if self.stats["calls"] <= self.fail_first or self._rng.random() < self.error_rate:
+            code = self._rng.choice(self.error_codes)
+        elif self._over_quota():
+            self.stats["quota_errors"] += 1
+            code = 429
+        if code is None:
+            return None
+        self.stats["errors"] += 1
+        status = _ERROR_STATUS.get(code, "UNKNOWN")
+        body = {"error": {"code": code, "message": "Injected by FakeLlm", "status": status}}
+        return errors.ClientError(code, body) if code < 500 else errors.ServerError(code, body)
+
+    async def _call_with_retries(self):
+        options = self.retry_options
+        attempts = (options.attempts or 5) if options else 1
+        retry_codes = set(options.http_status_codes or _ERROR_STATUS) if options else set()
+        for attempt in range(attempts):
+            error = self._injected_error()
+            if error is None:
+                return attempt
+            if attempt == attempts - 1 or error.code not in retry_codes:
+                raise error
+            self.stats["retries"] += 1
+            delay = (options.initial_delay or 1.0) * (options.exp_base or 2) ** attempt
+            await asyncio.sleep(delay * self.retry_delay_scale)
+
+    def for_model(self, model_name):
+        """Returns a scheduled copy answering as `model_name`, the fake counterpart of get_model."""
+        return self.model_copy(update={"model": model_name, "scheduled": True})
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if self.scheduled:
+            responses = get_scheduler(self.model).generate(self._generate, llm_request, stream)
+        else:
+            responses = self._generate(llm_request, stream)
+        async for response in responses:
+            yield response
+
+    async def _context_cache(self, llm_request):
+        # The cache manager strips what the cache holds from the request it gets,
+        # so it works on a copy and the responder still sees the whole request
+        request = copy_request(llm_request)
+        metadata = await GeminiContextCacheManager(self.context_caches).handle_context_caching(request)
+        entry = self.context_caches.entries.get(request.config.cached_content)
+        return (entry["tokens"] if entry else 0), metadata
+
+    async def _generate(self, llm_request, stream=False):
+        self.requests.append(llm_request)
+        retries = await self._call_with_retries()
+        cached_tokens, cache_metadata = 0, None
+        if llm_request.cache_config is not None:
+            cached_tokens, cache_metadata = await self._context_cache(llm_request)
+
+        response = self.responder(llm_request)
+        if isinstance(response, str):
+            response = LlmResponse(content=types.Content(role="model", parts=[types.Part(text=response)]))
+        parts = response.content.parts or []
+        text = "".join(part.text or "" for part in parts)
+        self.stats["tool_calls"] += sum(1 for part in parts if part.function_call)
+        words = text.split(" ") if text else []
+
+        prompt_tokens = estimate_tokens(request_text(llm_request))
+        output_tokens = max(1, estimate_tokens(text))
+        cached_tokens = min(cached_tokens, prompt_tokens)
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["cached_tokens"] += cached_tokens
+        self.stats["output_tokens"] += output_tokens
+        response.usage_metadata = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens or None,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        response.cache_metadata = cache_metadata
+        if retries:
+            response.custom_metadata = {**(response.custom_metadata or {}), "retries": retries}
+
+        factor = self.delay_factors.get(self.model, 1.0)
+        await asyncio.sleep(self.first_token_delay * factor)
+        if stream and words:
+            for i, word in enumerate(words):
+                await asyncio.sleep(self.seconds_per_word * factor)
+                chunk = word if i == 0 else " " + word
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                    partial=True,
+                )
+        else:
+            await asyncio.sleep(self.seconds_per_word * factor * len(words))
+
+        yield response
+
+
+def use_fake_model(agent, model:Optional[FakeLlm]=None, **kwargs):
+    """
+    Replaces the model of every LlmAgent under `agent`, including agents wrapped in AgentTool.
+
+    Each agent gets a copy of `model` (or of a FakeLlm built from `kwargs`) that
+    keeps the agent's original model name and retry options, so name based
+    behaviour such as the google_search tool check is unchanged. Agents on a
+    pooled model keep going through that model's scheduler, and agents on a
+    RoutedModel keep their routing with a fake copy behind every model name.
+
+    Returns:
+        The model that was installed; its `requests` and `stats` cover every agent.
+    """
+    model = model or FakeLlm(**kwargs)
+    if isinstance(agent, LlmAgent):
+        update = {}
+        original = agent.model
+        if isinstance(original, str) and original:
+            update["model"] = original
+        elif isinstance(original, BaseLlm):
+            update["model"] = original.model
+            retry_options = getattr(original, "retry_options", None)
+            if retry_options is not None and model.retry_options is None:
+                update["retry_options"] = retry_options
+            if isinstance(original, ScheduledModel) or getattr(original, "scheduled", False):
+                update["scheduled"] = True
+        if isinstance(original, RoutedModel):
+            agent.model = original.model_copy(update={"resolve": model.for_model})
+        else:
+            agent.model = model.model_copy(update=update)
+        for tool in agent.tools:
+            if isinstance(tool, AgentTool):
+                use_fake_model(tool.agent, model)
+    for sub_agent in agent.sub_agents:
+        use_fake_model(sub_agent, model)
+    return model
@@ -0,0 +1,84 @@
+"""
+Offline stand-in for google_search, for running search agents on FakeLlm.
+
+google_search runs inside Gemini, so the stub answers in place of the search
+agent's model: findings text plus the grounding metadata a real search grounded
+response carries.
+
+    from common.fake_search import FakeSearch
+    search = FakeSearch()
+    responder = search.responder(scripted_responder(rules), match="specialized research agent")
+    use_fake_model(root_agent, responder=responder)
+    print(search.searches)
+"""
+import random
+import threading
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .fake_llm import instruction_text
+
+
+_SITES = ["arxiv.org", "github.com", "blog.example.dev", "docs.example.ai", "news.example.com"]
+
+
+class FakeSearch:
+    """
+    Serves deterministic search results for a query.
+
+    Args:
+        results: Number of sources per search.
+    """
+
+    def __init__(self, results=4):
+        self.results = results
+        self.searches = []
+        self._lock = threading.Lock()
+
+    def search(self, query:str):
+        """Returns `results` `{"title", "uri", "snippet"}` sources for `query`."""
+        with self._lock:
+            self.searches.append(query)
+        rng = random.Random(query)
+        slug = "-".join(query.lower().split())[:40]
+        return [
+            {
+                "title": f"{query} ({i + 1})",
+                "uri": f"https://{rng.choice(_SITES)}/{slug}-{rng.randrange(10_000)}",
+                "snippet": f"Finding {i + 1} about {query}: " + " ".join(["detail"] * rng.randint(20, 40)),
+            }
+            for i in range(self.results)
+        ]
+
+    def response(self, query:str):
+        """Returns the search grounded LlmResponse a search agent would give for `query`."""
+        sources = self.search(query)
+        text = "\n".join(f"- {source['snippet']} [{i + 1}]" for i, source in enumerate(sources))
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            grounding_metadata=types.GroundingMetadata(
+                web_search_queries=[query],
+                grounding_chunks=[
+                    types.GroundingChunk(web=types.GroundingChunkWeb(uri=source["uri"], title=source["title"]))
+                    for source in sources
+                ],
+            ),
+        )
+
+    def responder(self, fallback, match:str):
+        """
+        Returns a FakeLlm responder that searches for the user's request when the
+        instruction contains `match`, and calls `fallback` for every other agent.
+        """
+
+        def respond(llm_request):
+            if match not in instruction_text(llm_request):
+                return fallback(llm_request)
+            query = ""
+            for content in llm_request.contents:
+                if content.role == "user":
+                    query = "".join(part.text or "" for part in content.parts or []) or query
+            return self.response(query)
+
+        return respond
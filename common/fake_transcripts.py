@@ -0,0 +1,73 @@
+"""
+Offline transcript source with the same `fetch` interface as TranscriptClient.
+
+    from common.fake_transcripts import use_fake_transcripts
+    client = use_fake_transcripts(minutes=20, latency=0.3)
+"""
+import random
+import threading
+import time
+
+from . import youtube_script_tool
+from .transcript_cache import TranscriptCache
+
+
+_WORDS = (
+    "today we are testing the new model api with a local agent pipeline and the results "
+    "surprised me because the latency dropped after we enabled caching for every tool call"
+).split()
+
+
+def synthetic_transcript(vid_id:str, minutes:float=10):
+    """Returns deterministic `[start, duration, text]` snippets for `vid_id`."""
+    rng = random.Random(vid_id)
+    snippets = []
+    start = 0.0
+    while start < minutes * 60:
+        duration = round(rng.uniform(1.5, 3.5), 2)
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 10)))
+        if rng.random() < 0.3:
+            text += "."
+        snippets.append([round(start, 2), duration, text])
+        start += duration
+    return snippets
+
+
+class FakeTranscriptClient:
+    """
+    Serves synthetic transcripts after a simulated network delay.
+
+    Args:
+        minutes: Length of every generated video.
+        latency: Seconds each fetch blocks for, like the real client does.
+        missing: Video ids that have no transcript.
+    """
+
+    def __init__(self, minutes=10, latency=0.0, missing=()):
+        self.minutes = minutes
+        self.latency = latency
+        self.missing = set(missing)
+        self.fetches = []
+        self._lock = threading.Lock()
+
+    def fetch(self, vid_id:str):
+        with self._lock:
+            self.fetches.append(vid_id)
+        time.sleep(self.latency)
+        if vid_id in self.missing:
+            return []
+        return synthetic_transcript(vid_id, self.minutes)
+
+
+def use_fake_transcripts(client=None, **kwargs):
+    """
+    Makes get_subtitles use `client` (or a FakeTranscriptClient built from `kwargs`)
+    and a fresh in-memory cache, so nothing touches the network or ~/.cache.
+
+    Returns:
+        The installed client.
+    """
+    client = client or FakeTranscriptClient(**kwargs)
+    youtube_script_tool.transcript_client = client
+    youtube_script_tool.transcript_cache = TranscriptCache(path=":memory:")
+    return client
@@ -0,0 +1,125 @@
+"""
+Deterministic exit checks for refinement loops.
+
+The gates are plain agents placed inside a LoopAgent between the model steps.
+They never call a model: they read session state and escalate to end the loop
+as soon as the critique approves the draft, the draft stops changing, or the
+loop's time or token budget is used up. Each run leaves a summary in
+`state["loop_report"]` with the iteration count, the stop reason and the model
+calls saved compared to running every iteration in full.
+"""
+import difflib
+import time
+from typing import Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.events import Event, EventActions
+
+
+REPORT_KEY = "loop_report"
+PREVIOUS_DRAFT_KEY = "loop_previous_draft"
+
+
+class _LoopGate(BaseAgent):
+
+    def _report(self, ctx):
+        report = dict(ctx.session.state.get(REPORT_KEY) or {})
+        if report.get("invocation_id") != ctx.invocation_id:
+            # First gate of a new run
+            report = {
+                "invocation_id": ctx.invocation_id,
+                "iterations": 0,
+                "model_calls": 0,
+                "stop_reason": "max_iterations",
+                "started_at": time.time(),
+            }
+        return report
+
+    def _model_steps(self):
+        return [agent.name for agent in self.parent_agent.sub_agents if isinstance(agent, LlmAgent)]
+
+    def _count_model_calls(self, ctx, report):
+        # Every final model response of a loop step in this run is one call
+        steps = set(self._model_steps())
+        calls = [
+            event for event in ctx.session.events
+            if event.invocation_id == ctx.invocation_id and event.author in steps
+            and not event.partial and event.usage_metadata is not None
+        ]
+        report["model_calls"] = len(calls)
+        report["tokens"] = sum(event.usage_metadata.total_token_count or 0 for event in calls)
+
+    def _event(self, ctx, report, state_delta=None, stop_reason=None):
+        if stop_reason is not None:
+            report["stop_reason"] = stop_reason
+        max_iterations = self.parent_agent.max_iterations
+        if max_iterations is not None:
+            report["saved_calls"] = max(0, max_iterations * len(self._model_steps()) - report["model_calls"])
+        delta = {REPORT_KEY: report, **(state_delta or {})}
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta, escalate=stop_reason is not None),
+        )
+
+
+class ApprovalGate(_LoopGate):
+    """
+    Goes at the start of the loop, right after the critique step if there is one.
+    Ends the loop before the rewrite when the critique is just the approval
+    word, and remembers the current draft so ConvergenceGate can compare the
+    rewrite against it. Without `feedback_key` it only counts the iteration and
+    remembers the draft.
+    """
+
+    draft_key: str
+    feedback_key: Optional[str] = None
+    approval: str = "APPROVED"
+
+    async def _run_async_impl(self, ctx):
+        report = self._report(ctx)
+        report["iterations"] += 1
+        self._count_model_calls(ctx, report)
+        feedback = str(ctx.session.state.get(self.feedback_key, "")) if self.feedback_key else ""
+        if feedback.strip().strip("`'\".* \n").upper() == self.approval:
+            yield self._event(ctx, report, stop_reason="approved")
+            return
+        draft = ctx.session.state.get(self.draft_key, "")
+        yield self._event(ctx, report, state_delta={PREVIOUS_DRAFT_KEY: draft})
+
+
+class ConvergenceGate(_LoopGate):
+    """
+    Goes at the end of the loop. Ends it when the new draft is at least
+    `similarity` similar to the previous one, or when the loop has run longer
+    than `max_seconds` or used more than `max_tokens` tokens. It also remembers
+    the draft for the next iteration.
+    """
+
+    draft_key: str
+    similarity: float = 0.95
+    max_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    async def _run_async_impl(self, ctx):
+        report = self._report(ctx)
+        self._count_model_calls(ctx, report)
+        previous = ctx.session.state.get(PREVIOUS_DRAFT_KEY)
+        draft = ctx.session.state.get(self.draft_key, "")
+
+        stop_reason = None
+        if previous is not None:
+            # Word level diff; quick_ratio is a cheap upper bound of ratio
+            matcher = difflib.SequenceMatcher(None, str(previous).split(), str(draft).split())
+            ratio = matcher.quick_ratio()
+            if ratio >= self.similarity:
+                ratio = matcher.ratio()
+            report["similarity"] = round(ratio, 3)
+            if ratio >= self.similarity:
+                stop_reason = "converged"
+        if stop_reason is None and self.max_seconds is not None and time.time() - report["started_at"] > self.max_seconds:
+            stop_reason = "time_budget"
+        if stop_reason is None and self.max_tokens is not None and report["tokens"] > self.max_tokens:
+            stop_reason = "token_budget"
+        yield self._event(ctx, report, state_delta={PREVIOUS_DRAFT_KEY: draft}, stop_reason=stop_reason)
@@ -0,0 +1,178 @@
+"""
+Event loop lag of a process serving agents, and the tool calls and agents that block the loop.
+
+`adk api_server` runs every session of a worker on one asyncio event loop, and
+ADK calls a synchronous function tool right on that loop unless the RunConfig
+has a tool thread pool. While such a tool waits on the network, no other
+session makes progress. LoopLagMonitor runs a timer on the loop and records
+how late each tick fires, which is the delay every other coroutine sees.
+Attached to an agent tree it also flags each tool call during which the loop
+did not tick once while the call took longer than `threshold`, and counts
+each stall against the agents whose callbacks ran while the loop was late.
+That catches blocking code in an agent's own steps, such as the first part
+of a custom agent or its work around a model call, which no tool call covers.
+
+    monitor = LoopLagMonitor(threshold=0.05).attach(root_agent)
+    async with monitor:
+        ...  # run sessions
+    print(monitor.report())
+"""
+import asyncio
+import contextlib
+import math
+import time
+
+from google.adk.agents import LlmAgent
+from google.adk.tools import AgentTool
+
+from .response_cache import _append
+
+
+def percentile(values, p):
+    """Returns the nearest-rank `p`th percentile of `values`, or 0.0 if there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag while it is entered with `async with`.
+
+    Args:
+        interval: Seconds between two ticks of the timer.
+        threshold: Seconds without a tick from which the loop counts as stalled
+            and a tool call as blocking.
+    """
+
+    def __init__(self, interval=0.005, threshold=0.05):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = []
+        self.stalls = []
+        self.tools = {}
+        self.agents = {}
+        self.ticks = 0
+        self._pending = {}
+        self._active = set()
+        self._task = None
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            self.ticks += 1
+            self.lags.append(lag)
+            if lag >= self.threshold:
+                self.stalls.append(lag)
+                for name in self._active:
+                    row = self.agents[name]
+                    row["stalls"] += 1
+                    row["stalled_seconds"] += lag
+                    row["max_stall"] = max(row["max_stall"], lag)
+            # Only the callbacks since the last tick can have held up this one
+            self._active.clear()
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def _touch(self, callback_context):
+        self.agents.setdefault(
+            callback_context.agent_name, {"runs": 0, "stalls": 0, "stalled_seconds": 0.0, "max_stall": 0.0}
+        )
+        self._active.add(callback_context.agent_name)
+
+    def before_agent(self, callback_context):
+        self._touch(callback_context)
+        self.agents[callback_context.agent_name]["runs"] += 1
+        return None
+
+    def after_agent(self, callback_context):
+        self._touch(callback_context)
+        return None
+
+    def before_model(self, callback_context, llm_request):
+        self._touch(callback_context)
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        self._touch(callback_context)
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        self._pending[tool_context.function_call_id] = (time.perf_counter(), self.ticks)
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        self._finish_tool(tool, tool_context)
+        return None
+
+    def on_tool_error(self, tool, args, tool_context, error):
+        self._finish_tool(tool, tool_context)
+        # Let the error propagate as before
+        return None
+
+    def _finish_tool(self, tool, tool_context):
+        pending = self._pending.pop(tool_context.function_call_id, None)
+        if pending is None:
+            return
+        started, ticks = pending
+        seconds = time.perf_counter() - started
+        row = self.tools.setdefault(tool.name, {"calls": 0, "blocking_calls": 0, "seconds": 0.0, "max_blocked": 0.0})
+        row["calls"] += 1
+        row["seconds"] += seconds
+        # Ticks only stop while the loop is busy, and a tool that awaits lets them run
+        if self._task is not None and self.ticks == ticks and seconds >= self.threshold:
+            row["blocking_calls"] += 1
+            row["max_blocked"] = max(row["max_blocked"], seconds)
+
+    def attach(self, agent):
+        """
+        Adds the agent callbacks to every agent under `agent`, and the model and
+        tool callbacks to every LlmAgent, including agents wrapped in AgentTool.
+        """
+        agent.before_agent_callback = _append(agent.before_agent_callback, self.before_agent)
+        agent.after_agent_callback = _append(agent.after_agent_callback, self.after_agent)
+        if isinstance(agent, LlmAgent):
+            agent.before_model_callback = _append(agent.before_model_callback, self.before_model)
+            agent.after_model_callback = _append(agent.after_model_callback, self.after_model)
+            agent.before_tool_callback = _append(agent.before_tool_callback, self.before_tool)
+            agent.after_tool_callback = _append(agent.after_tool_callback, self.after_tool)
+            agent.on_tool_error_callback = _append(agent.on_tool_error_callback, self.on_tool_error)
+            for tool in agent.tools:
+                if isinstance(tool, AgentTool):
+                    self.attach(tool.agent)
+        for sub_agent in agent.sub_agents:
+            self.attach(sub_agent)
+        return agent
+
+    def blocking_tools(self):
+        """Returns the rows of the tools that blocked the loop at least once."""
+        return {name: row for name, row in self.tools.items() if row["blocking_calls"]}
+
+    def stalling_agents(self):
+        """Returns the rows of the agents that ran while the loop stalled at least once."""
+        return {name: row for name, row in self.agents.items() if row["stalls"]}
+
+    def report(self):
+        """Returns the lag percentiles and stalls in milliseconds, the blocking tools and the stalling agents."""
+        return {
+            "ticks": self.ticks,
+            "lag_p50_ms": percentile(self.lags, 50) * 1000,
+            "lag_p99_ms": percentile(self.lags, 99) * 1000,
+            "lag_max_ms": max(self.lags, default=0.0) * 1000,
+            "stalls": len(self.stalls),
+            "stalled_seconds": sum(self.stalls),
+            "blocking_tools": self.blocking_tools(),
+            "stalling_agents": self.stalling_agents(),
+        }
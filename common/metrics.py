@@ -0,0 +1,413 @@
+"""
+Latency, token and cost metrics for every agent, model call and tool call of a run.
+
+    AGENT_METRICS_PATH=metrics.jsonl adk web
+
+Every agent module calls `enable_metrics(root_agent)`, which adds callbacks to
+each agent in the tree (including agents wrapped in AgentTool) when
+AGENT_METRICS_PATH is set. One JSON line is written per agent run, model call
+and tool call, and a "summary" line with a per-agent and per-tool table when
+the root agent finishes.
+
+Retries made inside the genai HTTP client are invisible to callbacks. Models
+that retry themselves (FakeLlm, the shared model pool) report the count in
+`custom_metadata["retries"]` of their response, which is what ends up here.
+Calls of a RoutedModel (common.model_router) are recorded under the model that
+answered, with the tokens and cost of any answers it turned down included.
+
+Prompt tokens served from a Gemini context cache (common.context_cache) are
+counted as "cached_tokens" and priced at the cached rate; "billed_tokens" are
+the prompt tokens paid at the full input rate. A call that creates a cache
+also pays for storing it for its whole TTL.
+
+Records are written to the file by a thread of the recorder, so callbacks on
+the event loop never wait for the disk; `flush()` waits for the writes, and
+runs at exit.
+
+A response served by a before_model callback, such as a common.response_cache
+hit, never reaches the model or after_model. It is recorded as a "model"
+record with `cached` set and no tokens, and the summary counts these as
+"cache_hits". Their "saved_usd" is the average cost of the agent's calls
+recorded so far by the same recorder.
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from google.adk.agents import LlmAgent
+from google.adk.tools import AgentTool
+
+from .response_cache import _append
+
+
+# USD per million tokens (input, output, cached input) from the public Gemini price list
+PRICES = {
+    "gemini-3-pro-preview": (2.00, 12.00, 0.20),
+    "gemini-2.5-pro": (1.25, 10.00, 0.125),
+    "gemini-2.5-flash": (0.30, 2.50, 0.03),
+    "gemini-2.5-flash-lite": (0.10, 0.40, 0.01),
+}
+
+# USD per million cached tokens per hour of context cache storage
+CACHE_STORAGE_PRICES = {
+    "gemini-3-pro-preview": 4.50,
+    "gemini-2.5-pro": 4.50,
+    "gemini-2.5-flash": 1.00,
+    "gemini-2.5-flash-lite": 1.00,
+}
+
+_current_run = contextvars.ContextVar("agent_metrics_run", default=None)
+
+
+def estimate_cost(model, prompt_tokens, output_tokens, cached_tokens=0):
+    input_price, output_price, cached_price = PRICES.get(model, (0.0, 0.0, 0.0))
+    billed_tokens = prompt_tokens - cached_tokens
+    return (billed_tokens * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+def estimate_storage_cost(model, cached_tokens, seconds):
+    return cached_tokens * CACHE_STORAGE_PRICES.get(model, 0.0) * seconds / 3600 / 1_000_000
+
+
+def _created_cache_seconds(llm_response, started):
+    # The TTL of a context cache created during this call, or 0
+    metadata = llm_response.cache_metadata
+    if metadata is None or metadata.created_at is None or metadata.created_at < started:
+        return 0.0
+    return metadata.expire_time - metadata.created_at
+
+
+class MetricsRecorder:
+    """
+    Collects metrics through agent, model and tool callbacks.
+
+    Args:
+        path: JSON lines file the records are appended to, or None to keep them in memory only.
+        keep_summaries: Number of finished run summaries kept in `summaries`.
+    """
+
+    def __init__(self, path=None, keep_summaries=100):
+        self.path = path
+        self.keep_summaries = keep_summaries
+        self.summaries = OrderedDict()
+        self._root_names = set()
+        self._pending = {}
+        self._call_costs = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def _run(self, callback_context):
+        run = _current_run.get()
+        if run is None:
+            # Agent called outside of an instrumented root, record it on its own
+            run = {"session_id": callback_context.session.id, "records": []}
+        return run
+
+    def _emit(self, run, record):
+        record = {"ts": time.time(), "session_id": run["session_id"], **record}
+        run["records"].append(record)
+        self._write(record)
+
+    def _write(self, record):
+        if self.path is None:
+            return
+        # Encoded now, while the record cannot change any more
+        self._queue.put(json.dumps(record, default=str) + "\n")
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_lines, name="metrics-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_lines(self):
+        while True:
+            # Everything queued meanwhile goes out with one open and write
+            lines = [self._queue.get()]
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+            try:
+                with open(self.path, "a") as f:
+                    f.write("".join(lines))
+            except OSError as e:
+                print(f"Could not write {len(lines)} metrics records to {self.path}: {e}", file=sys.stderr)
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every record emitted so far is in the file."""
+        self._queue.join()
+
+    def before_agent(self, callback_context):
+        if callback_context.agent_name in self._root_names and _current_run.get() is None:
+            _current_run.set({
+                "session_id": callback_context.session.id,
+                "root": callback_context.agent_name,
+                "records": [],
+            })
+        self._pending[("agent", callback_context.invocation_id, callback_context.agent_name)] = time.perf_counter()
+        return None
+
+    def after_agent(self, callback_context):
+        started = self._pending.pop(("agent", callback_context.invocation_id, callback_context.agent_name), None)
+        model_key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        self._record_hit(callback_context, model_key)
+        # A request that was sent but never answered or failed is dropped
+        self._pending.pop(model_key, None)
+        run = self._run(callback_context)
+        if started is not None:
+            self._emit(run, {
+                "type": "agent",
+                "agent": callback_context.agent_name,
+                "seconds": time.perf_counter() - started,
+            })
+        if run.get("root") == callback_context.agent_name:
+            self._finish(run)
+            _current_run.set(None)
+        return None
+
+    def before_model(self, callback_context, llm_request):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        self._record_hit(callback_context, key)
+        self._pending[key] = {
+            "started": time.perf_counter(), "wall_started": time.time(), "first_token": None, "model": llm_request.model,
+            "sent": False,
+        }
+        return None
+
+    def model_sent(self, callback_context, llm_request):
+        # Last before_model callback: a request that gets here goes to the model
+        pending = self._pending.get(("model", callback_context.invocation_id, callback_context.agent_name))
+        if pending is not None:
+            pending["sent"] = True
+        return None
+
+    def _record_hit(self, callback_context, key):
+        # The agent's previous request stopped at an earlier before_model callback
+        pending = self._pending.get(key)
+        if pending is None or pending["sent"]:
+            return
+        del self._pending[key]
+        calls, cost = self._call_costs[callback_context.agent_name]
+        self._emit(self._run(callback_context), {
+            "type": "model",
+            "agent": callback_context.agent_name,
+            "model": pending["model"],
+            "cached": True,
+            "seconds": time.perf_counter() - pending["started"],
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "cost_usd": 0.0,
+            # What an average call of the agent recorded so far costs
+            "saved_usd": cost / calls if calls else 0.0,
+        })
+
+    def after_model(self, callback_context, llm_response):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        pending = self._pending.get(key)
+        if pending is None:
+            return None
+        now = time.perf_counter()
+        if pending["first_token"] is None:
+            pending["first_token"] = now - pending["started"]
+        if llm_response.partial:
+            return None
+        del self._pending[key]
+
+        usage = llm_response.usage_metadata
+        prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+        output_tokens = (usage.candidates_token_count or 0) if usage else 0
+        cached_tokens = (usage.cached_content_token_count or 0) if usage else 0
+        metadata = llm_response.custom_metadata or {}
+        model = metadata.get("model", pending["model"])
+        cost = estimate_cost(model, prompt_tokens, output_tokens, cached_tokens)
+        cache_seconds = _created_cache_seconds(llm_response, pending["wall_started"])
+        cost += estimate_storage_cost(model, cached_tokens, cache_seconds)
+        escalations = metadata.get("escalations", [])
+        for attempt in escalations:
+            prompt_tokens += attempt["prompt_tokens"]
+            output_tokens += attempt["output_tokens"]
+            cached_tokens += attempt.get("cached_tokens", 0)
+            cost += estimate_cost(
+                attempt["model"], attempt["prompt_tokens"], attempt["output_tokens"], attempt.get("cached_tokens", 0)
+            )
+        call_costs = self._call_costs[callback_context.agent_name]
+        call_costs[0] += 1
+        call_costs[1] += cost
+        self._emit(self._run(callback_context), {
+            "type": "model",
+            "agent": callback_context.agent_name,
+            "model": model,
+            "seconds": now - pending["started"],
+            "ttft": pending["first_token"],
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "billed_tokens": prompt_tokens - cached_tokens,
+            "cache_created_seconds": cache_seconds,
+            "retries": metadata.get("retries", 0),
+            "escalations": len(escalations),
+            "cost_usd": cost,
+            "error": llm_response.error_code,
+        })
+        return None
+
+    def on_model_error(self, callback_context, llm_request, error):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self._emit(self._run(callback_context), {
+                "type": "model",
+                "agent": callback_context.agent_name,
+                "model": pending["model"],
+                "seconds": time.perf_counter() - pending["started"],
+                "error": f"{type(error).__name__}: {error}",
+            })
+        # Let the error propagate as before
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        self._pending[("tool", tool_context.function_call_id)] = time.perf_counter()
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        started = self._pending.pop(("tool", tool_context.function_call_id), None)
+        if started is not None:
+            status = tool_response.get("status") if isinstance(tool_response, dict) else None
+            self._emit(self._run(tool_context), {
+                "type": "tool",
+                "agent": tool_context.agent_name,
+                "tool": tool.name,
+                "seconds": time.perf_counter() - started,
+                "error": tool_response.get("message") if status == "error" else None,
+            })
+        return None
+
+    def on_tool_error(self, tool, args, tool_context, error):
+        started = self._pending.pop(("tool", tool_context.function_call_id), None)
+        if started is not None:
+            self._emit(self._run(tool_context), {
+                "type": "tool",
+                "agent": tool_context.agent_name,
+                "tool": tool.name,
+                "seconds": time.perf_counter() - started,
+                "error": f"{type(error).__name__}: {error}",
+            })
+        return None
+
+    def _finish(self, run):
+        summary = summarize(run["records"])
+        self._write({"ts": time.time(), "session_id": run["session_id"], "type": "summary", "rows": summary})
+        self.summaries[run["session_id"]] = summary
+        while len(self.summaries) > self.keep_summaries:
+            self.summaries.popitem(last=False)
+
+    def attach(self, agent, root=True):
+        """Adds the metrics callbacks to `agent` and every agent below it."""
+        if root:
+            self._root_names.add(agent.name)
+        agent.before_agent_callback = _append(agent.before_agent_callback, self.before_agent)
+        agent.after_agent_callback = _append(agent.after_agent_callback, self.after_agent)
+        if isinstance(agent, LlmAgent):
+            # before_model goes first so every request is seen, and model_sent
+            # last so the requests a cache answered can be told apart
+            agent.before_model_callback = _prepend(agent.before_model_callback, self.before_model)
+            agent.before_model_callback = _append(agent.before_model_callback, self.model_sent)
+            agent.after_model_callback = _prepend(agent.after_model_callback, self.after_model)
+            agent.on_model_error_callback = _append(agent.on_model_error_callback, self.on_model_error)
+            agent.before_tool_callback = _append(agent.before_tool_callback, self.before_tool)
+            agent.after_tool_callback = _append(agent.after_tool_callback, self.after_tool)
+            agent.on_tool_error_callback = _append(agent.on_tool_error_callback, self.on_tool_error)
+            for tool in agent.tools:
+                if isinstance(tool, AgentTool):
+                    self.attach(tool.agent, root=False)
+        for sub_agent in agent.sub_agents:
+            self.attach(sub_agent, root=False)
+        return agent
+
+
+def _prepend(callbacks, callback):
+    return [callback] + _append(callbacks, callback)[:-1]
+
+
+def summarize(records):
+    """Aggregates records into one row per agent and per tool."""
+    rows = defaultdict(lambda: {
+        "calls": 0, "seconds": 0.0, "model_seconds": 0.0, "ttft": 0.0, "model_calls": 0,
+        "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "retries": 0, "escalations": 0, "errors": 0,
+        "cost_usd": 0.0, "cache_hits": 0, "saved_usd": 0.0,
+    })
+    for record in records:
+        if record["type"] == "tool":
+            row = rows[("tool", record["tool"])]
+            row["calls"] += 1
+            row["seconds"] += record["seconds"]
+        elif record["type"] == "agent":
+            row = rows[("agent", record["agent"])]
+            row["calls"] += 1
+            row["seconds"] += record["seconds"]
+        elif record.get("cached"):
+            row = rows[("agent", record["agent"])]
+            row["cache_hits"] += 1
+            row["saved_usd"] += record.get("saved_usd", 0.0)
+        else:
+            row = rows[("agent", record["agent"])]
+            row["model_calls"] += 1
+            row["model_seconds"] += record["seconds"]
+            row["ttft"] += record.get("ttft") or 0.0
+            row["prompt_tokens"] += record.get("prompt_tokens", 0)
+            row["cached_tokens"] += record.get("cached_tokens", 0)
+            row["output_tokens"] += record.get("output_tokens", 0)
+            row["retries"] += record.get("retries", 0)
+            row["escalations"] += record.get("escalations", 0)
+            row["cost_usd"] += record.get("cost_usd", 0.0)
+        if record.get("error"):
+            row["errors"] += 1
+    result = []
+    for (kind, name), row in rows.items():
+        if row["model_calls"]:
+            row["ttft"] /= row["model_calls"]
+        result.append({"kind": kind, "name": name, **row})
+    return result
+
+
+def format_summary(rows):
+    """Renders summary rows as a plain text table."""
+    lines = [
+        f"{'':<6}{'name':<28}{'calls':>6}{'seconds':>9}{'model s':>9}{'ttft':>7}"
+        f"{'prompt tok':>12}{'cached tok':>12}{'output tok':>12}{'retries':>8}{'errors':>7}{'cost $':>9}"
+        f"{'hits':>6}{'saved $':>9}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['kind']:<6}{row['name']:<28}{row['calls']:>6}{row['seconds']:>9.2f}{row['model_seconds']:>9.2f}"
+            f"{row['ttft']:>7.2f}{row['prompt_tokens']:>12}{row['cached_tokens']:>12}{row['output_tokens']:>12}"
+            f"{row['retries']:>8}{row['errors']:>7}{row['cost_usd']:>9.4f}"
+            f"{row['cache_hits']:>6}{row['saved_usd']:>9.4f}"
+        )
+    return "\n".join(lines)
+
+
+def enable_metrics(root_agent, path=None):
+    """
+    Attaches a MetricsRecorder to `root_agent`.
+
+    Without `path` the AGENT_METRICS_PATH environment variable is used, and
+    nothing is attached when it is unset.
+
+    Returns:
+        The MetricsRecorder, or None if metrics are disabled.
+    """
+    path = path or os.environ.get("AGENT_METRICS_PATH")
+    if not path:
+        return None
+    recorder = MetricsRecorder(path)
+    recorder.attach(root_agent)
+    return recorder
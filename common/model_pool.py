@@ -0,0 +1,227 @@
+"""
+Process-wide model registry with one rate limiter and retry policy per model name.
+
+    from common.model_pool import get_model
+    agent = LlmAgent(model=get_model("gemini-2.5-flash"), ...)
+
+Every agent asking for the same model name gets the same PooledGemini, so they
+share one genai client (and its connection pool) per event loop instead of
+building one each. Calls go through the model's ModelScheduler, which:
+
+- limits requests per minute with a token bucket and concurrent calls with a
+  semaphore, so bursts queue up locally instead of hitting the quota;
+- retries 429 and 5xx errors with jittered exponential backoff;
+- on a 429, pauses every caller of that model until the backoff has passed,
+  so concurrent sessions back off together instead of retrying into the
+  same exhausted quota.
+
+Limits come from MODEL_LIMITS below and can be overridden with the
+MODEL_RATE_LIMITS environment variable, a comma separated list of
+`model=requests_per_minute:concurrency`:
+
+    MODEL_RATE_LIMITS="gemini-3-pro-preview=25:4,gemini-2.5-flash=1000:32" adk web
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+
+from google.adk.models.google_llm import Gemini
+from google.genai import errors
+
+from .context_cache import with_cache_fallback
+
+
+RETRY_CODES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class ModelLimits:
+    requests_per_minute: float = 60
+    concurrency: int = 8
+    burst: int = 4
+    attempts: int = 5
+    initial_delay: float = 1.0
+    max_delay: float = 60.0
+
+
+# Defaults sized for a paid tier 1 quota; raise them for higher tiers
+MODEL_LIMITS = {
+    "gemini-3-pro-preview": ModelLimits(requests_per_minute=25, concurrency=4),
+    "gemini-2.5-pro": ModelLimits(requests_per_minute=150, concurrency=8),
+    "gemini-2.5-flash": ModelLimits(requests_per_minute=1000, concurrency=16, burst=10),
+    "gemini-2.5-flash-lite": ModelLimits(requests_per_minute=4000, concurrency=32, burst=20),
+}
+
+
+def _env_limits():
+    limits = {}
+    for item in os.environ.get("MODEL_RATE_LIMITS", "").split(","):
+        if "=" not in item:
+            continue
+        name, values = item.split("=", 1)
+        rpm, _, concurrency = values.partition(":")
+        base = MODEL_LIMITS.get(name.strip(), ModelLimits())
+        limits[name.strip()] = ModelLimits(
+            requests_per_minute=float(rpm),
+            concurrency=int(concurrency) if concurrency else base.concurrency,
+            burst=base.burst,
+            attempts=base.attempts,
+            initial_delay=base.initial_delay,
+            max_delay=base.max_delay,
+        )
+    return limits
+
+
+class ModelScheduler:
+    """
+    Token bucket, concurrency limit and retry policy shared by every call to one model.
+
+    The bucket is thread-safe and works across event loops; the concurrency
+    limit is a semaphore per event loop.
+
+    Args:
+        name: Model name, only used in stats and errors.
+        limits: ModelLimits to enforce.
+        delay_scale: Multiplier for every wait, so tests can run the policy without sleeping for real.
+        seed: Seed of the backoff jitter.
+    """
+
+    def __init__(self, name, limits, delay_scale=1.0, seed=None):
+        self.name = name
+        self.limits = limits
+        self.delay_scale = delay_scale
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failed": 0, "throttled_seconds": 0.0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(limits.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.limits.concurrency)
+        return semaphore
+
+    def _reserve(self):
+        # Takes a token, possibly going negative, and returns how long the
+        # caller has to wait for it, so waiters are served in arrival order
+        if not self.delay_scale:
+            return 0.0
+        rate = self.limits.requests_per_minute / 60 / self.delay_scale
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.limits.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def _backoff(self, attempt, rate_limited):
+        limits = self.limits
+        # Full jitter spreads the retries of concurrent callers apart
+        delay = self._rng.uniform(0, min(limits.max_delay, limits.initial_delay * 2 ** attempt)) * self.delay_scale
+        if rate_limited:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    async def _acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            self.stats["throttled_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    async def generate(self, generate, llm_request, stream=False):
+        """
+        Runs `generate(llm_request, stream)` within the limits, retrying retryable errors.
+
+        A call is only retried until its first response has been yielded. The
+        final response carries the retry count in `custom_metadata["retries"]`.
+        """
+        for attempt in range(self.limits.attempts):
+            # The slot is given back while the call backs off, so the requests
+            # queued behind it are not held up by one that is only waiting
+            async with self._semaphore():
+                await self._acquire()
+                self.stats["calls"] += 1
+                yielded = False
+                try:
+                    async for response in generate(llm_request, stream):
+                        if attempt and not response.partial:
+                            response.custom_metadata = {**(response.custom_metadata or {}), "retries": attempt}
+                        yielded = True
+                        yield response
+                    return
+                except errors.APIError as e:
+                    if yielded or e.code not in RETRY_CODES or attempt == self.limits.attempts - 1:
+                        self.stats["failed"] += 1
+                        raise
+                    if e.code == 429:
+                        self.stats["rate_limited"] += 1
+                    self.stats["retries"] += 1
+                    delay = self._backoff(attempt, rate_limited=e.code == 429)
+            await asyncio.sleep(delay)
+
+
+_schedulers = {}
+_models = {}
+_registry_lock = threading.Lock()
+
+
+def get_scheduler(model_name):
+    """Returns the process-wide ModelScheduler of `model_name`, creating it on first use."""
+    with _registry_lock:
+        scheduler = _schedulers.get(model_name)
+        if scheduler is None:
+            limits = _env_limits().get(model_name) or MODEL_LIMITS.get(model_name) or ModelLimits()
+            scheduler = _schedulers[model_name] = ModelScheduler(model_name, limits)
+        return scheduler
+
+
+def configure_model(model_name, limits=None, delay_scale=1.0, seed=None):
+    """Replaces the scheduler of `model_name`, for tests and benchmarks."""
+    with _registry_lock:
+        limits = limits or MODEL_LIMITS.get(model_name) or ModelLimits()
+        scheduler = _schedulers[model_name] = ModelScheduler(model_name, limits, delay_scale, seed)
+        return scheduler
+
+
+class ScheduledModel:
+    """
+    Mixin for BaseLlm subclasses that sends every call through the scheduler of the model's name.
+
+    Goes before the model class: `class PooledGemini(ScheduledModel, Gemini)`.
+    """
+
+    async def generate_content_async(self, llm_request, stream=False):
+        parent = super().generate_content_async
+        if llm_request.cache_config is not None:
+            # The cache manager edits the request, so each attempt starts from a copy
+            parent = with_cache_fallback(parent)
+        async for response in get_scheduler(self.model).generate(parent, llm_request, stream):
+            yield response
+
+
+class PooledGemini(ScheduledModel, Gemini):
+    """Gemini whose calls are rate limited and retried by the shared scheduler."""
+
+
+def get_model(model_name):
+    """
+    Returns the shared PooledGemini for `model_name`.
+
+    It has no retry_options of its own: retries are done by the scheduler,
+    which sees every caller of the model.
+    """
+    with _registry_lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = _models[model_name] = PooledGemini(model=model_name)
+        return model
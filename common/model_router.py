@@ -0,0 +1,273 @@
+"""
+Picks the model of each pipeline step at call time from a routing policy.
+
+    from common.model_router import route
+    critique = LlmAgent(model=route("critique"), ...)
+
+A policy maps step names to Routes. A Route lists the models a step may use,
+cheapest first, and when to move past the cheap ones:
+
+- a request longer than `long_input_tokens` goes straight to the last model;
+- a model that fails (after the scheduler's retries) or answers with nothing
+  hands the same request to the next model;
+- `escalate(text)` can turn down an answer, e.g. a critique whose retention
+  score is borderline, so the next model answers instead.
+
+The reply to a tool call goes to the model that made the call, so a
+conversation never changes model between a function call and its response.
+
+The active policy is POLICIES[MODEL_POLICY] ("pro" when unset). Single steps
+can be overridden with MODEL_ROUTES, a comma separated list of
+`step=model>model`:
+
+    MODEL_POLICY=tiered MODEL_ROUTES="writer=gemini-2.5-flash>gemini-3-pro-preview" adk web
+
+The final response of a routed call names the model that produced it in
+`custom_metadata["model"]`, and the turned down answers in
+`custom_metadata["escalations"]`, so common.metrics can price every attempt.
+"""
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.genai import errors, types
+from pydantic import PrivateAttr
+
+from .model_pool import get_model
+from .transcript_processing import estimate_tokens
+
+
+PRO = "gemini-3-pro-preview"
+FLASH = "gemini-2.5-flash"
+FLASH_LITE = "gemini-2.5-flash-lite"
+
+_SCORE = re.compile(r"retention score\s*(?:\(0\s*-\s*10\))?[^0-9]{0,20}(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def borderline_score(text, low=5.0, high=7.0):
+    """
+    Returns True when a critique should be checked by a stronger model.
+
+    An approval or a clear score (below `low` or above `high`) is kept; a score
+    in between, or a critique without a score, is escalated.
+    """
+    if text.strip().strip("`'\".* \n").upper() == "APPROVED":
+        return False
+    match = _SCORE.search(text)
+    if match is None:
+        return True
+    return low <= float(match.group(1)) <= high
+
+
+@dataclass(frozen=True)
+class Route:
+    models: tuple
+    long_input_tokens: Optional[int] = None
+    escalate: Optional[Callable[[str], bool]] = None
+
+
+# Steps of youtube_script_writer's workflow. "pro" is what the workflow always
+# ran, "lite" the split of agent_lite, "tiered" starts cheap and escalates.
+# The later steps see the whole conversation, transcript included, so their
+# length limits are well above the size of one brief or draft.
+POLICIES = {
+    "pro": {
+        "manager": Route((FLASH_LITE,)),
+        "researcher": Route((PRO,)),
+        "writer": Route((PRO,)),
+        "critique": Route((PRO,)),
+        "rewriter": Route((PRO,)),
+    },
+    "lite": {
+        "manager": Route((FLASH_LITE,)),
+        "researcher": Route((FLASH_LITE,)),
+        "writer": Route((FLASH,)),
+        "critique": Route((FLASH,)),
+        "rewriter": Route((FLASH,)),
+    },
+    "tiered": {
+        "manager": Route((FLASH_LITE,)),
+        "researcher": Route((FLASH, PRO)),
+        "writer": Route((FLASH, PRO), long_input_tokens=8000),
+        "critique": Route((FLASH, PRO), escalate=borderline_score),
+        "rewriter": Route((FLASH, PRO), long_input_tokens=10000),
+    },
+}
+
+_policy = None
+
+
+def _env_routes():
+    routes = {}
+    for item in os.environ.get("MODEL_ROUTES", "").split(","):
+        if "=" not in item:
+            continue
+        step, models = item.split("=", 1)
+        routes[step.strip()] = tuple(model.strip() for model in models.split(">") if model.strip())
+    return routes
+
+
+def set_policy(policy):
+    """Makes `policy` (a POLICIES name or a step -> Route dictionary) the active one, or goes back to the environment with None."""
+    global _policy
+    if isinstance(policy, str) and policy not in POLICIES:
+        raise ValueError(f"Unknown model policy {policy!r}, expected one of {', '.join(POLICIES)}")
+    _policy = policy
+
+
+def get_policy():
+    """Returns the active step -> Route dictionary."""
+    policy = _policy if _policy is not None else os.environ.get("MODEL_POLICY", "pro")
+    if isinstance(policy, str):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown MODEL_POLICY {policy!r}, expected one of {', '.join(POLICIES)}")
+        policy = POLICIES[policy]
+    overrides = _env_routes()
+    if not overrides:
+        return policy
+    policy = dict(policy)
+    for step, models in overrides.items():
+        base = policy.get(step, Route(models))
+        policy[step] = Route(models, base.long_input_tokens, base.escalate)
+    return policy
+
+
+def get_route(step):
+    route = get_policy().get(step)
+    if route is None:
+        raise KeyError(f"The model policy has no route for step {step!r}")
+    return route
+
+
+def _request_tokens(llm_request):
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    texts = [instruction if isinstance(instruction, str) else ""]
+    if isinstance(instruction, types.Content):
+        texts = [part.text or "" for part in instruction.parts or []]
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                texts.append(part.text)
+            elif part.function_response:
+                texts.append(str(part.function_response.response))
+    return estimate_tokens("".join(texts))
+
+
+def _calls_key(content):
+    calls = [(part.function_call.name, part.function_call.args) for part in content.parts or [] if part.function_call]
+    return json.dumps(calls, sort_keys=True, default=str) if calls else None
+
+
+def _response_text(response):
+    parts = response.content.parts if response.content else None
+    return "".join(part.text or "" for part in parts or [] if not part.thought)
+
+
+def _usable(response):
+    if response is None or response.error_code:
+        return False
+    parts = response.content.parts if response.content else None
+    return any(part.text or part.function_call for part in parts or [])
+
+
+def _attempt(model_name, response, reason):
+    usage = response.usage_metadata if response is not None else None
+    return {
+        "model": model_name,
+        "prompt_tokens": (usage.prompt_token_count or 0) if usage else 0,
+        "output_tokens": (usage.candidates_token_count or 0) if usage else 0,
+        "cached_tokens": (usage.cached_content_token_count or 0) if usage else 0,
+        "reason": reason,
+    }
+
+
+class RoutedModel(BaseLlm):
+    """
+    BaseLlm that sends each call to the model its step's Route picks.
+
+    `model` is the step's last model in the policy active when the agent is
+    built; ADK only uses it for model name checks before the call.
+
+    Args:
+        step: Step name looked up in the active policy.
+        resolve: Function returning the BaseLlm of a model name, common.model_pool.get_model by default.
+    """
+
+    step: str
+    resolve: Optional[Callable] = None
+    # function calls -> model that made them, for routing the tool responses back
+    _callers: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+
+    def _llm(self, model_name):
+        return (self.resolve or get_model)(model_name)
+
+    def _caller(self, llm_request):
+        contents = llm_request.contents
+        # An agent with a static instruction gets its other instruction after the responses
+        for i in range(len(contents) - 1, 0, -1):
+            if any(part.function_response for part in contents[i].parts or []):
+                return self._callers.get(_calls_key(contents[i - 1]))
+            if contents[i].role != "user":
+                break
+        return None
+
+    def _remember_caller(self, response, model_name):
+        key = _calls_key(response.content) if response.content else None
+        if key is not None:
+            self._callers[key] = model_name
+            while len(self._callers) > 1024:
+                self._callers.popitem(last=False)
+
+    def _finish(self, response, model_name, escalations):
+        metadata = {**(response.custom_metadata or {}), "model": model_name}
+        if escalations:
+            metadata["escalations"] = escalations
+        response.custom_metadata = metadata
+        self._remember_caller(response, model_name)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        route = get_route(self.step)
+        models = list(route.models)
+        caller = self._caller(llm_request)
+        if caller is not None:
+            models = [caller]
+        elif route.long_input_tokens is not None and _request_tokens(llm_request) > route.long_input_tokens:
+            models = models[-1:]
+
+        escalations = []
+        for model_name in models[:-1]:
+            request = llm_request.model_copy(update={"model": model_name})
+            response = None
+            try:
+                # Not streamed: the answer has to be judged before anything is shown
+                async for response in self._llm(model_name).generate_content_async(request, stream=False):
+                    pass
+            except errors.APIError as e:
+                escalations.append(_attempt(model_name, None, f"error {e.code}"))
+                continue
+            if not _usable(response):
+                escalations.append(_attempt(model_name, response, "empty"))
+                continue
+            text = _response_text(response)
+            if route.escalate is not None and text and route.escalate(text):
+                escalations.append(_attempt(model_name, response, "rejected"))
+                continue
+            self._finish(response, model_name, escalations)
+            yield response
+            return
+
+        model_name = models[-1]
+        request = llm_request.model_copy(update={"model": model_name})
+        async for response in self._llm(model_name).generate_content_async(request, stream):
+            if not response.partial:
+                self._finish(response, model_name, escalations)
+            yield response
+
+
+def route(step):
+    """Returns a RoutedModel for `step` of the active policy."""
+    return RoutedModel(model=get_route(step).models[-1], step=step)
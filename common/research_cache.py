@@ -0,0 +1,218 @@
+"""
+Opt-in cache of research results for agents that search the web.
+
+Two kinds of entries are kept, both keyed by the normalized text of a query
+(lowercase, punctuation and stop words dropped):
+
+- "findings": what a search agent such as ResearchAgent produced for the request
+  it was called with, plus the citations from the search grounding metadata.
+  A later call with the same or a near-duplicate request returns them from
+  `before_agent_callback`, so neither the model nor google_search is called.
+- "answer": the final answer of the root agent to a user query, so a repeated
+  or reworded question skips the whole search and summarize round trip.
+  RESEARCH_CACHE_ANSWERS=0 keeps only the findings.
+
+Only the first message of a session is looked up and stored: a follow-up such
+as "tell me more" or "and in 2023?" depends on the conversation before it.
+Search agents wrapped in AgentTool run in a session of their own, so every
+request they get counts as a first message.
+
+Near-duplicates are found by common.dedup_index, with MinHash signatures of
+the query's character shingles, indexed with locality sensitive hashing bands,
+and accepted above `similarity` estimated Jaccard. Queries whose numbers
+differ ("python 3.13" and "python 3.14") never match.
+
+Enable it with RESEARCH_CACHE, a comma separated list of the search agents'
+names:
+
+    RESEARCH_CACHE=ResearchAgent RESEARCH_CACHE_TTL=21600 adk web
+"""
+import os
+
+from google.adk.tools import AgentTool
+from google.genai import types
+
+from .dedup_index import DedupIndex, normalize_text
+from .disk_cache import CACHE_DIR
+from .response_cache import _append
+
+
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "research.sqlite3")
+
+_STOPWORDS = frozenset(
+    "a an and are about as at be by can do does for from give how i in into is it me my of on or please "
+    "show tell that the this to what whats which who why with find search information latest recent".split()
+)
+
+
+def normalize_query(query:str):
+    """Returns the words of `query` that carry meaning, lowercased and joined by single spaces."""
+    return normalize_text(query, _STOPWORDS)
+
+
+class ResearchStore(DedupIndex):
+    """
+    DedupIndex of research entries, keyed by the query without the words every search request has.
+
+    Args:
+        path: Location of the SQLite file. Use ":memory:" to keep everything in RAM.
+        ttl: Seconds an entry stays valid. None disables expiry.
+        similarity: Minimum estimated Jaccard similarity of a near-duplicate query.
+        max_entries: Maximum number of entries kept on disk.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=24 * 3600, similarity=0.8, max_entries=5000):
+        super().__init__(path, ttl=ttl, similarity=similarity, max_entries=max_entries, table="research", normalize=normalize_query)
+
+
+def _text(content):
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts if not part.thought)
+
+
+def citations(grounding_metadata):
+    """Returns the `{"title", "uri"}` sources of a search grounded response."""
+    sources = []
+    for chunk in (grounding_metadata.grounding_chunks or []) if grounding_metadata else []:
+        if chunk.web and chunk.web.uri:
+            sources.append({"title": chunk.web.title or chunk.web.uri, "uri": chunk.web.uri})
+    return sources
+
+
+def with_sources(findings, sources):
+    """Appends the sources that are not already cited in `findings`."""
+    missing = [source for source in sources if source["uri"] not in findings]
+    if not missing:
+        return findings
+    return findings + "\n\nSources:\n" + "\n".join(f"- {s['title']}: {s['uri']}" for s in missing)
+
+
+class ResearchCache:
+    """
+    Agent and model callbacks that serve repeated research from a ResearchStore.
+
+    Args:
+        store: ResearchStore holding the entries.
+        agents: Names of the search agents whose findings are cached.
+        answers: Whether the root agent's final answers are cached too.
+    """
+
+    def __init__(self, store, agents, answers=True):
+        self.store = store
+        self.agents = set(agents)
+        self.answers = answers
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stored": 0}
+        self._root_names = set()
+        self._output_keys = {}
+        self._sources = {}
+
+    def _lookup(self, kind, query):
+        entry = self.store.lookup(kind, query)
+        self.stats[f"{entry['match']}_hits" if entry else "misses"] += 1
+        return entry
+
+    def _store(self, kind, query, **values):
+        self.store.store(kind, query, **values)
+        self.stats["stored"] += 1
+
+    @staticmethod
+    def _first_turn(callback_context):
+        return all(event.invocation_id == callback_context.invocation_id for event in callback_context.session.events)
+
+    def before_agent(self, callback_context):
+        if not self._first_turn(callback_context):
+            return None
+        query = _text(callback_context.user_content)
+        if callback_context.agent_name in self._root_names:
+            entry = self._lookup("answer", query)
+            if entry is not None:
+                return types.Content(role="model", parts=[types.Part(text=entry["answer"])])
+            return None
+        entry = self._lookup("findings", query)
+        if entry is None:
+            self._sources[callback_context.invocation_id] = []
+            return None
+        findings = with_sources(entry["findings"], entry["citations"])
+        output_key = self._output_keys.get(callback_context.agent_name)
+        if output_key:
+            callback_context.state[output_key] = findings
+        return types.Content(role="model", parts=[types.Part(text=findings)])
+
+    def after_model(self, callback_context, llm_response):
+        sources = self._sources.get(callback_context.invocation_id)
+        if sources is not None and not llm_response.partial:
+            sources.extend(citations(llm_response.grounding_metadata))
+        return None
+
+    def after_agent(self, callback_context):
+        if not self._first_turn(callback_context):
+            return None
+        query = _text(callback_context.user_content)
+        if callback_context.agent_name in self._root_names:
+            # A workflow root answers through its last sub-agent
+            answer = self._final_text(callback_context, any_author=True)
+            if answer:
+                self._store("answer", query, answer=answer)
+            return None
+        sources = self._sources.pop(callback_context.invocation_id, None)
+        output_key = self._output_keys.get(callback_context.agent_name)
+        findings = (callback_context.state.get(output_key) if output_key else None) or self._final_text(callback_context)
+        if sources is not None and findings:
+            unique = list({source["uri"]: source for source in sources}.values())
+            self._store("findings", query, findings=str(findings), citations=unique)
+        return None
+
+    def _final_text(self, callback_context, any_author=False):
+        for event in reversed(callback_context.session.events):
+            if event.invocation_id != callback_context.invocation_id:
+                break
+            if event.author == "user" or event.partial or not _text(event.content):
+                continue
+            if any_author or event.author == callback_context.agent_name:
+                return _text(event.content)
+        return None
+
+    def attach(self, agent, root=True):
+        """Adds the callbacks to the root agent and to the search agents in its tree."""
+        if root and self.answers:
+            self._root_names.add(agent.name)
+        if agent.name in self._root_names or agent.name in self.agents:
+            agent.before_agent_callback = _append(agent.before_agent_callback, self.before_agent)
+            agent.after_agent_callback = _append(agent.after_agent_callback, self.after_agent)
+        if agent.name in self.agents:
+            self._output_keys[agent.name] = getattr(agent, "output_key", None)
+            agent.after_model_callback = _append(agent.after_model_callback, self.after_model)
+        for sub_agent in agent.sub_agents:
+            self.attach(sub_agent, root=False)
+        for tool in getattr(agent, "tools", []):
+            if isinstance(tool, AgentTool):
+                self.attach(tool.agent, root=False)
+        return agent
+
+
+def enable_research_cache(root_agent, agents=None, path=None, answers=None):
+    """
+    Attaches a ResearchCache to `root_agent` for the given search agents.
+
+    Without `agents` the RESEARCH_CACHE environment variable is used, and
+    nothing is attached when it is unset, so caching stays opt-in. Without
+    `answers` RESEARCH_CACHE_ANSWERS decides, caching answers unless it is "0".
+
+    Returns:
+        The ResearchCache, or None if caching is disabled.
+    """
+    if agents is None:
+        agents = [name.strip() for name in os.environ.get("RESEARCH_CACHE", "").split(",") if name.strip()]
+        if not agents:
+            return None
+    store = ResearchStore(
+        path or os.environ.get("RESEARCH_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl=float(os.environ.get("RESEARCH_CACHE_TTL", 24 * 3600)),
+        similarity=float(os.environ.get("RESEARCH_CACHE_SIMILARITY", 0.8)),
+    )
+    if answers is None:
+        answers = os.environ.get("RESEARCH_CACHE_ANSWERS", "1") != "0"
+    cache = ResearchCache(store, agents, answers)
+    cache.attach(root_agent)
+    return cache
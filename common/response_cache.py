@@ -0,0 +1,147 @@
+"""
+Opt-in cache that replays model responses for agent steps that already ran.
+
+A step is identified by a hash of everything the model sees: the model name,
+the rendered system instruction (with state values such as {outline} already
+filled in), the conversation contents and the tool declarations. When the same
+request is made again, the stored response is returned from
+`before_model_callback` and the model is not called. ADK then stores it under
+the agent's `output_key` as usual, so a pipeline rerun after a late failure
+only pays for the steps whose inputs changed.
+
+Enable it per agent with the LLM_RESPONSE_CACHE environment variable, either a
+comma separated list of agent names or "*" for every agent:
+
+    LLM_RESPONSE_CACHE=OutlineAgent,WriterAgent adk web
+"""
+import hashlib
+import json
+import os
+
+from google.adk.agents import LlmAgent
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+
+from .disk_cache import CACHE_DIR, DiskCache
+
+
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "llm_responses.sqlite3")
+
+
+def _strip_call_ids(value):
+    # ADK gives every function call a random id, which would make otherwise
+    # identical requests hash differently on each run
+    if isinstance(value, dict):
+        return {k: _strip_call_ids(v) for k, v in value.items() if k != "id"}
+    if isinstance(value, list):
+        return [_strip_call_ids(v) for v in value]
+    return value
+
+
+def request_key(llm_request):
+    """Returns the content hash identifying an LlmRequest."""
+    config = llm_request.config.model_dump(
+        mode="json", exclude_none=True, exclude={"http_options", "labels"}
+    )
+    payload = {
+        "model": llm_request.model,
+        "config": config,
+        "contents": _strip_call_ids([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """
+    Model callbacks that serve repeated agent steps from a DiskCache.
+
+    Args:
+        store: DiskCache holding the responses as JSON.
+        agents: Names of the agents to cache, or None for every agent it is attached to.
+    """
+
+    def __init__(self, store, agents=None):
+        self.store = store
+        self.agents = None if agents is None else set(agents)
+        self.stats = {"hits": 0, "misses": 0}
+        self._pending = {}
+
+    def enabled_for(self, agent_name):
+        return self.agents is None or agent_name in self.agents
+
+    def before_model(self, callback_context, llm_request):
+        if not self.enabled_for(callback_context.agent_name):
+            return None
+        key = request_key(llm_request)
+        cached = self.store.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return LlmResponse.model_validate(cached)
+        self.stats["misses"] += 1
+        self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        # Errors and empty turns are not worth replaying
+        if key is None or llm_response.error_code or not llm_response.content:
+            return None
+        self.store.set(key, llm_response.model_dump(mode="json", exclude_none=True))
+        return None
+
+    def on_model_error(self, callback_context, llm_request, error):
+        # after_model is skipped when the model raises, so the request is dropped here
+        self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        # Let the error propagate as before
+        return None
+
+    def attach(self, agent):
+        """Adds the cache callbacks to every enabled LlmAgent in the agent tree."""
+        if isinstance(agent, LlmAgent) and self.enabled_for(agent.name):
+            agent.before_model_callback = _append(agent.before_model_callback, self.before_model)
+            agent.after_model_callback = _append(agent.after_model_callback, self.after_model)
+            agent.on_model_error_callback = _append(agent.on_model_error_callback, self.on_model_error)
+        for sub_agent in agent.sub_agents:
+            self.attach(sub_agent)
+        # Agents wrapped in AgentTool are not sub_agents but still call the model
+        for tool in getattr(agent, "tools", []):
+            if isinstance(tool, AgentTool):
+                self.attach(tool.agent)
+        return agent
+
+
+def _append(callbacks, callback):
+    if callbacks is None:
+        return [callback]
+    if not isinstance(callbacks, list):
+        callbacks = [callbacks]
+    return callbacks + [callback]
+
+
+def enable_response_cache(root_agent, agents=None, path=None):
+    """
+    Attaches a ResponseCache to `root_agent` for the given agent names.
+
+    Without `agents` the LLM_RESPONSE_CACHE environment variable is used, and
+    nothing is attached when it is unset, so caching stays opt-in.
+
+    Returns:
+        The ResponseCache, or None if caching is disabled.
+    """
+    if agents is None:
+        setting = os.environ.get("LLM_RESPONSE_CACHE", "").strip()
+        if not setting:
+            return None
+        agents = None if setting == "*" else [name.strip() for name in setting.split(",") if name.strip()]
+    store = DiskCache(
+        path or os.environ.get("LLM_RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl=float(os.environ.get("LLM_RESPONSE_CACHE_TTL", 24 * 3600)),
+        max_entries=int(os.environ.get("LLM_RESPONSE_CACHE_SIZE", 5000)),
+        table="responses",
+    )
+    cache = ResponseCache(store, agents)
+    cache.attach(root_agent)
+    return cache
@@ -0,0 +1,153 @@
+"""
+Section ids for scripts, so a rewrite only has to send back the sections it changes.
+
+A script is split into sections at Markdown headings, at every row of a table
+(the header row keeps its separator line) and at paragraphs; joining the
+sections gives back the script unchanged. The model sees each section after an
+"@@ S<n>" line and answers with the sections it rewrites in the same form:
+
+    @@ S3
+    | Punchier hook line | [Visual: montage] |
+    @@ S9
+
+Sections the patch does not name are kept as they are, and a section given with
+nothing after its tag is removed. ScriptPatchMerger applies the patch to the
+script in session state without calling a model.
+"""
+import re
+
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.adk.utils.instructions_utils import inject_session_state
+
+
+PATCH_REPORT_KEY = "patch_report"
+SECTIONS_MARKER = "[[SCRIPT SECTIONS]]"
+
+_TAG_RE = re.compile(r"^@@[ \t]*(S\d+)[ \t]*$", re.MULTILINE)
+_FENCE_RE = re.compile(r"^\s*```[a-z]*\n|\n```\s*$")
+
+
+def _is_row(text):
+    return text.startswith("|")
+
+
+def _is_separator(text):
+    return _is_row(text) and set(text) <= set("|-: ")
+
+
+def split_sections(script:str):
+    """Returns the sections of `script` as strings that join back into it."""
+    sections = []
+    current = []
+    previous = ""
+    for line in script.splitlines(keepends=True):
+        text = line.strip()
+        if text and any(part.strip() for part in current):
+            starts = (
+                text.startswith("#")
+                or (_is_row(text) and not _is_separator(text))
+                or not previous
+                or (_is_row(previous) and not _is_row(text))
+            )
+            if starts:
+                sections.append("".join(current))
+                current = []
+        current.append(line)
+        previous = text
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def render_tagged(sections):
+    """Returns the sections with an "@@ S<n>" line before each, numbered from 1."""
+    tagged = []
+    for i, section in enumerate(sections, 1):
+        if not section.endswith("\n"):
+            section += "\n"
+        tagged.append(f"@@ S{i}\n{section}")
+    return "".join(tagged)
+
+
+def parse_patch(patch:str):
+    """
+    Returns the `{section_id: text}` replacements of a patch, in order.
+
+    Anything before the first tag (a preamble, a code fence) is ignored.
+    """
+    patch = _FENCE_RE.sub("", patch)
+    tags = list(_TAG_RE.finditer(patch))
+    replacements = {}
+    for tag, following in zip(tags, tags[1:] + [None]):
+        end = following.start() if following else len(patch)
+        replacements[tag.group(1)] = patch[tag.end():end].strip("\n")
+    return replacements
+
+
+def apply_patch(script:str, patch:str):
+    """
+    Merges `patch` into `script`.
+
+    A patch without any tag is taken as a complete new script, so a model that
+    ignores the format still moves the loop forward.
+
+    Returns:
+        (new_script, report) where report has "sections", "patched", "unknown"
+        (tags that name no section) and "mode", either "patch" or "full".
+    """
+    sections = split_sections(script)
+    replacements = parse_patch(patch)
+    report = {"sections": len(sections), "patched": [], "unknown": [], "mode": "patch"}
+    if not replacements:
+        if patch.strip():
+            report["mode"] = "full"
+            return patch.strip(), report
+        return script, report
+    for section_id, text in replacements.items():
+        index = int(section_id[1:]) - 1
+        if not 0 <= index < len(sections):
+            report["unknown"].append(section_id)
+            continue
+        old = sections[index]
+        # Keep the blank lines that separated the section from the next one
+        trailing = old[len(old.rstrip("\r\n")):]
+        sections[index] = text + trailing if text.strip() else ""
+        report["patched"].append(section_id)
+    return "".join(sections), report
+
+
+def tagged_instruction(template:str, script_key:str):
+    """
+    Returns an instruction provider for `template` that fills its `{key}`
+    placeholders from session state, like a plain instruction, and replaces
+    SECTIONS_MARKER with the script in `script_key` split into tagged sections.
+    """
+
+    async def provider(readonly_context):
+        instruction = await inject_session_state(template, readonly_context)
+        script = str(readonly_context.state.get(script_key, ""))
+        # Filled in last so braces in the script are never read as placeholders
+        return instruction.replace(SECTIONS_MARKER, render_tagged(split_sections(script)))
+
+    return provider
+
+
+class ScriptPatchMerger(BaseAgent):
+    """
+    Merges the patch in `patch_key` into the script in `script_key` without
+    calling a model, and leaves a report in `state["patch_report"]`.
+    """
+
+    script_key: str
+    patch_key: str
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        script, report = apply_patch(str(state.get(self.script_key, "")), str(state.get(self.patch_key, "")))
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.script_key: script, PATCH_REPORT_KEY: report}),
+        )
@@ -0,0 +1,440 @@
+"""
+Durable session service that stores large values once, plus pipeline resume.
+
+CompactSessionService keeps sessions in a SQLite file instead of RAM. Strings
+of at least `blob_threshold` characters (transcripts, drafts, research
+briefs), found anywhere in the state or in an event, are stored once in a
+compressed, content-addressed `blobs` table. The state and the events only
+hold a `{"$blob": <sha256>}` reference. The same final_script in an event's
+text and in its state_delta therefore costs one row, and reloaded sessions
+share one copy of it through an in-process LRU.
+
+Sessions idle for longer than `ttl` seconds are deleted along with the blobs
+nobody references any more.
+
+Use it from `adk web` / `adk api_server` through the scheme registered in
+services.py, or pass it to a Runner directly:
+
+    adk web --session_service_uri compact:///home/me/.cache/agents/sessions.sqlite3
+
+`enable_resume(root_agent)` makes a sequential pipeline skip the sub-agents
+that already finished when the same request is sent again to a session whose
+previous run failed midway. It is opt-in with PIPELINE_RESUME=1.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import ListSessionsResponse
+from google.adk.sessions.state import State
+from google.genai import types
+
+from .disk_cache import CACHE_DIR
+from .response_cache import _append
+
+
+DEFAULT_SESSION_PATH = os.path.join(CACHE_DIR, "sessions.sqlite3")
+BLOB_KEY = "$blob"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+    state BLOB NOT NULL, create_time REAL NOT NULL, update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS sessions_update_time ON sessions(update_time);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL, data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events(app_name, user_id, session_id);
+CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS refs (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, hash TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, hash)
+);
+CREATE TABLE IF NOT EXISTS app_states (app_name TEXT PRIMARY KEY, state TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 6)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(data))
+
+
+def _split_delta(delta):
+    app, user, session = {}, {}, {}
+    for key, value in delta.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class CompactSessionService(BaseSessionService):
+    """
+    SQLite session service with content-addressed, compressed storage of large strings.
+
+    Args:
+        path: Location of the SQLite file. Use ":memory:" for a throwaway store.
+        ttl: Seconds a session may stay idle before it is deleted. None keeps sessions forever.
+        blob_threshold: Minimum length of a string stored as a shared blob.
+        blob_cache_entries: Decoded blobs kept in memory.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_PATH, ttl=7 * 24 * 3600, blob_threshold=512, blob_cache_entries=256):
+        self.path = path
+        self.ttl = ttl
+        self.blob_threshold = blob_threshold
+        self.blob_cache_entries = blob_cache_entries
+        self.stats = {"blobs_written": 0, "blobs_deduplicated": 0, "evicted_sessions": 0}
+        self._blob_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        # Opened lazily so importing an agent never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    async def _call(self, fn, *args):
+        # sqlite3 blocks, keep it off the event loop
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn, *args):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return fn(conn, *args)
+
+    # Blob handling
+
+    def _externalize(self, value, blobs):
+        """Replaces long strings in `value` with blob references collected in `blobs`."""
+        if isinstance(value, str):
+            if len(value) < self.blob_threshold:
+                return value
+            digest = hashlib.sha256(value.encode()).hexdigest()
+            blobs[digest] = value
+            return {BLOB_KEY: digest}
+        if isinstance(value, dict):
+            return {k: self._externalize(v, blobs) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._externalize(v, blobs) for v in value]
+        return value
+
+    def _internalize(self, conn, value):
+        if isinstance(value, dict):
+            if len(value) == 1 and BLOB_KEY in value:
+                return self._load_blob(conn, value[BLOB_KEY])
+            return {k: self._internalize(conn, v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._internalize(conn, v) for v in value]
+        return value
+
+    def _load_blob(self, conn, digest):
+        text = self._blob_cache.get(digest)
+        if text is None:
+            (data,) = conn.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            text = zlib.decompress(data).decode()
+            self._blob_cache[digest] = text
+            while len(self._blob_cache) > self.blob_cache_entries:
+                self._blob_cache.popitem(last=False)
+        self._blob_cache.move_to_end(digest)
+        return text
+
+    def _store_blobs(self, conn, app_name, user_id, session_id, blobs):
+        for digest, text in blobs.items():
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                (digest, zlib.compress(text.encode(), 6)),
+            ).rowcount
+            self.stats["blobs_written" if inserted else "blobs_deduplicated"] += 1
+            conn.execute(
+                "INSERT OR IGNORE INTO refs (app_name, user_id, session_id, hash) VALUES (?, ?, ?, ?)",
+                (app_name, user_id, session_id, digest),
+            )
+
+    # App and user state
+
+    def _scoped_state(self, conn, app_name, user_id):
+        state = {}
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        for key, value in json.loads(row[0]).items() if row else ():
+            state[State.APP_PREFIX + key] = value
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        for key, value in json.loads(row[0]).items() if row else ():
+            state[State.USER_PREFIX + key] = value
+        return state
+
+    def _update_scoped_state(self, conn, app_name, user_id, app_delta, user_delta):
+        if app_delta:
+            row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **app_delta}
+            conn.execute("INSERT OR REPLACE INTO app_states VALUES (?, ?)", (app_name, json.dumps(state)))
+        if user_delta:
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+            state = {**(json.loads(row[0]) if row else {}), **user_delta}
+            conn.execute("INSERT OR REPLACE INTO user_states VALUES (?, ?, ?)", (app_name, user_id, json.dumps(state)))
+
+    # Eviction
+
+    def _delete(self, conn, app_name, user_id, session_id):
+        keys = (app_name, user_id, session_id)
+        conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", keys)
+        conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", keys)
+        conn.execute("DELETE FROM refs WHERE app_name = ? AND user_id = ? AND session_id = ?", keys)
+
+    def _collect_garbage(self, conn):
+        conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM refs)")
+
+    def _evict(self, conn):
+        if self.ttl is None:
+            return
+        idle = conn.execute(
+            "SELECT app_name, user_id, id FROM sessions WHERE update_time < ?", (time.time() - self.ttl,)
+        ).fetchall()
+        for app_name, user_id, session_id in idle:
+            self._delete(conn, app_name, user_id, session_id)
+        if idle:
+            self._collect_garbage(conn)
+            self.stats["evicted_sessions"] += len(idle)
+
+    # BaseSessionService
+
+    def _create(self, conn, app_name, user_id, state, session_id):
+        self._evict(conn)
+        session_id = session_id or str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_delta(state or {})
+        self._update_scoped_state(conn, app_name, user_id, app_delta, user_delta)
+        blobs = {}
+        stored = self._externalize(session_state, blobs)
+        now = time.time()
+        try:
+            conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, _pack(stored), now, now),
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Session with id {session_id} already exists.")
+        self._store_blobs(conn, app_name, user_id, session_id, blobs)
+        merged = {**copy.deepcopy(session_state), **self._scoped_state(conn, app_name, user_id)}
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=merged, last_update_time=now)
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        return await self._call(self._create, app_name, user_id, state, session_id)
+
+    def _get(self, conn, app_name, user_id, session_id, config):
+        row = conn.execute(
+            "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        state = self._internalize(conn, _unpack(row[0]))
+        state.update(self._scoped_state(conn, app_name, user_id))
+
+        query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        params = [app_name, user_id, session_id]
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        query += " ORDER BY seq DESC"
+        if config and config.num_recent_events is not None:
+            query += " LIMIT ?"
+            params.append(config.num_recent_events)
+        rows = conn.execute(query, params).fetchall()
+        # Through JSON so bytes fields are decoded from base64 again
+        events = [
+            Event.model_validate_json(json.dumps(self._internalize(conn, _unpack(data))))
+            for (data,) in reversed(rows)
+        ]
+        return Session(
+            app_name=app_name, user_id=user_id, id=session_id, state=state, events=events, last_update_time=row[1]
+        )
+
+    async def get_session(self, *, app_name, user_id, session_id, config=None):
+        return await self._call(self._get, app_name, user_id, session_id, config)
+
+    def _list(self, conn, app_name, user_id):
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?"
+        params = [app_name]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        sessions = []
+        for session_user, session_id, state, update_time in conn.execute(query + " ORDER BY update_time", params):
+            state = self._internalize(conn, _unpack(state))
+            state.update(self._scoped_state(conn, app_name, session_user))
+            sessions.append(Session(
+                app_name=app_name, user_id=session_user, id=session_id, state=state, last_update_time=update_time
+            ))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def list_sessions(self, *, app_name, user_id=None):
+        return await self._call(self._list, app_name, user_id)
+
+    def _delete_session(self, conn, app_name, user_id, session_id):
+        self._delete(conn, app_name, user_id, session_id)
+        self._collect_garbage(conn)
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await self._call(self._delete_session, app_name, user_id, session_id)
+
+    def _append(self, conn, session, event):
+        keys = (session.app_name, session.user_id, session.id)
+        row = conn.execute(
+            "SELECT state FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", keys
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Session {session.id} not found.")
+        blobs = {}
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = _split_delta(event.actions.state_delta)
+            self._update_scoped_state(conn, session.app_name, session.user_id, app_delta, user_delta)
+            if session_delta:
+                # References are stored as is, their blobs already exist
+                state = {**_unpack(row[0]), **self._externalize(session_delta, blobs)}
+                conn.execute(
+                    "UPDATE sessions SET state = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (_pack(state), *keys),
+                )
+        data = self._externalize(event.model_dump(mode="json", exclude_none=True), blobs)
+        conn.execute(
+            "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+            (*keys, event.timestamp, _pack(data)),
+        )
+        conn.execute(
+            "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+            (event.timestamp, *keys),
+        )
+        self._store_blobs(conn, *keys, blobs)
+
+    async def append_event(self, session, event):
+        if event.partial:
+            return event
+        self._apply_temp_state(session, event)
+        event = self._trim_temp_delta_state(event)
+        await self._call(self._append, session, event)
+        session.last_update_time = event.timestamp
+        return self._commit_event_to_session(session, event)
+
+    def checkpoint(self):
+        """Folds the write-ahead log back into the database file."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+RESUME_KEY = "pipeline_progress"
+
+
+class PipelineResume:
+    """
+    Agent callbacks that let a sequential pipeline pick up after its last finished sub-agent.
+
+    Every finished sub-agent is recorded in `state["pipeline_progress"]`
+    together with a hash of the user message that started the run. When a run
+    fails midway and the same message is sent again to the session, the
+    recorded sub-agents are skipped and the pipeline continues with the first
+    unfinished one, reading the earlier outputs from the (durable) state. The
+    record is cleared once the whole pipeline finishes, and a different
+    message starts from scratch.
+    """
+
+    def __init__(self, root_agent):
+        self.root_name = root_agent.name
+        self.steps = {agent.name: agent for agent in root_agent.sub_agents}
+
+    @staticmethod
+    def _request(callback_context):
+        content = callback_context.user_content
+        text = "".join(part.text or "" for part in content.parts or []) if content else ""
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def before_agent(self, callback_context):
+        name = callback_context.agent_name
+        if name not in self.steps:
+            return None
+        progress = callback_context.state.get(RESUME_KEY) or {}
+        if progress.get("request") != self._request(callback_context) or name not in progress.get("completed", []):
+            return None
+        # Returning content skips the agent. An LlmAgent also writes that content
+        # to its output_key, so it gets the saved output, which leaves it unchanged
+        output_key = getattr(self.steps[name], "output_key", None)
+        if output_key is None:
+            return types.Content(role="model", parts=[types.Part(text=f"[{name} resumed from the previous run]")])
+        saved = callback_context.state.get(output_key)
+        if saved is None:
+            # Nothing to restore, the step runs again
+            return None
+        text = saved if isinstance(saved, str) else json.dumps(saved)
+        return types.Content(role="model", parts=[types.Part(text=text)])
+
+    def after_agent(self, callback_context):
+        name = callback_context.agent_name
+        if name == self.root_name:
+            callback_context.state[RESUME_KEY] = None
+            return None
+        request = self._request(callback_context)
+        progress = callback_context.state.get(RESUME_KEY) or {}
+        completed = progress.get("completed", []) if progress.get("request") == request else []
+        if name not in completed:
+            callback_context.state[RESUME_KEY] = {"request": request, "completed": completed + [name]}
+        return None
+
+    def attach(self, root_agent):
+        for agent in [root_agent, *root_agent.sub_agents]:
+            agent.before_agent_callback = _append(agent.before_agent_callback, self.before_agent)
+            agent.after_agent_callback = _append(agent.after_agent_callback, self.after_agent)
+        return root_agent
+
+
+def enable_resume(root_agent):
+    """
+    Attaches PipelineResume to a SequentialAgent root when PIPELINE_RESUME is set.
+
+    Returns:
+        The PipelineResume, or None if resuming is disabled.
+    """
+    if os.environ.get("PIPELINE_RESUME", "0") == "0":
+        return None
+    resume = PipelineResume(root_agent)
+    resume.attach(root_agent)
+    return resume
@@ -0,0 +1,24 @@
+import os
+
+from .disk_cache import CACHE_DIR, DiskCache
+
+
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "transcripts-v3.sqlite3")
+
+
+class TranscriptCache(DiskCache):
+    """
+    Cache for Youtube transcripts keyed by the video id.
+
+    Values are lists of `[start, duration, text]` snippets. Empty transcripts are
+    never stored, so a video whose captions are added later is retried.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=2000, memory_entries=64):
+        super().__init__(path, ttl=ttl, max_entries=max_entries, memory_entries=memory_entries, table="transcripts")
+
+
+transcript_cache = TranscriptCache(
+    path=os.environ.get("TRANSCRIPT_CACHE_PATH", DEFAULT_CACHE_PATH),
+    ttl=float(os.environ.get("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600)),
+)
@@ -0,0 +1,55 @@
+import threading
+
+
+class TranscriptClient:
+    """
+    Process-wide access point for downloading Youtube transcripts.
+
+    `YouTubeTranscriptApi` and `requests.Session` are not thread-safe, so every
+    thread gets its own api object, created once and reused for the life of
+    the process. Connections to youtube.com stay alive between calls instead
+    of a fresh session (DNS, TCP and TLS handshakes) being opened per video.
+
+    Args:
+        pool_size: Connections kept alive per host for each thread's session.
+    """
+
+    def __init__(self, pool_size=4):
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            # Imported on the first fetch, agents that never fetch a transcript skip them
+            import requests
+            from requests.adapters import HTTPAdapter
+            from youtube_transcript_api import YouTubeTranscriptApi
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            api = YouTubeTranscriptApi(http_client=session)
+            self._local.api = api
+            with self._lock:
+                self._sessions.append(session)
+        return api
+
+    def fetch(self, vid_id:str):
+        """Downloads the transcript of a video as a list of `[start, duration, text]` snippets."""
+        fetched_transcript = self._api().fetch(vid_id)
+        return [[snippet.start, snippet.duration, snippet.text] for snippet in fetched_transcript]
+
+    def close(self):
+        """Closes every pooled session. The client can still be used afterwards."""
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        self._local = threading.local()
+
+
+transcript_client = TranscriptClient()
@@ -0,0 +1,242 @@
+"""
+Turns fetched transcripts into text and shrinks long ones to a token budget
+before they reach the model.
+
+Transcripts are `[start, duration, text]` snippets as stored by the transcript
+cache. When the joined text is over budget, filler sounds, stuttered words and
+repeated captions are dropped, the hook window is always kept and the
+remaining budget goes to the most informative chunks, which are returned in
+their original order. Words that can carry meaning ("i mean", "kind of") are
+never dropped on their own.
+"""
+import re
+from collections import Counter
+
+
+# Rough Gemini ratio for English text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+HOOK_SECONDS = 60
+CHUNK_SECONDS = 30
+
+# Only sounds that carry no meaning: phrases such as "i mean" or "kind of"
+# change what a quoted sentence says, so they stay
+_FILLER_RE = re.compile(r"\[(?:music|applause|laughter)\]|\b(?:um+|uh+|erm+|hmm+)\b[,.]?\s*", re.IGNORECASE)
+# Words English doubles on purpose ("I know that that is true"), never taken for a stutter
+_DOUBLED_WORDS = frozenset(["that", "had", "is"])
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]?$")
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'+.-]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from have i if in is it its just like of on or so that the "
+    "then this to was we what when with you your they there here do does did not can will gonna "
+    "going get got really very okay ok yeah right now all one out up about".split()
+)
+
+
+def format_timestamp(seconds:float):
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def join_snippets(snippets, timestamps:bool=False):
+    """
+    Joins `[start, duration, text]` snippets into one string in a single pass.
+
+    Without timestamps the snippets are separated by a space so words at snippet
+    boundaries stay apart. With timestamps every snippet goes on its own line
+    prefixed with its start time, e.g. "[1:05] text".
+    """
+    if timestamps:
+        return "\n".join([
+            "[" + format_timestamp(start) + "] " + text.replace("\n", " ")
+            for start, _, text in snippets
+        ])
+    # Caption lines are wrapped with newlines inside a snippet
+    return " ".join([text for _, _, text in snippets]).replace("\n", " ")
+
+
+def iter_windows(snippets, window_seconds:float=HOOK_SECONDS, timestamps:bool=False):
+    """
+    Yields the transcript in consecutive windows of `window_seconds`, starting at 0.
+
+    Windows are produced one at a time without joining the whole transcript
+    first; windows without any caption are skipped.
+
+    Raises:
+        ValueError: If `window_seconds` is not above 0.
+
+    Yields:
+        {"start": float, "end": float, "text": str} dictionaries.
+    """
+    if not window_seconds > 0:
+        raise ValueError(f"window_seconds must be above 0, got {window_seconds}")
+    window = []
+    index = None
+    for snippet in snippets:
+        snippet_index = int(snippet[0] // window_seconds)
+        if window and snippet_index != index:
+            yield {"start": index * window_seconds, "end": (index + 1) * window_seconds, "text": join_snippets(window, timestamps)}
+            window = []
+        index = snippet_index
+        window.append(snippet)
+    if window:
+        yield {"start": index * window_seconds, "end": (index + 1) * window_seconds, "text": join_snippets(window, timestamps)}
+
+
+def select_range(snippets, start:float, end:float):
+    """Returns the snippets that overlap the `start` to `end` seconds of the video."""
+    return [snippet for snippet in snippets if snippet[0] < end and snippet[0] + snippet[1] > start]
+
+
+def sample_ranges(video_seconds:float, samples:int, window_seconds:float=HOOK_SECONDS):
+    """
+    Returns `samples` evenly spaced `[start, end]` windows covering the video from
+    its first to its last `window_seconds`, so the hook is always the first one.
+    """
+    if samples <= 1 or video_seconds <= window_seconds:
+        return [[0.0, min(window_seconds, video_seconds) if video_seconds else window_seconds]]
+    step = (video_seconds - window_seconds) / (samples - 1)
+    if step < window_seconds:
+        # More samples than fit side by side, the windows would overlap
+        samples = int((video_seconds - window_seconds) // window_seconds) + 1
+        step = (video_seconds - window_seconds) / max(1, samples - 1)
+    return [[round(i * step, 2), round(i * step + window_seconds, 2)] for i in range(samples)]
+
+
+def estimate_tokens(text:str):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _drop_stutters(text):
+    # A word said again right away ("we we tried") is kept once; a comma in
+    # between ("tried it, it works") means it is not a stutter
+    words = []
+    previous = None
+    for word in text.split():
+        key = word.lower()
+        if key == previous and key.isalpha() and key not in _DOUBLED_WORDS:
+            continue
+        words.append(word)
+        previous = key
+    return " ".join(words)
+
+
+def clean_snippets(snippets):
+    """Removes filler sounds ("um", "uh"), stuttered repeats of a word and captions that repeat the previous one."""
+    cleaned = []
+    previous = ""
+    for start, duration, text in snippets:
+        text = _drop_stutters(_FILLER_RE.sub("", text))
+        if not text:
+            continue
+        key = text.lower()
+        # Auto captions often repeat the tail of the previous line
+        if key == previous or previous.endswith(key):
+            continue
+        previous = key
+        cleaned.append([start, duration, text])
+    return cleaned
+
+
+def chunk_snippets(snippets, chunk_seconds:float=CHUNK_SECONDS):
+    """
+    Groups snippets into chunks of about `chunk_seconds`, closing a chunk at the
+    first sentence end after the window is full so sentences are not split.
+
+    Returns:
+        A list of {"start": float, "end": float, "text": str} dictionaries.
+    """
+    chunks = []
+    texts = []
+    chunk_start = None
+    end = 0.0
+    for start, duration, text in snippets:
+        if chunk_start is None:
+            chunk_start = start
+        texts.append(text)
+        end = start + duration
+        window_full = end - chunk_start >= chunk_seconds
+        if window_full and (_SENTENCE_END_RE.search(text) or end - chunk_start >= 2 * chunk_seconds):
+            chunks.append({"start": chunk_start, "end": end, "text": " ".join(texts)})
+            texts = []
+            chunk_start = None
+    if texts:
+        chunks.append({"start": chunk_start, "end": end, "text": " ".join(texts)})
+    return chunks
+
+
+def _score_chunks(chunks):
+    # Average document frequency weighted term count; chunks that mention the
+    # video's recurring technical terms score higher than small talk
+    words = [[w for w in _WORD_RE.findall(chunk["text"].lower()) if w not in _STOPWORDS] for chunk in chunks]
+    frequency = Counter(w for chunk_words in words for w in set(chunk_words))
+    scores = []
+    for chunk_words in words:
+        if not chunk_words:
+            scores.append(0.0)
+            continue
+        # Numbers, versions and names are usually the settings a writer needs
+        bonus = sum(1 for w in chunk_words if any(c.isdigit() for c in w))
+        scores.append((sum(frequency[w] for w in set(chunk_words)) + 2 * bonus) / len(chunk_words) ** 0.5)
+    return scores
+
+
+def compress_transcript(snippets, max_tokens:int, hook_seconds:float=HOOK_SECONDS, timestamps:bool=False):
+    """
+    Returns the transcript text shortened to about `max_tokens`, plus a size report.
+
+    The text is returned unchanged when it already fits. Otherwise filler and
+    repeated captions are removed, the first `hook_seconds` are kept in full and
+    the highest scoring chunks fill the rest of the budget. Skipped parts are
+    marked with "[...]".
+
+    Returns:
+        (text, report) where report has "original_tokens", "compressed_tokens",
+        "chunks_total" and "chunks_kept".
+    """
+    original = join_snippets(snippets, timestamps)
+    original_tokens = estimate_tokens(original)
+    report = {"original_tokens": original_tokens, "compressed_tokens": original_tokens, "chunks_total": 0, "chunks_kept": 0}
+    if not max_tokens or original_tokens <= max_tokens:
+        return original, report
+
+    cleaned = clean_snippets(snippets)
+    chunks = chunk_snippets(cleaned)
+    for chunk in chunks:
+        prefix = f"[{format_timestamp(chunk['start'])}] " if timestamps else ""
+        chunk["rendered"] = prefix + chunk["text"]
+        chunk["tokens"] = estimate_tokens(chunk["rendered"]) + 1
+
+    keep = set()
+    used = 0
+    # The hook is always kept, even if it alone takes most of the budget
+    for i, chunk in enumerate(chunks):
+        if chunk["start"] < hook_seconds:
+            keep.add(i)
+            used += chunk["tokens"]
+
+    scores = _score_chunks(chunks)
+    for i in sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True):
+        if i in keep:
+            continue
+        if used + chunks[i]["tokens"] + 2 > max_tokens:
+            continue
+        keep.add(i)
+        used += chunks[i]["tokens"] + 2
+
+    parts = []
+    previous = -1
+    for i in sorted(keep):
+        if i != previous + 1:
+            parts.append("[...]")
+        parts.append(chunks[i]["rendered"])
+        previous = i
+    if previous != len(chunks) - 1:
+        parts.append("[...]")
+
+    text = ("\n" if timestamps else " ").join(parts)
+    report.update(compressed_tokens=estimate_tokens(text), chunks_total=len(chunks), chunks_kept=len(keep))
+    return text, report
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .transcript_cache import transcript_cache
+from .transcript_client import transcript_client
+from .transcript_processing import (
+    HOOK_SECONDS, compress_transcript, estimate_tokens, iter_windows, join_snippets, sample_ranges, select_range,
+)
+
+
+# Covers watch?v=, youtu.be/, /shorts/, /embed/, /live/, /v/ on any subdomain
+# (www., m., music.) and youtube-nocookie.com, with the id anywhere in the query
+_VIDEO_URL_RE = re.compile(
+    r"(?:youtu\.be/|youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*?&)?v=|(?:shorts|embed|live|v|e)/))"
+    r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])"
+)
+_VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}")
+
+# Upper bound on transcripts downloaded at the same time by get_subtitles_batch, over all batches
+MAX_CONCURRENT_FETCHES = 8
+# A fetch that timed out keeps its worker thread until the download returns,
+# so the batch fetches run on their own pool, which holds the bound even then
+_batch_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES, thread_name_prefix="transcripts")
+# Transcripts longer than this many tokens are compressed before being returned
+DEFAULT_MAX_TOKENS = int(os.environ.get("TRANSCRIPT_MAX_TOKENS", 8000))
+
+
+def extract_video_id(url:str):
+    """
+    Returns the 11 character video id of a Youtube url, or the url itself if it already is an id.
+
+    Raises:
+        ValueError: If no video id can be found.
+    """
+    url = url.strip()
+    match = _VIDEO_URL_RE.search(url)
+    if match:
+        return match.group(1)
+    if _VIDEO_ID_RE.fullmatch(url):
+        return url
+    raise ValueError(f"Could not find a Youtube video id in {url!r}")
+
+
+async def get_subtitles(url:str, timestamps:bool=False, max_tokens:int=DEFAULT_MAX_TOKENS):
+    """
+    Returns the subtitles of a Youtube video as a string.
+
+    Args:
+        url: Url of the Youtube video
+        example: "https://www.youtube.com/watch?v=CKS1glzmDVc"
+        timestamps: If True every line of the subtitles starts with its time in the video, e.g. "[0:45]"
+        max_tokens: Longer subtitles are condensed to about this many tokens, keeping the first 60 seconds
+            and the most informative parts; skipped parts are marked "[...]". Use 0 for the full subtitles.
+    Returns:
+        A dictionary with a "status" key indicating success or error, and a "subtitles" key containing the subtitles if successful.
+        "original_tokens" and "compressed_tokens" report the estimated size before and after condensing.
+        Success: {"status":"success","subtitles":<subtitles_string>,"original_tokens":<int>,"compressed_tokens":<int>}
+        Error: {"status":"error","message":<error_message>}
+
+    """
+    # The transcript api blocks while it downloads, and ADK runs function tools
+    # on the event loop every session shares, so the work runs in a worker thread
+    return await asyncio.to_thread(_get_subtitles, url, timestamps, max_tokens)
+
+
+def _get_subtitles(url, timestamps, max_tokens):
+    """Blocking part of get_subtitles, for worker threads."""
+    try:
+        vid_id = extract_video_id(url)
+    except ValueError as e:
+        return {"status":"error","message":str(e)}
+
+    # Served from the local cache when the video was fetched before
+    snippets = transcript_cache.get_or_fetch(vid_id, transcript_client.fetch)
+
+    if not snippets:
+        return {"status":"error","message":"No subtitles found"}
+
+    result, report = compress_transcript(snippets, max_tokens, timestamps=timestamps)
+
+    if not result:
+        return {"status":"error","message":"No subtitles found"}
+    return {
+        "status":"success",
+        "subtitles":result,
+        "original_tokens":report["original_tokens"],
+        "compressed_tokens":report["compressed_tokens"],
+    }
+
+
+async def get_subtitles_range(url:str, start:float=0, end:float=HOOK_SECONDS, samples:int=0, window:float=HOOK_SECONDS, timestamps:bool=True):
+    """
+    Returns only part of the subtitles of a Youtube video: one time range, or a few evenly spaced windows.
+
+    Use it to analyse the hook from the first 60 seconds (the defaults) without reading the
+    whole video, or with `samples` to see how the video is structured from a few short windows.
+
+    Args:
+        url: Url of the Youtube video
+        example: "https://www.youtube.com/watch?v=CKS1glzmDVc"
+        start: Start of the range in seconds
+        end: End of the range in seconds
+        samples: If above 0, `start` and `end` are ignored and this many windows of `window` seconds,
+            spread from the beginning to the end of the video, are returned instead. The first one is the hook.
+        window: Length of each sampled window in seconds
+        timestamps: If True every line of the subtitles starts with its time in the video, e.g. "[0:45]"
+    Returns:
+        A dictionary with a "status" key indicating success or error, and a "subtitles" key containing the subtitles if successful.
+        "ranges" lists the [start, end] seconds returned, skipped parts are marked "[...]".
+        Success: {"status":"success","subtitles":<subtitles_string>,"ranges":[[0,60]],"video_seconds":<float>,"tokens":<int>}
+        Error: {"status":"error","message":<error_message>}
+
+    """
+    return await asyncio.to_thread(_get_subtitles_range, url, start, end, samples, window, timestamps)
+
+
+def _get_subtitles_range(url, start, end, samples, window, timestamps):
+    """Blocking part of get_subtitles_range, for worker threads."""
+    # The arguments come from the model, so bad values are reported back to it
+    if samples > 0 and not window > 0:
+        return {"status":"error","message":f"window must be above 0 seconds, got {window}"}
+    if samples <= 0 and not start < end:
+        return {"status":"error","message":f"start ({start}) must be before end ({end})"}
+    try:
+        vid_id = extract_video_id(url)
+    except ValueError as e:
+        return {"status":"error","message":str(e)}
+
+    snippets = transcript_cache.get_or_fetch(vid_id, transcript_client.fetch)
+    if not snippets:
+        return {"status":"error","message":"No subtitles found"}
+
+    video_seconds = snippets[-1][0] + snippets[-1][1]
+    ranges = sample_ranges(video_seconds, samples, window) if samples > 0 else [[start, end]]
+    parts = []
+    for range_start, range_end in ranges:
+        selected = select_range(snippets, range_start, range_end)
+        if selected:
+            parts.append(join_snippets(selected, timestamps))
+
+    if not parts:
+        return {"status":"error","message":"No subtitles in the requested range"}
+    result = ("\n[...]\n" if timestamps else " [...] ").join(parts)
+    return {
+        "status":"success",
+        "subtitles":result,
+        "ranges":ranges,
+        "video_seconds":video_seconds,
+        "tokens":estimate_tokens(result),
+    }
+
+
+async def stream_subtitles(url:str, window:float=HOOK_SECONDS, timestamps:bool=True):
+    """
+    Yields the subtitles of a Youtube video one time window at a time, starting with the hook.
+
+    The transcript api downloads a transcript in one request, so the fetch runs
+    in a worker thread and the windows are then produced lazily; a caller can
+    start on the first window without the rest being joined or compressed.
+
+    Raises:
+        ValueError: If `window` is not above 0, `url` has no video id or the video has no subtitles.
+
+    Yields:
+        {"start": float, "end": float, "text": str} dictionaries.
+    """
+    # Checked before the download, which would be wasted otherwise
+    if not window > 0:
+        raise ValueError(f"window must be above 0 seconds, got {window}")
+    vid_id = extract_video_id(url)
+    snippets = await asyncio.to_thread(transcript_cache.get_or_fetch, vid_id, transcript_client.fetch)
+    if not snippets:
+        raise ValueError(f"No subtitles found for {vid_id}")
+    for chunk in iter_windows(snippets, window, timestamps):
+        yield chunk
+
+
+async def get_subtitles_batch(urls:list[str], timeout:float=30, max_tokens:int=DEFAULT_MAX_TOKENS):
+    """
+    Returns the subtitles of several Youtube videos, fetched at the same time.
+
+    Args:
+        urls: Urls of the Youtube videos
+        example: ["https://www.youtube.com/watch?v=CKS1glzmDVc", "https://youtu.be/eC8mZceIy5k"]
+        timeout: Seconds to wait for each video once its download has started before giving up on it
+        max_tokens: Token budget for each video's subtitles, as in get_subtitles. Use 0 for the full subtitles.
+    Returns:
+        A dictionary with a "status" key and a "results" list with one entry per url, in the same order.
+        Each entry has the "url" and the same keys get_subtitles returns for it, so some videos
+        can fail while the others still succeed.
+        Success: {"status":"success","results":[{"url":<url>,"status":"success","subtitles":<subtitles_string>}, {"url":<url>,"status":"error","message":<error_message>}]}
+
+    """
+    loop = asyncio.get_running_loop()
+
+    async def fetch_one(url):
+        started = asyncio.Event()
+
+        def fetch():
+            loop.call_soon_threadsafe(started.set)
+            return _get_subtitles(url, False, max_tokens)
+
+        future = loop.run_in_executor(_batch_pool, fetch)
+        try:
+            # The timeout starts when a worker picks the video up: waiting for a
+            # worker, behind this batch, another one or a timed out download, is not counted
+            await started.wait()
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            result = {"status":"error","message":f"Timed out after {timeout} seconds"}
+        except Exception as e:
+            result = {"status":"error","message":f"{type(e).__name__}: {e}"}
+        finally:
+            # Takes a video that never started off the queue when the batch is cancelled
+            future.cancel()
+        return {"url":url, **result}
+
+    results = await asyncio.gather(*(fetch_one(url) for url in urls))
+    return {"status":"success","results":results}
+
+
+if __name__ == "__main__":
+    # Run from the repository root: python -m common.youtube_script_tool
+    url = "https://youtu.be/eC8mZceIy5k"
+    subtitles = asyncio.run(get_subtitles(url))
+    print(subtitles)
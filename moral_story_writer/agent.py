@@ -1,14 +1,349 @@
-from google.adk.agents import Agent
-from google.adk.tools import AgentTool, google_search
-from google.adk.models import Gemini
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.adk.agents import Agent, BaseAgent, LoopAgent, SequentialAgent
+from google.adk.events import Event, EventActions
 from google.genai import types
 
+from common.dedup_index import DedupIndex
+from common.disk_cache import CACHE_DIR
+from common.metrics import enable_metrics
+from common.model_pool import get_model
+from common.response_cache import enable_response_cache
+
+# Morals written per model call, so the instructions are sent once per batch
+# instead of once per story
+BATCH_SIZE = int(os.environ.get("STORY_BATCH_SIZE", 4))
+STORY_WORDS = int(os.environ.get("STORY_WORDS", 250))
+
+# Every story written is indexed here. A moral that was written before gets its
+# story back without a model call (STORY_REUSE=0 always writes a new one), and a
+# new story that nearly repeats an indexed one is rejected and asked for again
+INDEX_PATH = os.environ.get("STORY_INDEX_PATH", os.path.join(CACHE_DIR, "stories.sqlite3"))
+SIMILARITY = float(os.environ.get("STORY_SIMILARITY", 0.8))
+REUSE = os.environ.get("STORY_REUSE", "1") != "0"
+
+# Times a moral is put in a batch before it is given up
+MAX_ATTEMPTS = 2
+
+# The index hashes in pure Python and queries SQLite, so it runs off the event
+# loop, on one thread: a thread per session would all hash at once and hold
+# the GIL the loop needs
+_index_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="story-index")
+
+
+async def _in_index_thread(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(_index_pool, function, *args)
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    initial_delay=2,
-    exp_base=3,
-    http_status_codes=[503,429]
+
+story_writer = Agent(
+    name="StoryWriter",
+    model=get_model("gemini-2.5-flash"),
+    static_instruction=f"""You are a children's story writer. Write one short, original story of about {STORY_WORDS} words for every numbered moral you are given.
+    The story should show the moral through what its characters do, with a clear beginning, middle and end, in simple language for children aged 6 to 10.
+    Give every story its own characters, setting and plot.
+    Start each story with a line "## <number>. <title>", using the number of its moral, and write nothing but the stories.""",
+    instruction="Morals:\n{story_batch}",
+    # Every batch stands on its own, the writer only sees its own morals
+    include_contents="none",
+    output_key="story_batch_output",
 )
 
 
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_STORY_HEADER_RE = re.compile(r"^#{1,3}\s*(?:Story\s*)?(\d+)[.):]?\s*(.*)$", re.MULTILINE)
+
+
+def parse_morals(text:str):
+    """Returns the morals of a user message: one per line, or separated by semicolons on a single line."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) == 1:
+        lines = lines[0].split(";")
+    morals = [_LIST_MARKER_RE.sub("", line).strip() for line in lines]
+    return [moral for moral in morals if moral]
+
+
+def batch_prompt(records):
+    """Returns the numbered list of morals the writer gets for one batch."""
+    lines = []
+    for number, record in enumerate(records, start=1):
+        line = f"{number}. {record['moral']}"
+        if record.get("avoid"):
+            line += f' (not like the story "{record["avoid"]}": use new characters, a new setting and a new plot)'
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def split_stories(text:str):
+    """Returns `{number: (title, story)}` for the stories of a batch answer."""
+    matches = list(_STORY_HEADER_RE.finditer(text))
+    stories = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        story = text[match.end():following.start() if following else len(text)].strip()
+        if story:
+            stories.setdefault(int(match.group(1)), (match.group(2).strip(" *#") or "Untitled", story))
+    return stories
+
+
+def _record(moral):
+    return {
+        "moral": moral,
+        "status": "pending",
+        "title": None,
+        "story": None,
+        "attempts": 0,
+        "prompt_tokens": 0,
+        "output_tokens": 0,
+        "seconds": 0.0,
+    }
+
+
+class QueueMoralsAgent(BaseAgent):
+    """
+    Reads the morals of the user message into `state["stories"]` and queues the
+    ones that need a story. Morals already in `index`, or repeated in the
+    message, are answered with the existing story.
+    """
+
+    index: DedupIndex
+    reuse: bool = True
+
+    async def _run_async_impl(self, ctx):
+        text = "".join(part.text or "" for part in (ctx.user_content.parts or [])) if ctx.user_content else ""
+        stories, queue, seen = [], [], {}
+        for i, moral in enumerate(parse_morals(text)):
+            record = _record(moral)
+            normalized = self.index.normalize(moral)
+            entry = await _in_index_thread(self.index.lookup, "moral", moral) if self.reuse else None
+            if normalized in seen:
+                record.update(status="reused", same_as=seen[normalized])
+            elif entry is not None and entry["match"] == "exact":
+                # Only the exact moral: a near-duplicate may well mean the opposite
+                record.update(status="reused", title=entry["title"], story=entry["story"])
+            else:
+                queue.append(i)
+            seen.setdefault(normalized, i)
+            stories.append(record)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"stories": stories, "story_queue": queue, "story_batches": 0}),
+        )
+
+
+class NextBatchAgent(BaseAgent):
+    """First step of the story loop: puts the next `batch_size` queued morals in `state["story_batch"]`, or ends the loop."""
+
+    batch_size: int
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        queue = state.get("story_queue") or []
+        if not queue:
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                branch=ctx.branch,
+                actions=EventActions(escalate=True),
+            )
+            return
+        batch = queue[:self.batch_size]
+        # A message from another agent starts the writer's turn, so with
+        # include_contents="none" the earlier batches are not sent again
+        progress = f"Writing {len(batch)} stories, {len(queue) - len(batch)} more queued"
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=progress)]),
+            actions=EventActions(state_delta={
+                "story_queue": queue[self.batch_size:],
+                "story_batch": batch_prompt([state["stories"][i] for i in batch]),
+                "story_batch_ids": batch,
+                "story_batch_started": time.time(),
+            }),
+        )
+
+
+class CollectStoriesAgent(BaseAgent):
+    """
+    Last step of the story loop: splits the writer's answer into stories and
+    indexes the new ones. A story that nearly repeats an indexed one is
+    rejected without another model call, and its moral is queued again with
+    the title to stay away from until it has had `max_attempts` batches.
+
+    The prompt tokens of the batch are shared evenly between its morals, the
+    output tokens and the seconds by the length of each story.
+    """
+
+    index: DedupIndex
+    writer: str
+    max_attempts: int = MAX_ATTEMPTS
+
+    def _usage(self, ctx, started):
+        calls = [
+            event for event in ctx.session.events
+            if event.invocation_id == ctx.invocation_id and event.author == self.writer
+            and not event.partial and event.usage_metadata is not None and event.timestamp >= started
+        ]
+        prompt_tokens = sum(event.usage_metadata.prompt_token_count or 0 for event in calls)
+        output_tokens = sum(event.usage_metadata.candidates_token_count or 0 for event in calls)
+        # The writer's events are stamped before its model call, so the batch
+        # is timed up to now, right after the writer finished
+        seconds = time.time() - started if calls else 0.0
+        return prompt_tokens, output_tokens, seconds
+
+    def _store(self, moral, title, story):
+        self.index.store("story", story, moral=moral, title=title)
+        self.index.store("moral", moral, title=title, story=story)
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        stories = [dict(record) for record in state["stories"]]
+        batch = state.get("story_batch_ids") or []
+        answers = split_stories(state.get("story_batch_output") or "")
+        prompt_tokens, output_tokens, seconds = self._usage(ctx, state.get("story_batch_started") or 0.0)
+
+        lengths = [len(answers[n][1]) if n in answers else 0 for n in range(1, len(batch) + 1)]
+        total = sum(lengths)
+        requeue = []
+        for number, (i, length) in enumerate(zip(batch, lengths), start=1):
+            record = stories[i]
+            share = length / total if total else 1 / len(batch)
+            record["attempts"] += 1
+            record["prompt_tokens"] += round(prompt_tokens / len(batch))
+            record["output_tokens"] += round(output_tokens * share)
+            record["seconds"] += seconds * share
+
+            title, story = answers.get(number, (None, None))
+            duplicate = await _in_index_thread(self.index.lookup, "story", story) if story else None
+            if story and duplicate is None:
+                await _in_index_thread(self._store, record["moral"], title, story)
+                record.update(status="new", title=title, story=story)
+                continue
+            if duplicate is not None:
+                record.update(avoid=duplicate["title"], duplicate_of=duplicate["moral"], rejected=record.get("rejected", 0) + 1)
+            if record["attempts"] < self.max_attempts:
+                requeue.append(i)
+            else:
+                record["status"] = "duplicate" if duplicate is not None else "failed"
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                "stories": stories,
+                "story_queue": (state.get("story_queue") or []) + requeue,
+                "story_batches": (state.get("story_batches") or 0) + 1,
+            }),
+        )
+
+
+class StoryReportAgent(BaseAgent):
+    """Answers with the stories and a per-story token and latency table, which is also left in `state["story_report"]`."""
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        stories = [dict(record) for record in state.get("stories") or []]
+        for record in stories:
+            if "same_as" in record:
+                record.update(title=stories[record["same_as"]]["title"], story=stories[record["same_as"]]["story"])
+
+        rows = [
+            {key: record[key] for key in ("moral", "status", "attempts", "prompt_tokens", "output_tokens")}
+            | {"seconds": round(record["seconds"], 3), "rejected": record.get("rejected", 0)}
+            for record in stories
+        ]
+        report = {
+            "stories": len(stories),
+            "model_calls": state.get("story_batches") or 0,
+            "prompt_tokens": sum(row["prompt_tokens"] for row in rows),
+            "output_tokens": sum(row["output_tokens"] for row in rows),
+            "seconds": round(sum(row["seconds"] for row in rows), 3),
+            "rejected": sum(row["rejected"] for row in rows),
+            **{status: sum(1 for row in rows if row["status"] == status) for status in ("new", "reused", "duplicate", "failed")},
+            "rows": rows,
+        }
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=format_stories(stories, report))]),
+            actions=EventActions(state_delta={"story_report": report}),
+        )
+
+
+def format_report(report):
+    """Formats the rows of a story report as a markdown table with a total line."""
+    lines = [
+        "| # | moral | status | attempts | prompt tok | output tok | seconds |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for number, row in enumerate(report["rows"], start=1):
+        lines.append(
+            f"| {number} | {row['moral']} | {row['status']} | {row['attempts']} "
+            f"| {row['prompt_tokens']} | {row['output_tokens']} | {row['seconds']:.2f} |"
+        )
+    lines.append(
+        f"\n{report['stories']} stories: {report['new']} new, {report['reused']} reused, "
+        f"{report['duplicate'] + report['failed']} not written, {report['rejected']} duplicates rejected; "
+        f"{report['model_calls']} model calls, {report['prompt_tokens']} prompt and {report['output_tokens']} output tokens"
+    )
+    return "\n".join(lines)
+
+
+def format_stories(stories, report):
+    """Returns the answer of StoryReportAgent: the stories that were written or reused, then the report."""
+    if not stories:
+        return "Send the morals to write stories for, one per line."
+    parts = [
+        f"## {record['title']}\n*Moral: {record['moral']}*\n\n{record['story']}"
+        for record in stories if record["story"]
+    ]
+    return "\n\n".join(parts + [format_report(report)])
+
+
+def story_index(path=INDEX_PATH, similarity=SIMILARITY):
+    """Returns the index of written stories at `path`; they do not expire."""
+    return DedupIndex(path, ttl=None, similarity=similarity, max_entries=20000, table="stories")
+
+
+def build_pipeline(batch_size=BATCH_SIZE, index=None, reuse=REUSE):
+    """
+    Returns a new story pipeline that writes `batch_size` stories per model call.
+
+    `index` is the DedupIndex of the stories written so far, by default the
+    one at STORY_INDEX_PATH. The writer is cloned because an ADK agent can
+    only belong to one pipeline.
+    """
+    index = index if index is not None else story_index()
+    writer = story_writer.clone()
+    return SequentialAgent(
+        name="MoralStoryPipeline",
+        sub_agents=[
+            QueueMoralsAgent(name="QueueMorals", index=index, reuse=reuse),
+            LoopAgent(
+                name="StoryBatches",
+                sub_agents=[
+                    NextBatchAgent(name="NextBatch", batch_size=batch_size),
+                    writer,
+                    CollectStoriesAgent(name="CollectStories", index=index, writer=writer.name),
+                ],
+            ),
+            StoryReportAgent(name="StoryReport"),
+        ]
+    )
+
+
+root_agent = build_pipeline()
+
+# Replays unchanged steps from disk when LLM_RESPONSE_CACHE names them
+response_cache = enable_response_cache(root_agent)
+
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
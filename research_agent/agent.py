@@ -1,54 +1,42 @@
-from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool, google_search 
-from google.genai import types
+import os
 
+from google.adk.agents import Agent, SequentialAgent
+from google.adk.tools import AgentTool, google_search 
 
+from common.metrics import enable_metrics
+from common.model_pool import get_model
+from common.research_cache import enable_research_cache
+from common.response_cache import enable_response_cache
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429,500,503,504]
-)
+# "coordinator" lets an LLM call the research and summary agents as tools,
+# "sequential" runs them in that fixed order without the coordinator's turns
+PIPELINE_MODE = os.environ.get("RESEARCH_PIPELINE_MODE", "coordinator")
 
 def hello():
-    print("Hello")
+    return "Hello"
 
 
 research_agent = Agent(
     name="ResearchAgent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash-lite"),
     instruction="""You are a specialized research agent. Your only job is to use the
     `google_search` tool to find 4-5 pieces of relevant information on the given topic and present the findings with citations.""",
     tools=[google_search, hello],
     output_key="research_findings",  # The result of this agent will be stored in the session state with this key.
 )
-print("Research Agent Created!!")
 
 
 summarizer_agent = Agent(
     name="SummarizerAgent",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash"),
     instruction="""Read the provided research findings: {research_findings}. Create a concise summary as a bulleted list with 3-5 key points.""",
     output_key="final_summary"
 )
-print("Summary Agent Created!!")
 
 # Root Coordinator: Orchestrates the workflow by calling the sub-agents as tools.
-root_agent = Agent(
+coordinator_agent = Agent(
     name="ResearchCoordinator",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
+    model=get_model("gemini-2.5-flash-lite"),
     # This instruction tells the root agent HOW to use its tools (which are the other agents).
     instruction="""You are a research coordinator. Your goal is to answer the user's query by orchestrating a workflow.
 1. First, you MUST call the `ResearchAgent` tool to find relevant information on the topic provided by the user.
@@ -57,4 +45,36 @@ root_agent = Agent(
     # We wrap the sub-agents in `AgentTool` to make them callable tools for the root agent.
     tools=[AgentTool(research_agent), AgentTool(summarizer_agent)],
 )
-print("root_agent created.")
\ No newline at end of file
+
+
+def build_pipeline(mode=PIPELINE_MODE):
+    """
+    Returns a new research pipeline for `mode`, either "coordinator" or "sequential".
+
+    Both leave the findings in state["research_findings"] and the summary in
+    state["final_summary"]. The agents are cloned because an ADK agent can only
+    belong to one pipeline.
+    """
+    if mode == "coordinator":
+        return coordinator_agent.clone({
+            "tools": [AgentTool(research_agent.clone()), AgentTool(summarizer_agent.clone())],
+        })
+    if mode == "sequential":
+        # The summary is the last response, so it is the answer the user sees
+        return SequentialAgent(
+            name="ResearchPipeline",
+            sub_agents=[research_agent.clone(), summarizer_agent.clone()],
+        )
+    raise ValueError(f"Unknown RESEARCH_PIPELINE_MODE {mode!r}, expected 'coordinator' or 'sequential'")
+
+
+root_agent = build_pipeline()
+
+# Answers repeated or reworded queries from earlier research when RESEARCH_CACHE names ResearchAgent
+research_cache = enable_research_cache(root_agent)
+
+# Replays unchanged steps from disk when LLM_RESPONSE_CACHE names them
+response_cache = enable_response_cache(root_agent)
+
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
@@ -0,0 +1,19 @@
+"""
+Custom services picked up by `adk web` / `adk api_server` from this directory.
+
+    adk web --session_service_uri compact:///home/me/.cache/agents/sessions.sqlite3
+    adk web --session_service_uri compact://    (default location under ~/.cache/agents)
+"""
+from urllib.parse import urlparse
+
+from google.adk.cli.service_registry import get_service_registry
+
+
+def compact_session_factory(uri, **kwargs):
+    from common.session_store import DEFAULT_SESSION_PATH, CompactSessionService
+
+    path = urlparse(uri).path or DEFAULT_SESSION_PATH
+    return CompactSessionService(path)
+
+
+get_service_registry().register_session_service("compact", compact_session_factory)
@@ -1,2 +1 @@
 from . import agent
-from . import youtube_script_tool
\ No newline at end of file
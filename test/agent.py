@@ -1,23 +1,20 @@
 from google.adk.agents.llm_agent import Agent
-from google.adk.models import Gemini
 from google.adk.tools import AgentTool, url_context
-from .youtube_script_tool import get_subtitles
+from common.metrics import enable_metrics
+from common.model_pool import get_model
+from common.youtube_script_tool import get_subtitles
 
 
 script_writer = Agent(
     name="script_writer",
-    model = Gemini(
-        model = "gemini-3-pro-preview"
-    ),
+    model = get_model("gemini-3-pro-preview"),
     instruction = "You are a helpful script writer",
     
 
 )
 
 root_agent = Agent(
-    model=Gemini(
-        model="gemini-2.5-flash"
-    ),
+    model=get_model("gemini-2.5-flash"),
     name='root_agent',
     description='A helpful assistant for user questions.',
     instruction="""
@@ -26,3 +23,5 @@ root_agent = Agent(
     tools = [get_subtitles, url_context]
 )
 
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
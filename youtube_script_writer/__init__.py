@@ -1,2 +1,15 @@
-from . import  agent
-from . import youtube_script_tool
\ No newline at end of file
+import importlib
+
+
+def __getattr__(name):
+    # The agents are built on the first access to root_agent, not when the
+    # package is imported. Only importers that never touch root_agent save
+    # anything: ADK's loader reads it right after the import
+    if name in ("agent", "root_agent", "app"):
+        agent = importlib.import_module(f"{__name__}.agent")
+        if name == "app":
+            # ADK's loader asks for `app` first; without context caching it is
+            # None and the root agent is served as before
+            return agent.app or agent.root_agent
+        return agent if name == "agent" else agent.root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,35 +1,27 @@
-from google.genai import types
+import os
 
 from google.adk.agents import LlmAgent, SequentialAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.sessions import InMemorySessionService
-from google.adk.tools import google_search, AgentTool
-from google.adk.code_executors import BuiltInCodeExecutor
 
-from .youtube_script_tool import get_subtitles
+from common.context_cache import enable_context_cache
+from common.loop_control import ApprovalGate, ConvergenceGate
+from common.metrics import enable_metrics
+from common.model_router import route
+from common.response_cache import enable_response_cache
+from common.script_sections import SECTIONS_MARKER, ScriptPatchMerger, tagged_instruction
+from common.session_store import enable_resume
+from common.youtube_script_tool import get_subtitles, get_subtitles_batch, get_subtitles_range
 
-
-retry_config=types.HttpRetryOptions(
-    attempts=3,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504], # Retry on these HTTP errors
-)
-
-
-def exit_loop():
-    """Call this function ONLY when the critique is 'APPROVED', indicating the story is finished and no more changes are needed."""
-    return {"status": "approved", "message": "Story approved. Exiting refinement loop."}
+# "full" has the rewriter send back the whole script on every loop iteration,
+# "patch" only the sections the critique flagged, merged in without a model call
+REWRITE_MODE = os.environ.get("SCRIPT_REWRITE_MODE", "full")
 
 researcher = LlmAgent(
     name = "researcher_agent",
     description = "Agent responsible for researching the topic",
-    model = Gemini(
-        model = "gemini-3-pro-preview",
-        retry_options = retry_config
-    ),
-    instruction = """
+    model = route("researcher"),
+    # Fixed preamble first and the state dependent part in `instruction`, so the
+    # system instruction is the same on every call and can be context cached
+    static_instruction = """
     ###ROLE### You are the Lead Technical Content Strategist for a high-growth AI Review and Tutorial YouTube channel. Your expertise lies in deconstructing complex technical videos (tutorials, software tests, AI news) and extracting the "DNA" of their success to help a scriptwriter replicate the quality while adding unique value.
 
     ###CONTEXT### The user is a scriptwriter for an AI-focused channel. They need to analyze successful competitor videos or reference material to understand:
@@ -38,7 +30,7 @@ researcher = LlmAgent(
     The specific technical references or documentation used. The goal is not to copy, but to provide a "Context Brief" that the scriptwriter can use to write an original, high-retention script.
 
     ###TASK### Your mission is to analyze a YouTube video using its transcript. Follow these steps:
-    Fetch Data: Use the get_subtitles tool to retrieve the full transcript of the provided URL.
+    Fetch Data: Use the get_subtitles tool to retrieve the full transcript of the provided URL. If several reference URLs are provided, use the get_subtitles_batch tool once with all of them instead of calling get_subtitles for each. To study the hook or get a quick overview of a long video first, get_subtitles_range returns just the first 60 seconds, or a few sampled windows with `samples`.
     Deconstruct Structure: Break the video into its core phases: The Hook (0-60s), The Problem/Context, The Step-by-Step Tutorial/Review logic, and the Conclusion.
     Tone & Style Audit: Identify the "Vibe" (e.g., "The Hype Enthusiast," "The Professional Engineer," or "The Minimalist Minimalist"). Analyze the use of jargon vs. simple English.
     Reference Extraction: List every tool, URL, GitHub repo, or research paper mentioned.
@@ -62,10 +54,11 @@ researcher = LlmAgent(
     Technical Reference Bank (Bullet points of tools, links, and specific settings mentioned)
     Writer's "Vibe" Guide (Bullet points on Tone, Pacing, and Level of Difficulty)
     Now, apply these instructions to the user request I provide below.
-
+    """,
+    instruction = """
     Video Requirement: {video_requirements} 
     """,
-    tools = [get_subtitles],
+    tools = [get_subtitles, get_subtitles_batch, get_subtitles_range],
     output_key="research_data"
 )
 
@@ -89,11 +82,8 @@ researcher = LlmAgent(
 initial_writer = LlmAgent(
     name = "initial_writer_agent",
     description = "Agent responsible for writing the final script",
-    model = Gemini(
-        model = "gemini-3-pro-preview",
-        retry_options = retry_config
-    ),
-    instruction = """
+    model = route("writer"),
+    static_instruction = """
     ###ROLE### You are a Senior YouTube Scriptwriter & Retention Specialist for a leading AI tech channel. You specialize in converting technical AI research and tutorial steps into engaging, high-retention video scripts that feel authentic, authoritative, and easy to follow.
 
     ###CONTEXT### The user will provide you with a Research Brief (generated by a Research Agent). This brief contains the structure, tone, technical references, and "Value Proposition" of a successful AI video. Your job is to use this "DNA" to write a completely original script for a new video that covers the same topic but feels fresh and unique to our channel.
@@ -118,6 +108,8 @@ initial_writer = LlmAgent(
     Column 1: Audio/Dialogue (The spoken words)
     Column 2: Visual/Direction (B-roll, screen recordings, text overlays) Followed by a Suggested Title & Thumbnail Concept section at the end.
     Now, apply these instructions to the Research Brief provided below.
+    """,
+    instruction = """
     ```{research_data}```
     """,
     output_key="final_script"
@@ -126,11 +118,8 @@ initial_writer = LlmAgent(
 script_rewriter = LlmAgent(
     name = "script_rewriter",
     description = "Agent responsible to implement critic feedback",
-    model = Gemini(
-        model = "gemini-3-pro-preview",
-        retry_options = retry_config
-    ),
-    instruction= """
+    model = route("rewriter"),
+    static_instruction= """
         ###ROLE### You are a Master Script Editor and Content Optimizer. Your specialty is "Script Surgery"—taking a rough draft and a list of criticisms and merging them into a seamless, high-performance final script. You balance technical precision with cinematic storytelling.
 
         ###CONTEXT### You have two inputs:
@@ -143,7 +132,6 @@ script_rewriter = LlmAgent(
         Technical Tightening: Ensure all technical corrections (API settings, tool names, specific steps) are accurately integrated into the dialogue.
         Flow Optimization: Smooth out the transitions between segments so the script feels like one continuous narrative rather than a list of steps.
         Final Vibe Check: Ensure the language is conversational, removing any remaining "AI-speak" or robotic phrasing.
-        If the critic_feedback is 'APPROVED' then call `exit_loop()` to exit the refinement loop.
 
         ###CONSTRAINTS###
         Don't Over-Edit: If a section of the original script was praised by the critic, keep it intact.
@@ -158,23 +146,51 @@ script_rewriter = LlmAgent(
         Column 1: Audio/Dialogue
         Column 2: Visual/Direction/B-Roll Add a "Changelog" at the bottom, briefly listing the top 3 major improvements you made based on the critic's feedback.
         Now, apply these instructions to the documents provided below. 
-
+    """,
+    instruction= """
         draft script: ```{final_script}```
 
         critique: ```{critique_feedback}```
     """,
-    tools = [exit_loop],
     output_key = "final_script"
 )
 
+# Same editor, but it answers with the changed sections only. The draft is shown
+# split into sections by common.script_sections, each after an "@@ S<n>" line
+patch_rewriter = script_rewriter.clone({
+    "static_instruction": """
+        ###ROLE### You are a Master Script Editor and Content Optimizer. Your specialty is "Script Surgery"—taking a rough draft and a list of criticisms and fixing exactly the parts that need it. You balance technical precision with cinematic storytelling.
+
+        ###CONTEXT### You have two inputs:
+        The Draft Script: An AI tutorial/review script split into numbered sections. Every section starts with a line like "@@ S3".
+        The Critic's Feedback: A list of "Red Flags," retention issues, and technical gaps. Your job is to implement the critic's "Better Alternatives" without losing the original voice of the writer.
+
+        ###TASK### Rewrite only the sections the critic's feedback concerns:
+        Fix the Friction: Rewrite the sections flagged as "boring" or "dense." Use the suggested "Pattern Interrupts" to keep the pacing fast.
+        Punch Up the Hook: If the critic gave the hook a low score, rebuild its sections using a "Problem-Agitation-Solution" framework.
+        Technical Tightening: Integrate every technical correction (API settings, tool names, specific steps) into the dialogue of the section it belongs to.
+
+        ###CONSTRAINTS###
+        Don't Over-Edit: Sections the critic did not flag are kept as they are; do not output them.
+        Visual-Audio Sync: Every rewritten dialogue row keeps its updated visual cue in the side column.
+        Keep the Table: A rewritten table row stays a row of the same two-column table.
+        No Narrative Breaks: Do not explain your changes and do not add a changelog.
+
+        ###OUTPUT FORMAT### Output only the sections you change. Start each one with its own "@@ S<n>" line, followed by the complete new text of that section. A section may become several rows. To delete a section, output its "@@ S<n>" line with nothing after it.
+    """,
+    "instruction": tagged_instruction(f"""
+        draft script:
+        {SECTIONS_MARKER}
+        critique: ```{{critique_feedback}}```
+    """, "final_script"),
+    "output_key": "script_patch",
+})
+
 critique = LlmAgent(
     name="critique_agent",
     description="Agent responsible for critiquing and improving the script",
-    model = Gemini(
-        model = "gemini-3-pro-preview",
-        retry_options = retry_config
-    ),
-    instruction="""
+    model = route("critique"),
+    static_instruction="""
     ###ROLE### You are a Ruthless YouTube Script Consultant and Audience Retention Analyst. You have analyzed thousands of high-performing tech videos and know exactly where viewers drop off, where technical explanations become "boring," and where hooks fail to deliver.
 
     ###CONTEXT### You are reviewing a draft script for an AI review and tutorial channel. The channel's reputation depends on technical accuracy, high energy, and clear value. You are comparing the Draft Script against the original Research Brief to ensure nothing was lost in translation and that the script is "un-skippable."
@@ -203,7 +219,8 @@ critique = LlmAgent(
     The "Final Polish" Suggestions: 3-5 high-impact changes to make the script "Viral Ready."
     Now, apply these instructions to the Script and Research Brief provided below. 
     If the script is satisfactory, respond with 'APPROVED'. Otherwise, provide feedback for improvement.
-    
+    """,
+    instruction="""
     RESEARCH BRIEF: ```{research_data}``` 
     
     DRAFT SCRIPT: ```{final_script}```
@@ -213,19 +230,10 @@ critique = LlmAgent(
     output_key="critique_feedback",
 )
 
-feedback_loop_agent = LoopAgent(
-    name = "feedback_loop_agent",
-    sub_agents = [critique, script_rewriter],
-    max_iterations = 2,
-)
-
 manager_agent  = LlmAgent(
     name = "manager_agent",
     description = "Main agent who wil orchestrate every operation",
-    model = Gemini(
-        model = "gemini-2.5-flash-lite",
-        retry_options = retry_config
-    ),
+    model = route("manager"),
     instruction = """
     You are a Youtube Manager. Your task is to get the necessary details from the user to create a 
     complete Youtube script. example: topic, target audience, style, length or some reference youtube videos. Then generate 
@@ -234,10 +242,69 @@ manager_agent  = LlmAgent(
     output_key = "video_requirements",
 )
 
-root_agent = SequentialAgent(
-    name="workflow",
-    sub_agents=[manager_agent, researcher, initial_writer, feedback_loop_agent],
-)
+def build_feedback_loop(rewrite_mode=REWRITE_MODE):
+    """
+    Returns a new critique/rewrite loop for `rewrite_mode`, either "full" or "patch".
+
+    The gates end the loop without a model call: right after an 'APPROVED'
+    critique (so the rewriter is skipped), or once a rewrite barely changes the
+    script or the loop runs out of budget. The outcome is in state["loop_report"].
+    """
+    if rewrite_mode == "full":
+        rewrite = [script_rewriter.clone()]
+    elif rewrite_mode == "patch":
+        rewrite = [
+            patch_rewriter.clone(),
+            ScriptPatchMerger(name = "script_patch_merger", script_key = "final_script", patch_key = "script_patch"),
+        ]
+    else:
+        raise ValueError(f"Unknown SCRIPT_REWRITE_MODE {rewrite_mode!r}, expected 'full' or 'patch'")
+    return LoopAgent(
+        name = "feedback_loop_agent",
+        sub_agents = [
+            critique.clone(),
+            ApprovalGate(name = "approval_gate", feedback_key = "critique_feedback", draft_key = "final_script"),
+            *rewrite,
+            ConvergenceGate(
+                name = "convergence_gate",
+                draft_key = "final_script",
+                similarity = 0.95,
+                max_seconds = 600,
+                max_tokens = 200_000,
+            ),
+        ],
+        max_iterations = 2,
+    )
+
+
+def build_workflow(rewrite_mode=REWRITE_MODE):
+    """
+    Returns a new workflow whose loop rewrites in `rewrite_mode`.
+
+    The agents are cloned because an ADK agent can only belong to one pipeline.
+    """
+    return SequentialAgent(
+        name="workflow",
+        sub_agents=[manager_agent.clone(), researcher.clone(), initial_writer.clone(), build_feedback_loop(rewrite_mode)],
+    )
+
+
+# Every step's model comes from the MODEL_POLICY routing policy of
+# common.model_router: "pro" (default), "lite" or "tiered"
+root_agent = build_workflow()
+
+# With PIPELINE_RESUME=1, sending the same request again after a failure skips the steps that finished
+resume = enable_resume(root_agent)
+
+# Replays unchanged steps from disk when LLM_RESPONSE_CACHE names them
+response_cache = enable_response_cache(root_agent)
+
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
+
+# With CONTEXT_CACHE set, adk web serves this App, which caches the static
+# instructions and the conversation before them on Gemini
+app = enable_context_cache(root_agent, "youtube_script_writer")
 
 
 
@@ -1,23 +1,30 @@
 from google.adk.agents import LlmAgent, SequentialAgent, LoopAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.runners import InMemoryRunner
-from google.adk.tools import AgentTool
-from .youtube_script_tool import get_subtitles
+from google.adk.tools import ToolContext
+from common.loop_control import ApprovalGate, ConvergenceGate
+from common.metrics import enable_metrics
+from common.model_pool import get_model
+from common.response_cache import enable_response_cache
+from common.session_store import enable_resume
+from common.youtube_script_tool import get_subtitles, get_subtitles_batch
 
 # 1. Logic Functions
-def exit_loop():
+def exit_loop(tool_context: ToolContext):
     """Call ONLY when the script is perfect and needs no further changes."""
+    # Escalating is what actually ends the LoopAgent; skipping the summary
+    # avoids one more model call after the tool returns
+    tool_context.actions.escalate = True
+    tool_context.actions.skip_summarization = True
     return {"status": "approved", "message": "Refinement complete."}
 
 # 2. Strategy Agent: Merged Manager & Researcher
 # Uses 'lite' model for cost-effective requirements gathering and technical subtitle extraction
 strategy_agent = LlmAgent(
     name="strategy_agent",
-    model=Gemini(model="gemini-2.5-flash-lite"),
-    tools=[get_subtitles],
+    model=get_model("gemini-2.5-flash-lite"),
+    tools=[get_subtitles, get_subtitles_batch],
     instruction="""
     Gather video topic, audience, style, and length from input. 
-    If YT links provided, use `get_subtitles`. 
+    If YT links provided, use `get_subtitles`, or `get_subtitles_batch` once for several links. 
     Output: Combined requirements and research data. 
     No greetings. Direct data only.
     """,
@@ -28,7 +35,7 @@ strategy_agent = LlmAgent(
 # Uses standard 'flash' for better creative writing quality
 writer_agent = LlmAgent(
     name="writer_agent",
-    model=Gemini(model="gemini-2.5-flash"),
+    model=get_model("gemini-2.5-flash"),
     instruction="""
     Create outline and full YouTube script based on: {research_package}. 
     Follow style and audience constraints strictly. 
@@ -41,7 +48,7 @@ writer_agent = LlmAgent(
 # Handles self-correction in a single turn to save loop tokens
 refiner_agent = LlmAgent(
     name="refiner_agent",
-    model=Gemini(model="gemini-2.5-flash"),
+    model=get_model("gemini-2.5-flash"),
     tools=[exit_loop],
     instruction="""
     Compare {final_script} against {research_package}. 
@@ -61,12 +68,25 @@ root_agent = SequentialAgent(
         writer_agent, 
         LoopAgent(
             name="refinement_loop", 
-            sub_agents=[refiner_agent], 
+            sub_agents=[
+                ApprovalGate(name="refinement_start", draft_key="final_script"),
+                refiner_agent,
+                ConvergenceGate(name="refinement_convergence", draft_key="final_script", similarity=0.95),
+            ], 
             max_iterations=2
         )
     ]
 )
 
+# With PIPELINE_RESUME=1, sending the same request again after a failure skips the steps that finished
+resume = enable_resume(root_agent)
+
+# Replays unchanged steps from disk when LLM_RESPONSE_CACHE names them
+response_cache = enable_response_cache(root_agent)
+
+# Writes per-agent latency, token and cost records when AGENT_METRICS_PATH is set
+metrics = enable_metrics(root_agent)
+
 # if __name__ == "__main__":
 #     import asyncio
 #     async def main():